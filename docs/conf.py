@@ -29,7 +29,7 @@ class Mock(MagicMock):
     def __getattr__(cls, name):
             return Mock()
 
-MOCK_MODULES = ['osgeo']
+MOCK_MODULES = ['osgeo', 'scipy']
 sys.modules.update((mod_name, Mock()) for mod_name in MOCK_MODULES)
 # END TEMP SECTION UNTIL UNTIL GDAL DEPENDENCYFIXED
 
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.aio
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.aio docstring
+This module contains awaitable versions of the blocking grid functions
+for use with :mod:`asyncio` (Python 3.5+).
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# default modules
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from multiprocessing import cpu_count
+
+# local modules
+from .grid import gdal_reproject, resample_grid
+from .shape import rasterize_shapefile
+
+
+class AsyncExecutor(object):
+    """
+    Runs GDAL work on a bounded thread pool without
+    blocking the event loop.
+
+    At most `max_concurrency` jobs run at the same time. Additional
+    callers wait for a free slot (backpressure) before their job is
+    submitted. Cancelling a waiting caller removes its job. A job that
+    is already running in GDAL finishes in the background, its result
+    is discarded and its slot is released when it is done.
+
+    .. warning:: Grids that are not opened from a file path (Ex.
+                 :func:`~gazar.grid.ArrayGrid`) share one dataset
+                 handle. Only :func:`~AsyncExecutor.np_array` serializes
+                 access to them.
+
+    Parameters
+    ----------
+    max_concurrency: int, optional
+        Maximum number of jobs running at the same time.
+        Default is the number of CPUs.
+    loop: :func:`asyncio.AbstractEventLoop`, optional
+        The event loop. Default is the event loop of the caller.
+
+    Use `async with` in coroutines. It waits for the running jobs
+    without blocking the event loop, unlike `with`.
+
+    Example::
+
+        from gazar.aio import AsyncExecutor
+        from gazar.grid import GDALGrid
+
+        async def read_grids(file_paths):
+            async with AsyncExecutor(max_concurrency=4) as executor:
+                return await asyncio.gather(
+                    *[executor.np_array(GDALGrid(file_path, lazy=True))
+                      for file_path in file_paths])
+
+    """
+    def __init__(self, max_concurrency=None, loop=None):
+        self.max_concurrency = max_concurrency or cpu_count()
+        self._loop = loop
+        self._executor = ThreadPoolExecutor(self.max_concurrency)
+        # created in the event loop on first use
+        self._semaphore = None
+        # number of callers waiting for a free slot
+        self.pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        loop = self._loop or asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.shutdown)
+
+    async def run(self, func, *args, **kwargs):
+        """Runs a blocking function in the executor.
+
+        Parameters
+        ----------
+        func: callable
+            The blocking function.
+        *args:
+            Positional arguments for `func`.
+        **kwargs:
+            Keyword arguments for `func`.
+
+        Returns
+        -------
+        object
+            The return value of `func`.
+        """
+        loop = self._loop or asyncio.get_event_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.pending += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.pending -= 1
+        try:
+            job = self._executor.submit(partial(func, *args, **kwargs))
+        except BaseException:
+            self._semaphore.release()
+            raise
+        # keep the slot until the thread is done, even if cancelled
+        job.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._semaphore.release))
+        return await asyncio.wrap_future(job, loop=loop)
+
+    async def np_array(self, grid, **kwargs):
+        """Awaitable :func:`~gazar.grid.GDALGrid.read_array`.
+
+        Parameters
+        ----------
+        grid: :func:`~gazar.grid.GDALGrid`
+            The grid to read.
+        **kwargs:
+            Keyword arguments for :func:`~gazar.grid.GDALGrid.np_array`.
+
+        Returns
+        -------
+        :func:`numpy.array` or :func:`numpy.ma.array`
+        """
+        return await self.run(grid.read_array, **kwargs)
+
+    async def resample_grid(self, *args, **kwargs):
+        """Awaitable :func:`~gazar.grid.resample_grid`."""
+        return await self.run(resample_grid, *args, **kwargs)
+
+    async def gdal_reproject(self, *args, **kwargs):
+        """Awaitable :func:`~gazar.grid.gdal_reproject`."""
+        return await self.run(gdal_reproject, *args, **kwargs)
+
+    async def rasterize_shapefile(self, *args, **kwargs):
+        """Awaitable :func:`~gazar.shape.rasterize_shapefile`."""
+        return await self.run(rasterize_shapefile, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        """Shuts down the thread pool.
+
+        Parameters
+        ----------
+        wait: bool, optional
+            If True, waits for the running jobs to finish.
+            Default is True.
+        """
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.ascii
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.ascii docstring
+This module contains the Arc and GRASS ASCII grid reader.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# default modules
+import mmap
+import os
+
+# external modules
+import numpy as np
+
+# local modules
+from .grid import ArrayGrid
+from .windows import gdal_dtype_from_numpy
+
+
+# Arc and GRASS ASCII grid header keys
+_ASCII_HEADER_KEYS = frozenset(('ncols', 'nrows', 'xllcorner', 'yllcorner',
+                                'xllcenter', 'yllcenter', 'cellsize',
+                                'dx', 'dy', 'nodata_value', 'north', 'south',
+                                'east', 'west', 'rows', 'cols', 'null',
+                                'type', 'multiplier'))
+
+
+def _read_ascii_header(ascii_map):
+    """Reads the header lines of an ascii grid into a dictionary"""
+    header = {}
+    while True:
+        position = ascii_map.tell()
+        line = ascii_map.readline().decode('ascii', 'ignore')
+        tokens = line.replace(':', ' ').split()
+        if not line or (tokens and
+                        tokens[0].lower() not in _ASCII_HEADER_KEYS):
+            ascii_map.seek(position)
+            return header
+        if tokens:
+            header[tokens[0].lower()] = tokens[1] if len(tokens) > 1 else ''
+
+
+def _parse_ascii_chunk(ascii_map, chunk_start, chunk, dtype, nodata_value,
+                       file_path):
+    """Parses the values of a chunk of an ascii grid"""
+    parse_chunk = chunk
+    if b'*' in chunk:
+        # GRASS null values
+        parse_chunk = chunk.replace(b'*', nodata_value.encode('ascii'))
+    try:
+        values = np.fromstring(parse_chunk, dtype=dtype, sep=' ')
+    except ValueError:
+        values = None
+
+    # parsing stops at the first invalid value
+    chars = np.frombuffer(chunk, dtype=np.uint8)
+    spaces = chars <= 32
+    token_starts = np.flatnonzero(~spaces &
+                                  np.concatenate(([True], spaces[:-1])))
+    if values is not None and values.size >= token_starts.size:
+        return values
+    index = 0 if values is None else values.size
+    if values is None:
+        for index, token in enumerate(parse_chunk.split()):
+            try:
+                valid = np.fromstring(token, dtype=dtype, sep=' ').size == 1
+            except ValueError:
+                valid = False
+            if not valid:
+                break
+    offset = chunk_start + int(token_starts[index])
+    token = ascii_map[offset:offset + 32].split()[0]
+    line = ascii_map[:offset].count(b'\n') + 1
+    raise ValueError("Invalid value {0!r} in {1} at line {2} (byte {3}) ..."
+                     .format(token.decode('ascii', 'replace'),
+                             file_path, line, offset))
+
+
+def load_ascii_grid(file_path, wkt_projection=None, dtype=None,
+                    chunk_size=2**24):
+    """
+    Load a GRASS or Arc ASCII grid as an :func:`~ArrayGrid`.
+
+    The file is memory-mapped and the values are parsed in chunks
+    directly into a preallocated array.
+
+    Parameters
+    ----------
+        file_path: :obj:`str`
+            Path to the ascii grid.
+        wkt_projection: :obj:`str`, optional
+            WKT projection string. Default is the contents of the
+            projection file next to the grid if it exists.
+        dtype: :func:`numpy.dtype`, optional
+            Data type of the grid. Default is int32 if the
+            values are integers and float64 otherwise, or if the
+            NoData value of the header is not an integer.
+            GRASS null values (*) are replaced with the null value
+            of the header or -9999 if it is not set.
+        chunk_size: int, optional
+            Number of bytes parsed at a time. Default is 16 MB.
+
+    Returns
+    -------
+    :func:`~ArrayGrid`
+    """
+    if wkt_projection is None:
+        prj_file = "{0}.prj".format(os.path.splitext(file_path)[0])
+        wkt_projection = ''
+        if os.path.exists(prj_file):
+            with open(prj_file) as pro_file:
+                wkt_projection = pro_file.read()
+
+    with open(file_path, 'rb') as ascii_file:
+        ascii_map = mmap.mmap(ascii_file.fileno(), 0,
+                              access=mmap.ACCESS_READ)
+        try:
+            header = _read_ascii_header(ascii_map)
+            body_start = ascii_map.tell()
+
+            nodata_value = header.get('nodata_value', header.get('null'))
+            if nodata_value is None and ascii_map.find(b'*', body_start) >= 0:
+                # GRASS null values without a null value in the header
+                nodata_value = '-9999'
+            if 'ncols' in header:
+                # Arc ASCII
+                x_size = int(header['ncols'])
+                y_size = int(header['nrows'])
+                x_cell_size = float(header.get('dx',
+                                               header.get('cellsize')))
+                y_cell_size = float(header.get('dy',
+                                               header.get('cellsize')))
+                if 'xllcenter' in header:
+                    x_min = float(header['xllcenter']) - x_cell_size / 2.0
+                else:
+                    x_min = float(header['xllcorner'])
+                if 'yllcenter' in header:
+                    y_min = float(header['yllcenter']) - y_cell_size / 2.0
+                else:
+                    y_min = float(header['yllcorner'])
+                y_max = y_min + y_size * y_cell_size
+            elif 'cols' in header:
+                # GRASS ASCII
+                x_size = int(header['cols'])
+                y_size = int(header['rows'])
+                x_min = float(header['west'])
+                y_max = float(header['north'])
+                x_cell_size = (float(header['east']) - x_min) / x_size
+                y_cell_size = (y_max - float(header['south'])) / y_size
+            else:
+                raise ValueError("Invalid ASCII grid header in {0} ..."
+                                 .format(file_path))
+
+            infer_dtype = dtype is None
+            if infer_dtype:
+                grass_types = {'int': np.int32,
+                               'float': np.float32,
+                               'double': np.float64}
+                if header.get('type') in grass_types:
+                    dtype = grass_types[header['type']]
+                elif any(ascii_map.find(char, body_start) >= 0
+                         for char in (b'.', b'e', b'E', b'n', b'N')):
+                    dtype = np.float64
+                else:
+                    dtype = np.int32
+
+            if nodata_value is not None and \
+                    np.issubdtype(np.dtype(dtype), np.integer):
+                try:
+                    nodata_value = str(int(nodata_value))
+                except ValueError:
+                    # NoData values such as -9999.0
+                    if float(nodata_value).is_integer():
+                        nodata_value = str(int(float(nodata_value)))
+                    elif infer_dtype:
+                        dtype = np.float64
+                    else:
+                        raise ValueError("NoData value {0} of {1} does not "
+                                         "fit in {2} ..."
+                                         .format(nodata_value, file_path,
+                                                 np.dtype(dtype)))
+
+            grid_data = np.empty(x_size * y_size, dtype=dtype)
+            num_values = 0
+            chunk_start = body_start
+            while chunk_start < ascii_map.size():
+                chunk_end = chunk_start
+                split = 0
+                # do not split a value between chunks
+                while split <= 0 and chunk_end < ascii_map.size():
+                    chunk_end = min(chunk_end + chunk_size,
+                                    ascii_map.size())
+                    chunk = ascii_map[chunk_start:chunk_end]
+                    split = max(chunk.rfind(b' '), chunk.rfind(b'\n'),
+                                chunk.rfind(b'\t'), chunk.rfind(b'\r'))
+                if chunk_end < ascii_map.size():
+                    chunk = chunk[:split]
+                    chunk_end = chunk_start + split
+                chunk_start = chunk_end
+                if not chunk.strip():
+                    continue
+                values = _parse_ascii_chunk(ascii_map,
+                                            chunk_end - len(chunk), chunk,
+                                            dtype, nodata_value, file_path)
+                if num_values + values.size > grid_data.size:
+                    break
+                grid_data[num_values:num_values + values.size] = values
+                num_values += values.size
+        finally:
+            ascii_map.close()
+
+    if num_values != grid_data.size:
+        raise ValueError("Expected {0} values in {1}, but found {2} ..."
+                         .format(grid_data.size, file_path,
+                                 num_values))
+    if nodata_value is not None:
+        nodata_value = float(nodata_value)
+
+    return ArrayGrid(in_array=grid_data.reshape(y_size, x_size),
+                     wkt_projection=wkt_projection,
+                     geotransform=(x_min, x_cell_size, 0, y_max,
+                                   0, -y_cell_size),
+                     gdal_dtype=gdal_dtype_from_numpy(dtype),
+                     nodata_value=nodata_value,
+                     copy=False)
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.batch
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.batch docstring
+This module contains functions and a command line interface to
+reproject or resample many rasters in parallel processes.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# default modules
+import argparse
+from collections import namedtuple
+from glob import glob
+from multiprocessing import cpu_count, Pool
+import os
+import sys
+import time
+
+# external modules
+from osgeo import gdal, gdalconst
+
+# local modules
+from .grid import gdal_reproject, resample_grid
+from .log import LOGGER
+from .pool import clear_pool
+from .srs import get_spatial_reference
+
+BatchResult = namedtuple('BatchResult',
+                         ['input_path', 'output_path', 'seconds', 'error'])
+
+
+def _init_worker(cache_max):
+    """Sets the GDAL block cache size (MB) of the worker process"""
+    # forked workers must not share the dataset handles of the parent
+    clear_pool()
+    if cache_max is not None:
+        gdal.SetCacheMax(int(cache_max) * 1024 * 1024)
+
+
+def _expand_inputs(inputs):
+    """Returns the list of input files from paths or glob patterns"""
+    if not isinstance(inputs, (list, tuple)):
+        inputs = [inputs]
+    input_paths = []
+    for input_path in inputs:
+        if any(char in input_path for char in '*?['):
+            input_paths += sorted(glob(input_path))
+        else:
+            input_paths.append(input_path)
+    return input_paths
+
+
+def output_path_for(input_path, output_dir, suffix=''):
+    """Returns the output path of an input file in a batch.
+
+    The output is a GeoTIFF named after the input file.
+
+    Parameters
+    ----------
+    input_path: :obj:`str`
+        Path to the input raster.
+    output_dir: :obj:`str`
+        Directory of the output rasters.
+    suffix: :obj:`str`, optional
+        Text added to the end of the file name. Default is ''.
+
+    Returns
+    -------
+    :obj:`str`
+
+    Example::
+
+        >>> output_path_for('/data/era_2017.nc', '/out', '_utm')
+        '/out/era_2017_utm.tif'
+    """
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, '{0}{1}.tif'.format(base_name, suffix))
+
+
+def _run_job(job):
+    """Processes one file and records the timing or error"""
+    operation, input_path, output_path, kwargs = job
+    start_time = time.time()
+    error = None
+    try:
+        if operation == 'resample':
+            resample_grid(input_path, to_file=output_path, **kwargs)
+        else:
+            if isinstance(kwargs.get('dst_srs'), (str, type(u''))):
+                kwargs = dict(kwargs,
+                              dst_srs=get_spatial_reference(kwargs['dst_srs']))
+            gdal_reproject(input_path, output_path, **kwargs)
+    except Exception as ex:
+        error = '{0}: {1}'.format(type(ex).__name__, ex)
+    return BatchResult(input_path, output_path,
+                       time.time() - start_time, error)
+
+
+def _run_batch(operation, inputs, output_dir, suffix, num_workers,
+               cache_max, kwargs):
+    """Runs the jobs across a process pool"""
+    input_paths = _expand_inputs(inputs)
+    output_paths = [output_path_for(input_path, output_dir, suffix)
+                    for input_path in input_paths]
+    if len(set(output_paths)) != len(output_paths):
+        raise ValueError("Input files with the same name would "
+                         "write to the same output file ...")
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    jobs = [(operation, input_path, output_path, kwargs)
+            for input_path, output_path in zip(input_paths, output_paths)]
+    pool = Pool(num_workers or cpu_count(),
+                initializer=_init_worker,
+                initargs=(cache_max,))
+    try:
+        results = []
+        for result in pool.imap(_run_job, jobs):
+            if result.error is not None:
+                LOGGER.warning("Failed to process %s (%s)",
+                               result.input_path, result.error)
+            results.append(result)
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+
+def batch_resample(inputs, match_grid, output_dir, suffix='',
+                   num_workers=None, cache_max=None, **kwargs):
+    """Resamples many rasters to match a grid in parallel processes.
+
+    A failure of one file is recorded in its result and
+    does not stop the other files.
+
+    Parameters
+    ----------
+    inputs: :obj:`str` or :obj:`list`
+        Paths or glob patterns (Ex. '/data/*.nc') of the input rasters.
+    match_grid: :obj:`str`
+        Path to the grid to match.
+    output_dir: :obj:`str`
+        Directory of the output GeoTIFF files.
+        See: :func:`~output_path_for`.
+    suffix: :obj:`str`, optional
+        Text added to the end of the output file names. Default is ''.
+    num_workers: int, optional
+        Number of processes. Default is the number of CPUs.
+    cache_max: int, optional
+        GDAL block cache size in MB for each process.
+        Default is the GDAL default.
+    **kwargs:
+        Keyword arguments for :func:`~gazar.grid.resample_grid`.
+
+    Returns
+    -------
+    :obj:`list` of :obj:`BatchResult`
+        (input_path, output_path, seconds, error) for each file
+        in input order. The error is None on success.
+    """
+    kwargs['match_grid'] = match_grid
+    return _run_batch('resample', inputs, output_dir, suffix,
+                      num_workers, cache_max, kwargs)
+
+
+def batch_reproject(inputs, output_dir, epsg=None, dst_srs=None, suffix='',
+                    num_workers=None, cache_max=None, **kwargs):
+    """Reprojects many rasters in parallel processes.
+
+    A failure of one file is recorded in its result and
+    does not stop the other files.
+
+    Parameters
+    ----------
+    inputs: :obj:`str` or :obj:`list`
+        Paths or glob patterns (Ex. '/data/*.nc') of the input rasters.
+    output_dir: :obj:`str`
+        Directory of the output GeoTIFF files.
+        See: :func:`~output_path_for`.
+    epsg: int, optional
+        The EPSG code to reproject to.
+    dst_srs: :obj:`str`, optional
+        The WKT string of the destination projection
+        if `epsg` is not provided.
+    suffix: :obj:`str`, optional
+        Text added to the end of the output file names. Default is ''.
+    num_workers: int, optional
+        Number of processes. Default is the number of CPUs.
+    cache_max: int, optional
+        GDAL block cache size in MB for each process.
+        Default is the GDAL default.
+    **kwargs:
+        Keyword arguments for :func:`~gazar.grid.gdal_reproject`.
+
+    Returns
+    -------
+    :obj:`list` of :obj:`BatchResult`
+        (input_path, output_path, seconds, error) for each file
+        in input order. The error is None on success.
+    """
+    if epsg is None and dst_srs is None:
+        raise ValueError("Either epsg or dst_srs needs to be set ...")
+    kwargs.update(epsg=epsg, dst_srs=dst_srs)
+    return _run_batch('reproject', inputs, output_dir, suffix,
+                      num_workers, cache_max, kwargs)
+
+
+def main(args=None):
+    """Command line interface for batch processing.
+
+    Example::
+
+        gazar_batch reproject '/data/*.tif' -o /out --epsg 32651 -w 8
+        gazar_batch resample '/data/*.nc' -o /out --match-grid mask.tif
+    """
+    parser = argparse.ArgumentParser(
+        description='Reproject or resample many rasters in parallel.')
+    parser.add_argument('operation', choices=['reproject', 'resample'])
+    parser.add_argument('inputs', nargs='+',
+                        help='Input rasters or glob patterns.')
+    parser.add_argument('-o', '--output-dir', required=True,
+                        help='Directory of the output GeoTIFF files.')
+    parser.add_argument('--suffix', default='',
+                        help='Text added to the output file names.')
+    parser.add_argument('-w', '--workers', type=int,
+                        help='Number of processes.')
+    parser.add_argument('--cache-max', type=int,
+                        help='GDAL block cache size in MB per process.')
+    parser.add_argument('--epsg', type=int,
+                        help='EPSG code to reproject to.')
+    parser.add_argument('--match-grid',
+                        help='Grid to match when resampling.')
+    parser.add_argument('--resampling',
+                        help='GDAL resampling method (Ex. GRA_Bilinear).')
+    args = parser.parse_args(args)
+
+    kwargs = {}
+    if args.operation == 'reproject':
+        if args.epsg is None:
+            parser.error('--epsg is required to reproject')
+        if args.resampling:
+            kwargs['resampling'] = getattr(gdalconst, args.resampling)
+        results = batch_reproject(args.inputs, args.output_dir,
+                                  epsg=args.epsg, suffix=args.suffix,
+                                  num_workers=args.workers,
+                                  cache_max=args.cache_max, **kwargs)
+    else:
+        if args.match_grid is None:
+            parser.error('--match-grid is required to resample')
+        if args.resampling:
+            kwargs['resample_method'] = getattr(gdalconst, args.resampling)
+        results = batch_resample(args.inputs, args.match_grid,
+                                 args.output_dir, suffix=args.suffix,
+                                 num_workers=args.workers,
+                                 cache_max=args.cache_max, **kwargs)
+
+    num_failed = 0
+    for result in results:
+        if result.error is None:
+            print('{0} -> {1} ({2:.2f} s)'.format(result.input_path,
+                                                  result.output_path,
+                                                  result.seconds))
+        else:
+            num_failed += 1
+            print('FAILED {0}: {1}'.format(result.input_path,
+                                           result.error))
+    print('{0} of {1} files processed'.format(len(results) - num_failed,
+                                              len(results)))
+    return 1 if num_failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,98 +14,62 @@ Documentation can be found at `_gazar Documentation HOWTO`_.
 
 """
 # default modules
-from csv import writer as csv_writer
-import os
+import threading
 
 # external modules
 from affine import Affine
 import numpy as np
-from osgeo import gdal, gdalconst, ogr, osr
-from pyproj import Proj, transform
-import utm
+from osgeo import gdal, gdal_array, gdalconst, osr
+from pyproj import Proj
+
+# local modules
+from .pool import open_dataset
+from .sample import SampleMethodsMixin
+from .srs import get_spatial_reference, get_transformer
+# project_to_geographic and utm_proj_from_latlon are part of the
+# gazar.grid interface
+from .transform import (  # pylint: disable=unused-import
+    project_to_geographic, transform_points, TransformMethodsMixin,
+    utm_proj_from_latlon)
+from .windows import gdal_dtype_from_numpy, WindowMethodsMixin
+from .writers import (_creation_option_list, write_gtiff,
+                      WriterMethodsMixin)
 
 gdal.UseExceptions()
 
 
-def utm_proj_from_latlon(latitude, longitude, as_wkt=False, as_osr=False):
-    """
-    Returns UTM projection information from a latitude,
-    longitude corrdinate pair.
-
-    Parameters
-    ----------
-    latitude : float
-        The center latitude.
-    longitude:  float
-        The center longitude.
-    as_wkt:  bool, optional
-        If True, will return the WKT projection string.
-    as_osr: bool, optional
-        If True, will return the :func:`osr.SpatialReference` object.
-
-    Returns
-    -------
-    :obj:`str` or :func:`osr.SpatialReference`
-        Defaults to the proj.4 string.
-    """
-    # get utm coordinates
-    utm_centroid_info = utm.from_latlon(latitude, longitude)
-    zone_number, zone_letter = utm_centroid_info[2:]
-
-    # METHOD USING SetUTM. Not sure if better/worse
-    sp_ref = osr.SpatialReference()
-
-    south_string = ''
-    if zone_letter < 'N':
-        south_string = ', +south'
-    proj4_utm_string = ('+proj=utm +zone={zone_number}{zone_letter}'
-                        '{south_string} +ellps=WGS84 +datum=WGS84 '
-                        '+units=m +no_defs')\
-        .format(zone_number=abs(zone_number),
-                zone_letter=zone_letter,
-                south_string=south_string)
-    ret_val = sp_ref.ImportFromProj4(proj4_utm_string)
-    if ret_val == 0:
-        north_zone = True
-        if zone_letter < 'N':
-            north_zone = False
-        sp_ref.SetUTM(abs(zone_number), north_zone)
-
-    sp_ref.AutoIdentifyEPSG()
-
-    if as_osr:  # pylint: disable=no-else-return
-        return sp_ref
-    elif as_wkt:
-        return sp_ref.ExportToWkt()
-    return sp_ref.ExportToProj4()
-
-
-def project_to_geographic(x_coord, y_coord, osr_projetion):
-    """Project point to EPSG:4326
-
-    Parameters
-    ----------
-    x_coord : float
-        The point x-coordinate.
-    y_coord:  float
-        The point y-coordinate.
-    osr_projetion:  :func:`osr.SpatialReference`
-        The projection for the point.
+class _ThreadHandles(object):
+    """Dataset handles of the threads reading a grid file.
 
-    Returns
-    -------
-    :obj:`tuple`
-        The projected point coordinates.
-        (x_coord, y_coord)
+    The thread that opened the grid uses the main dataset and the other
+    threads open their own handle on first use. The lock serializes
+    reads of grids that share a single dataset handle.
     """
-    # Make sure projected into global projection
-    sp_ref = osr.SpatialReference()
-    sp_ref.ImportFromEPSG(4326)
-    trans = osr.CoordinateTransformation(osr_projetion, sp_ref)
-    return trans.TransformPoint(x_coord, y_coord)[:2]
+    def __init__(self):
+        self.owner = threading.current_thread().ident
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """Makes the current thread the owner of the main dataset and
+        drops the handles of the other threads"""
+        self.owner = threading.current_thread().ident
+        self.local = threading.local()
+
+    def get(self, file_path, dataset):
+        """Returns the dataset handle of the current thread"""
+        if threading.current_thread().ident == self.owner:
+            return dataset
+        try:
+            return self.local.dataset
+        except AttributeError:
+            dataset = self.local.dataset = \
+                gdal.Open(file_path, gdalconst.GA_ReadOnly)
+            return dataset
 
 
-class GDALGrid(object):
+class GDALGrid(TransformMethodsMixin, SampleMethodsMixin,
+               WindowMethodsMixin, WriterMethodsMixin):
     """
     Wrapper for :func:`gdal.Dataset` with
     :func:`osr.SpatialReference` object.
@@ -116,255 +80,216 @@ class GDALGrid(object):
         The grid file to be wrapped.
     prj_file : :obj:`str`, optional
         Path to projection file.
+    lazy : bool, optional
+        If True, the grid file is not opened until it is needed and
+        the dataset is borrowed from the process-wide pool in
+        :mod:`gazar.pool` on each access. Default is False.
+
+    .. note:: Grids opened from a file path can be read from several
+              threads at once. Each thread gets its own handle to the
+              file while the projection and affine are shared.
 
     """
-    def __init__(self, grid_file, prj_file=None):
+    def __init__(self, grid_file, prj_file=None, lazy=False):
+        self._file_path = None
         if isinstance(grid_file, gdal.Dataset):
-            self.dataset = grid_file
+            self._dataset = grid_file
         else:
-            self.dataset = gdal.Open(grid_file, gdalconst.GA_ReadOnly)
+            self._file_path = grid_file
+            self._dataset = None if lazy else \
+                gdal.Open(grid_file, gdalconst.GA_ReadOnly)
+        self._handles = _ThreadHandles()
+        # grid that has to outlive a view of it (Ex. clip)
+        self._parent = None
+
+        self._prj_file = prj_file
+        self._metadata = {}
 
-        # set projection object
-        if prj_file is not None:
-            self.projection = osr.SpatialReference()
-            with open(prj_file) as pro_file:
-                self.projection.ImportFromWkt(pro_file.read())
+    @property
+    def dataset(self):
+        """:func:`gdal.Dataset`: The wrapped dataset.
+
+        For grids opened from a file path, this is the
+        handle for the current thread. Lazy grids borrow it from
+        the pool, so keep a reference to the dataset while its
+        bands are used.
+        """
+        if self._file_path is None:
+            return self._dataset
+        if self._dataset is None:
+            # the pool has one handle per thread
+            return open_dataset(self._file_path)
+        return self._handles.get(self._file_path, self._dataset)
+
+    @dataset.setter
+    def dataset(self, dataset):
+        self._dataset = dataset
+        self._file_path = None
+        self._handles.reset()
+        self.invalidate_cache()
+
+    def _load_projection(self):
+        """Loads the projection from the prj file or dataset"""
+        projection = osr.SpatialReference()
+        if self._prj_file is not None:
+            with open(self._prj_file) as pro_file:
+                projection.ImportFromWkt(pro_file.read())
         else:
-            self.projection = osr.SpatialReference()
-            self.projection.ImportFromWkt(self.dataset.GetProjection())
+            projection.ImportFromWkt(self.dataset.GetProjection())
+        return projection
 
-        # set affine from geotransform
-        self.affine = Affine.from_gdal(*self.dataset.GetGeoTransform())
+    @property
+    def projection(self):
+        """:func:`osr.SpatialReference`: The projection of the grid."""
+        return self._cached('projection', self._load_projection)
+
+    @property
+    def affine(self):
+        """:func:`affine.Affine`: The affine from the geotransform."""
+        return self._cached('affine',
+                            lambda: Affine.from_gdal(*self.geotransform))
+
+    def _cached(self, name, compute):
+        """Returns the memoized metadata value"""
+        try:
+            return self._metadata[name]
+        except KeyError:
+            value = self._metadata[name] = compute()
+            return value
+
+    def invalidate_cache(self):
+        """Clears the memoized metadata of the grid.
+
+        Call this after the geotransform or projection of the
+        underlying dataset is changed.
+        """
+        self._metadata.clear()
+
+    def set_geotransform(self, geotransform):
+        """Sets the geotransform of the dataset.
+
+        Parameters
+        ----------
+        geotransform: :obj:`tuple`
+            The new geotransform for the dataset.
+        """
+        self.dataset.SetGeoTransform(geotransform)
+        self.invalidate_cache()
+
+    def set_projection(self, projection):
+        """Sets the projection of the dataset.
+
+        Parameters
+        ----------
+        projection: :obj:`str` or :func:`osr.SpatialReference`
+            The WKT projection string or spatial reference.
+        """
+        if isinstance(projection, osr.SpatialReference):
+            projection = projection.ExportToWkt()
+        self.dataset.SetProjection(projection)
+        self._prj_file = None
+        self.invalidate_cache()
 
     @property
     def geotransform(self):
         """:obj:`tuple`: The geotransform for the dataset."""
-        return self.dataset.GetGeoTransform()
+        return self._cached('geotransform', self.dataset.GetGeoTransform)
+
+    @property
+    def inverse_affine(self):
+        """:func:`affine.Affine`: The inverse of the affine."""
+        return self._cached('inverse_affine', lambda: ~self.affine)
 
     @property
     def x_size(self):
         """int: size of x dimensions"""
-        return self.dataset.RasterXSize
+        return self._cached('x_size', lambda: self.dataset.RasterXSize)
 
     @property
     def y_size(self):
         """int: size of y dimensions"""
-        return self.dataset.RasterYSize
+        return self._cached('y_size', lambda: self.dataset.RasterYSize)
 
     @property
     def num_bands(self):
         """int: number of bands in raster"""
-        return self.dataset.RasterCount
+        return self._cached('num_bands', lambda: self.dataset.RasterCount)
 
     @property
     def wkt(self):
         """:obj:`str`:WKT projection string"""
-        return self.projection.ExportToWkt()
+        return self._cached('wkt', self.projection.ExportToWkt)
 
     @property
     def proj4(self):
         """:obj:`str`:proj4 string"""
-        return self.projection.ExportToProj4()
+        return self._cached('proj4', self.projection.ExportToProj4)
 
     @property
     def proj(self):
         """func:`pyproj.Proj`: Proj4 object"""
-        return Proj(self.proj4)
+        return self._cached('proj', lambda: Proj(self.proj4))
 
-    @property
-    def epsg(self):
-        """:obj:`str`: EPSG code"""
+    def _identify_epsg(self):
+        """Identifies the EPSG code of the projection"""
         try:
             # identify EPSG code where applicable
             self.projection.AutoIdentifyEPSG()
         except RuntimeError:
             pass
+        # the authority is now part of the projection strings
+        for name in ('wkt', 'proj4', 'proj'):
+            self._metadata.pop(name, None)
         return self.projection.GetAuthorityCode(None)
 
-    def bounds(self, as_geographic=False, as_utm=False, as_projection=None):
-        """Returns bounding coordinates for the dataset.
-
-        Parameters
-        ----------
-        as_geographic : bool, optional
-            If True, this will return the bounds in EPSG:4326.
-            Default is False.
-        as_utm:  bool, optional
-            If True, it will attempt to find the UTM zone and
-            will return bounds in that UTM zone.
-        as_projection:  :func:`osr.SpatialReference`, optional
-            Output projection for bounds.
-
-        Returns
-        -------
-        :obj:`tuple`
-            (x_min, x_max, y_min, y_max)
-            Bounds for the grid in the format
-
-        """
-        new_proj = None
-        x_min, y_min = self.affine * (0, self.dataset.RasterYSize)
-        x_max, y_max = self.affine * (self.dataset.RasterXSize, 0)
-
-        if as_geographic:
-            new_proj = osr.SpatialReference()
-            new_proj.ImportFromEPSG(4326)
-        elif as_utm:
-            lon_min, lat_max = project_to_geographic(x_min, y_max,
-                                                     self.projection)
-            lon_max, lat_min = project_to_geographic(x_max, y_min,
-                                                     self.projection)
-            # convert to UTM
-            new_proj = utm_proj_from_latlon((lat_min + lat_max) / 2.0,
-                                            (lon_min + lon_max) / 2.0,
-                                            as_osr=True)
-        elif as_projection:
-            new_proj = as_projection
-
-        if new_proj is not None:
-            ggrid = self.to_projection(new_proj)
-            return ggrid.bounds()
-
-        return x_min, x_max, y_min, y_max
-
-    def pixel2coord(self, col, row):
-        """Returns global coordinates to pixel center using base-0 raster index.
-
-        Parameters
-        ----------
-        col: int
-            The 0-based column index.
-        row:  int
-            The 0-based row index.
-
-        Returns
-        -------
-        :obj:`tuple`
-            (x_coord, y_coord) - The x, y coordinate of the pixel
-            center in the dataset's projection.
-
-        """
-        if col >= self.x_size:
-            raise IndexError("Column index out of bounds...")
-        if row >= self.y_size:
-            raise IndexError("Row index is out of bounds ...")
-        return self.affine * (col + 0.5, row + 0.5)
-
-    def coord2pixel(self, x_coord, y_coord):
-        """Returns base-0 raster index using global coordinates to pixel center
-
-        Parameters
-        ----------
-        x_coord: float
-            The projected x coordinate of the cell center.
-        y_coord:  float
-            The projected y coordinate of the cell center.
-
-        Returns
-        -------
-        :obj:`tuple`
-            (col, row) - The 0-based column and row index of the pixel.
-        """
-        col, row = ~self.affine * (x_coord, y_coord)
-        if col > self.x_size or col < 0:
-            raise IndexError("Longitude {0} is out of bounds ..."
-                             .format(x_coord))
-        if row > self.y_size or row < 0:
-            raise IndexError("Latitude {0} is out of bounds ..."
-                             .format(y_coord))
+    @property
+    def epsg(self):
+        """:obj:`str`: EPSG code"""
+        return self._cached('epsg', self._identify_epsg)
 
-        return int(col), int(row)
+    def clip(self, bounds=None, window=None):
+        """Returns a view of part of the grid without copying pixels.
 
-    def pixel2lonlat(self, col, row):
-        """Returns latitude and longitude to pixel center using base-0 raster index
+        The new grid is backed by a VRT of the window, so the
+        geotransform is shifted to the window and no warping is done.
 
         Parameters
         ----------
-        col: int
-            The 0-based column index.
-        row:  int
-            The 0-based row index.
+        bounds: :obj:`tuple`, optional
+            (x_min, x_max, y_min, y_max) in the grid's projection.
+            The window is snapped outward to the pixel edges.
+            See: :func:`~GDALGrid.bounds2window`.
+        window: :obj:`tuple`, optional
+            (x_off, y_off, x_size, y_size) - The pixel window.
 
         Returns
         -------
-        :obj:`tuple`
-            (longitude, latitude) - The lat, lon of the pixel
-            center in the dataset's projection.
-        """
-        x_coord, y_coord = self.pixel2coord(col, row)
-        longitude, latitude = project_to_geographic(x_coord, y_coord,
-                                                    self.projection)
-        return longitude, latitude
-
-    def lonlat2pixel(self, longitude, latitude):
-        """Returns base-0 raster index using longitude and latitude of pixel center
-
-        Parameters
-        ----------
-        longitude: float
-            The longitude of the cell center.
-        latitude:  float
-            The latitude of the cell center.
-
-        Returns
-        -------
-        :obj:`tuple`
-            (col, row) - The 0-based column and row index of the pixel.
-        """
-        sp_ref = osr.SpatialReference()
-        sp_ref.ImportFromEPSG(4326)  # geographic
-        transx = osr.CoordinateTransformation(sp_ref, self.projection)
-        x_coord, y_coord = transx.TransformPoint(longitude, latitude)[:2]
-        return self.coord2pixel(x_coord, y_coord)
-
-    @property
-    def x_coords(self):
-        """Returns x coordinate array representing the grid.
-        Use method from: https://github.com/pydata/xarray/pull/1712
-
-        Returns
-        -------
-        x_coords: :func:`numpy.array`
-            The X coordinate array.
-        """
-        x_coords, _ = (np.arange(self.x_size) + 0.5,
-                       np.zeros(self.x_size) + 0.5) * self.affine
-        return x_coords
-
-    @property
-    def y_coords(self):
-        """Returns y coordinate array representing the grid.
-        Use method from: https://github.com/pydata/xarray/pull/1712
-
-        Returns
-        -------
-        y_coords: :func:`numpy.array`
-            The Y coordinate array.
-        """
-        _, y_coords = (np.zeros(self.y_size) + 0.5,
-                       np.arange(self.y_size) + 0.5) * self.affine
-        return y_coords
-
-    @property
-    def latlon(self):
-        """Returns latitude and longitude arrays representing the grid.
-
-        Returns
-        -------
-        proj_lats: :func:`numpy.array`
-            The latitude array.
-        proj_lons: :func:`numpy.array`
-            The longitude array.
+        :func:`~GDALGrid`
         """
-        x_2d_coords, y_2d_coords = np.meshgrid(self.x_coords, self.y_coords)
-
-        proj_lons, proj_lats = transform(self.proj,
-                                         Proj(init='epsg:4326'),
-                                         x_2d_coords,
-                                         y_2d_coords)
-        return proj_lats, proj_lons
-
-    def np_array(self, band=1, masked=True):
+        if (bounds is None) == (window is None):
+            raise ValueError("Either bounds or window needs to be set ...")
+        if bounds is not None:
+            window = self.bounds2window(bounds)
+        x_off, y_off, win_xsize, win_ysize = window
+        valid_offset = 0 <= x_off < self.x_size and 0 <= y_off < self.y_size
+        valid_extent = 0 < win_xsize <= self.x_size - x_off and \
+            0 < win_ysize <= self.y_size - y_off
+        if not (valid_offset and valid_extent):
+            raise ValueError("Window {0} is not inside of the grid ..."
+                             .format(window))
+
+        clip_ds = gdal.Translate('', self.dataset, format='VRT',
+                                 srcWin=[x_off, y_off, win_xsize, win_ysize])
+        if self._prj_file is None:
+            # keep the projection even if it was set after opening
+            clip_ds.SetProjection(self.wkt)
+        clip_grid = GDALGrid(clip_ds, prj_file=self._prj_file)
+        # the VRT reads from the dataset of this grid
+        clip_grid._parent = self  # pylint: disable=protected-access
+        return clip_grid
+
+    def np_array(self, band=1, masked=True, window=None, bounds=None,
+                 buf_xsize=None, buf_ysize=None, out=None):
         """Returns the raster band as a numpy array.
 
         Parameters
@@ -375,156 +300,128 @@ class GDALGrid(object):
         masked: bool, optional
             If True, will return the array masked with the NoData
             value. Default is True.
+        window: :obj:`tuple`, optional
+            (x_off, y_off, x_size, y_size) pixel window to read.
+            Default is the full grid.
+        bounds: :obj:`tuple`, optional
+            (x_min, x_max, y_min, y_max) bounds in the grid's projection
+            to read. See: :func:`~GDALGrid.bounds2window`.
+        buf_xsize: int, optional
+            Number of columns of the output array. If smaller than
+            the window, GDAL decimates the data and reads it from
+            the closest overview if available.
+        buf_ysize: int, optional
+            Number of rows of the output array. If smaller than
+            the window, GDAL decimates the data and reads it from
+            the closest overview if available.
+        out: :func:`numpy.array`, optional
+            Preallocated array to read the data into. If the buffer
+            size is not set, it is taken from the shape of `out`.
 
         Returns
         -------
         :func:`numpy.array` or :func:`numpy.ma.array`
         """
+        if window is None and bounds is not None:
+            window = self.bounds2window(bounds)
+        if window is None:
+            window = (0, 0, self.x_size, self.y_size)
+        x_off, y_off, win_xsize, win_ysize = [int(val) for val in window]
+        if out is not None and buf_xsize is None and buf_ysize is None:
+            buf_ysize, buf_xsize = out.shape[-2:]
+
+        # a band does not keep its dataset alive
+        dataset = self.dataset
         if band == 'all':
-            grid_data = self.dataset.ReadAsArray()
+            grid_data = dataset.ReadAsArray(x_off, y_off,
+                                            win_xsize, win_ysize,
+                                            buf_obj=out,
+                                            buf_xsize=buf_xsize,
+                                            buf_ysize=buf_ysize)
         else:
-            raster_band = self.dataset.GetRasterBand(band)
-            grid_data = raster_band.ReadAsArray()
+            raster_band = dataset.GetRasterBand(band)
             nodata_value = raster_band.GetNoDataValue()
+            grid_data = raster_band.ReadAsArray(x_off, y_off,
+                                                win_xsize, win_ysize,
+                                                buf_xsize=buf_xsize,
+                                                buf_ysize=buf_ysize,
+                                                buf_obj=out)
             if nodata_value is not None and masked:
                 return np.ma.array(data=grid_data,
                                    mask=(grid_data == nodata_value))
-        return np.array(grid_data)
-
-    def get_val(self, x_pixel, y_pixel, band=1):
-        """Returns value of raster
+        return grid_data
 
-        Parameters
-        ----------
-        x_pixel: int
-            X pixel location (0-based).
-        y_pixel: int
-            Y pixel location (0-based).
-        band: int, optional
-            Band number (1-based). Default is 1.
+    def read_array(self, *args, **kwargs):
+        """Thread safe :func:`~GDALGrid.np_array`.
 
-        Returns
-        -------
-        object dtype
-        """
-        return self.dataset.GetRasterBand(band)\
-                   .ReadAsArray(x_pixel, y_pixel, 1, 1)[0][0]
-
-    def get_val_latlon(self, longitude, latitude, band=1):
-        """Returns value of raster from a latitude and longitude point.
+        Grids opened from a file path read with a handle per thread.
+        Reads of other grids share one dataset handle, so they
+        are serialized.
 
         Parameters
         ----------
-        longitude: float
-            The longitude of the cell center.
-        latitude:  float
-            The latitude of the cell center.
-        band: int, optional
-            Band number (1-based). Default is 1.
+        *args:
+            Positional arguments for :func:`~GDALGrid.np_array`.
+        **kwargs:
+            Keyword arguments for :func:`~GDALGrid.np_array`.
 
         Returns
         -------
-        object dtype
+        :func:`numpy.array` or :func:`numpy.ma.array`
         """
-        x_pixel, y_pixel = self.lonlat2pixel(longitude, latitude)
-        return self.get_val(x_pixel, y_pixel, band)
+        if self._file_path is None:
+            with self._handles.lock:
+                return self.np_array(*args, **kwargs)
+        return self.np_array(*args, **kwargs)
 
-    def get_val_coord(self, x_coord, y_coord, band=1):
-        """Returns value of raster from a projected coordinate point.
+    def create_like(self, file_path=None, num_bands=None, gdal_dtype=None,
+                    nodata_value=None, creation_options=None):
+        """Creates an empty grid with the same geometry as this grid.
 
         Parameters
         ----------
-        x_coord: float
-            The projected x coordinate of the cell center.
-        y_coord:  float
-            The projected y coordinate of the cell center.
-        band: int, optional
-            Band number (1-based). Default is 1.
+        file_path: :obj:`str`, optional
+            Path to the output GeoTIFF. Default is an in memory grid.
+        num_bands: int, optional
+            Number of bands. Default is the number of bands in the grid.
+        gdal_dtype: :func:`gdalconst`, optional
+            The data type of the output grid. Default is the data type
+            of the first band.
+        nodata_value: int or float, optional
+            The value used in the grid for NoData.
+            Default is the NoData value of the first band.
+        creation_options: :obj:`list` or :obj:`dict`, optional
+            GDAL creation options for the GeoTIFF driver.
+            See: :func:`~gazar.writers.gtiff_creation_options`.
 
         Returns
         -------
-        object dtype
-        """
-        x_pixel, y_pixel = self.coord2pixel(x_coord, y_coord)
-        return self.get_val(x_pixel, y_pixel, band)
-
-    def write_prj(self, out_projection_file, esri_format=False):
-        """Writes projection file.
-
-        Parameters
-        ----------
-        out_projection_file:  :obj:`str`
-            Output path for file.
-        esri_format: bool, optional
-            If True, it will convert the projection string to
-            the Esri format. Default is False.
-        """
-        if esri_format:
-            self.projection.MorphToESRI()
-        with open(out_projection_file, 'w') as prj_file:
-            prj_file.write(self.wkt)
-            prj_file.close()
-
-    def to_polygon(self,
-                   out_shapefile,
-                   band=1,
-                   fieldname='DN',
-                   self_mask=None):
-        """Converts the raster to a polygon.
-
-        Based on:
-        ---------
-        https://svn.osgeo.org/gdal/trunk/gdal/swig/python/scripts
-            /gdal_polygonize.py
-
-        https://stackoverflow.com/questions/25039565
-            /create-shapefile-from-tif-file-using-gdal
-
-        Parameters
-        ----------
-        out_shapefile:  :obj:`str`
-            Output path for shapefile.
-        band: int, optional
-            Band number (1-based). Default is 1.
-        fieldname: str, optional
-            Name of the output field. Defailt is 'DN'.
-        self_mask: bool, optional
-            If True, will use self as mask. Default is None.
+        :func:`~GDALGrid`
         """
-
-        raster_band = self.dataset.GetRasterBand(band)
-        if self_mask:
-            self_mask = raster_band
+        src_dataset = self.dataset
+        first_band = src_dataset.GetRasterBand(1)
+        if num_bands is None:
+            num_bands = self.num_bands
+        if gdal_dtype is None:
+            gdal_dtype = first_band.DataType
+        if nodata_value is None:
+            nodata_value = first_band.GetNoDataValue()
+
+        if file_path is None:
+            driver = gdal.GetDriverByName('MEM')
+            file_path = ''
         else:
-            self_mask = None
-
-        drv = ogr.GetDriverByName("ESRI Shapefile")
-        dst_ds = drv.CreateDataSource(out_shapefile)
-        dst_layername = os.path.splitext(os.path.basename(out_shapefile))[0]
-        dst_layer = dst_ds.CreateLayer(dst_layername, srs=self.projection)
-
-        # mapping between gdal type and ogr field type
-        type_mapping = {gdal.GDT_Byte: ogr.OFTInteger,
-                        gdal.GDT_UInt16: ogr.OFTInteger,
-                        gdal.GDT_Int16: ogr.OFTInteger,
-                        gdal.GDT_UInt32: ogr.OFTInteger,
-                        gdal.GDT_Int32: ogr.OFTInteger,
-                        gdal.GDT_Float32: ogr.OFTReal,
-                        gdal.GDT_Float64: ogr.OFTReal,
-                        gdal.GDT_CInt16: ogr.OFTInteger,
-                        gdal.GDT_CInt32: ogr.OFTInteger,
-                        gdal.GDT_CFloat32: ogr.OFTReal,
-                        gdal.GDT_CFloat64: ogr.OFTReal}
-
-        fld = ogr.FieldDefn(fieldname, type_mapping[raster_band.DataType])
-        dst_layer.CreateField(fld)
-
-        gdal.Polygonize(raster_band,
-                        self_mask,
-                        dst_layer,
-                        0,
-                        [],
-                        callback=None)
+            driver = gdal.GetDriverByName('GTiff')
+        dataset = driver.Create(file_path, self.x_size, self.y_size,
+                                num_bands, gdal_dtype,
+                                options=_creation_option_list(
+                                    creation_options))
+        dataset.SetGeoTransform(self.geotransform)
+        dataset.SetProjection(self.wkt)
+        if nodata_value is not None:
+            for band_id in range(1, num_bands + 1):
+                dataset.GetRasterBand(band_id).SetNoDataValue(nodata_value)
+        return GDALGrid(dataset)
 
     def to_projection(self, dst_proj,
                       resampling=gdalconst.GRA_NearestNeighbour):
@@ -545,84 +442,6 @@ class GDALGrid(object):
                               resampling=resampling,
                               as_gdal_grid=True)
 
-    def to_tif(self, file_path):
-        """Write out as geotiff.
-
-        Parameters
-        ----------
-        file_path:  :obj:`str`
-            Output path for file.
-        """
-        drv = gdal.GetDriverByName('GTiff')
-        drv.CreateCopy(file_path, self.dataset)
-
-    def _to_ascii(self, header_string, file_path, band, print_nodata=True):
-        """Writes data to ascii file"""
-        if print_nodata:
-            nodata_value = self.dataset.GetRasterBand(band).GetNoDataValue()
-            if nodata_value is not None:
-                header_string += "NODATA_value {0}\n".format(nodata_value)
-
-        with open(file_path, 'w') as out_ascii_grid:
-            out_ascii_grid.write(header_string)
-            grid_writer = csv_writer(out_ascii_grid,
-                                     delimiter=" ")
-            grid_writer.writerows(self.np_array(band, masked=False))
-
-    def to_grass_ascii(self, file_path, band=1, print_nodata=True):
-        """Writes data to GRASS ASCII file format.
-
-        Parameters
-        ----------
-            file_path: :obj:`str`
-                Path to output ascii file.
-            band: obj:`int`, optional
-                Band number (1-based). Default is 1.
-            print_nodata: bool, optional
-                If True, it will write out the NoData value
-                for the raster band. Default is False.
-        """
-        # PART 1: HEADER
-        # get data extremes
-        west_bound, east_bound, south_bound, north_bound = self.bounds()
-        header_string = u"north: {0:.9f}\n".format(north_bound)
-        header_string += "south: {0:.9f}\n".format(south_bound)
-        header_string += "east: {0:.9f}\n".format(east_bound)
-        header_string += "west: {0:.9f}\n".format(west_bound)
-        header_string += "rows: {0}\n".format(self.y_size)
-        header_string += "cols: {0}\n".format(self.x_size)
-
-        # PART 2: WRITE DATA
-        self._to_ascii(header_string, file_path, band, print_nodata)
-
-    def to_arc_ascii(self, file_path, band=1, print_nodata=True):
-        """Writes data to Arc ASCII file format.
-
-        Parameters
-        ----------
-            file_path: :obj:`str`
-                Path to output ascii file.
-            band: obj:`int`, optional
-                Band number (1-based). Default is 1.
-            print_nodata: bool, optional
-                If True, it will write out the NoData value
-                for the raster band. Default is False.
-        """
-        # PART 1: HEADER
-        # get data extremes
-        bounds = self.bounds()
-        west_bound = bounds[0]
-        south_bound = bounds[2]
-        cellsize = (self.geotransform[1] - self.geotransform[-1]) / 2.0
-        header_string = u"ncols {0}\n".format(self.x_size)
-        header_string += "nrows {0}\n".format(self.y_size)
-        header_string += "xllcorner {0}\n".format(west_bound)
-        header_string += "yllcorner {0}\n".format(south_bound)
-        header_string += "cellsize {0}\n".format(cellsize)
-
-        # PART 2: WRITE DATA
-        self._to_ascii(header_string, file_path, band, print_nodata)
-
 
 class ArrayGrid(GDALGrid):
     """
@@ -638,44 +457,65 @@ class ArrayGrid(GDALGrid):
         Geotransform for array.
     gdal_dtype: :func:`gdalconst`, optional
         The data type of the `in_array` for GDAL.
-        Default is `gdalconst.GDT_Float32`.
+        Default is the GDAL equivalent of the `in_array` data type
+        or gdalconst.GDT_Float32 if there is none.
     nodata_value: int or float, optional
         The value used in the grid for NoData. Default is None.
+    copy: bool, optional
+        If False, the grid reads and writes the memory of `in_array`
+        directly instead of a copy. The array is kept alive by the
+        dataset and must have a native byte order, positive strides
+        and a data type matching `gdal_dtype`. Default is True.
 
     """
     def __init__(self,
                  in_array,
                  wkt_projection,
                  geotransform,
-                 gdal_dtype=gdalconst.GDT_Float32,
-                 nodata_value=None):
+                 gdal_dtype=None,
+                 nodata_value=None,
+                 copy=True):
 
-        num_bands = 1
+        in_array = np.ma.getdata(in_array)
         if in_array.ndim == 3:
             num_bands, y_size, x_size = in_array.shape
+            band_arrays = list(in_array)
         else:
+            num_bands = 1
             y_size, x_size = in_array.shape
-
-        dataset = gdal.GetDriverByName('MEM').Create("tmp_ras",
-                                                     x_size,
-                                                     y_size,
-                                                     num_bands,
-                                                     gdal_dtype)
+            band_arrays = [in_array]
+
+        if gdal_dtype is None:
+            try:
+                gdal_dtype = gdal_dtype_from_numpy(in_array.dtype)
+            except ValueError:
+                gdal_dtype = gdalconst.GDT_Float32
+
+        if copy:
+            dataset = gdal.GetDriverByName('MEM').Create("tmp_ras",
+                                                         x_size,
+                                                         y_size,
+                                                         num_bands,
+                                                         gdal_dtype)
+            for band, band_array in enumerate(band_arrays, 1):
+                dataset.GetRasterBand(band).WriteArray(band_array)
+        else:
+            if gdal_array.NumericTypeCodeToGDALTypeCode(in_array.dtype) \
+                    != gdal_dtype or not in_array.dtype.isnative \
+                    or min(in_array.strides) <= 0:
+                raise ValueError("Array must have a native byte order, "
+                                 "positive strides and a data type "
+                                 "matching the GDAL data type to be "
+                                 "used without a copy ...")
+            # the dataset holds a reference to the array, so it stays
+            # valid in datasets derived from it (Ex. VRTs)
+            dataset = gdal_array.OpenArray(in_array)
 
         dataset.SetGeoTransform(geotransform)
         dataset.SetProjection(wkt_projection)
-
-        if in_array.ndim == 3:
+        if nodata_value is not None:
             for band in range(1, num_bands + 1):
-                rband = dataset.GetRasterBand(band)
-                rband.WriteArray(in_array[band - 1])
-                if nodata_value is not None:
-                    rband.SetNoDataValue(nodata_value)
-        else:
-            rband = dataset.GetRasterBand(1)
-            rband.WriteArray(in_array)
-            if nodata_value is not None:
-                rband.SetNoDataValue(nodata_value)
+                dataset.GetRasterBand(band).SetNoDataValue(nodata_value)
 
         super(ArrayGrid, self).__init__(dataset)
 
@@ -742,12 +582,61 @@ def load_raster(grid):
     return src, src_proj
 
 
+# source pixels needed around the footprint by the resampling kernels
+_RESAMPLE_MARGIN = {
+    gdalconst.GRA_NearestNeighbour: 1,
+    gdalconst.GRA_Bilinear: 2,
+    gdalconst.GRA_Cubic: 3,
+    gdalconst.GRA_CubicSpline: 3,
+    gdalconst.GRA_Lanczos: 4,
+}
+
+
+def _source_window(src, src_proj, match_ds, match_proj, margin,
+                   num_samples=21):
+    """Returns the source pixel window (x_off, y_off, x_size, y_size)
+    covering the match grid or None if it is the whole source"""
+    if not src_proj or not match_proj:
+        return None
+    # sample the match grid footprint in the source pixel space
+    match_cols, match_rows = np.meshgrid(
+        np.linspace(0, match_ds.RasterXSize, num_samples),
+        np.linspace(0, match_ds.RasterYSize, num_samples))
+    x_coords, y_coords = \
+        Affine.from_gdal(*match_ds.GetGeoTransform()) * (match_cols.ravel(),
+                                                         match_rows.ravel())
+    try:
+        x_coords, y_coords = transform_points(
+            get_transformer(match_proj, src_proj), x_coords, y_coords)
+    except RuntimeError:
+        return None
+    src_cols, src_rows = \
+        ~Affine.from_gdal(*src.GetGeoTransform()) * (x_coords, y_coords)
+    if not (np.isfinite(src_cols).all() and np.isfinite(src_rows).all()):
+        # part of the match grid is outside of the source projection
+        return None
+
+    col_start = max(0, int(np.floor(src_cols.min())) - margin)
+    row_start = max(0, int(np.floor(src_rows.min())) - margin)
+    col_end = min(src.RasterXSize, int(np.ceil(src_cols.max())) + margin)
+    row_end = min(src.RasterYSize, int(np.ceil(src_rows.max())) + margin)
+    if col_end <= col_start or row_end <= row_start:
+        return None
+    if (col_start, row_start, col_end, row_end) == \
+            (0, 0, src.RasterXSize, src.RasterYSize):
+        return None
+    return (col_start, row_start, col_end - col_start, row_end - row_start)
+
+
 def resample_grid(original_grid,
                   match_grid,
                   to_file=False,
                   output_datatype=None,
                   resample_method=gdalconst.GRA_Average,
-                  as_gdal_grid=False):
+                  as_gdal_grid=False,
+                  creation_options=None,
+                  subset_source=False,
+                  cog=False):
     """
     This function resamples a grid and outputs the result to a file.
 
@@ -770,6 +659,20 @@ def resample_grid(original_grid,
             Default is gdalconst.GRA_Average.
         as_gdal_grid: bool, optional
             Return as :func:`~GDALGrid`. Default is False.
+        creation_options: :obj:`list` or :obj:`dict`, optional
+            GDAL creation options for the GeoTIFF driver when
+            writing to file.
+            See: :func:`~gazar.writers.gtiff_creation_options`.
+        subset_source: bool, optional
+            If True, only the window of the original grid covering
+            the match grid (plus a margin for the resampling
+            kernel) is read and warped. The window is estimated
+            from a sample of the match grid, so the whole source
+            is used if any sample point cannot be transformed.
+            Default is False.
+        cog: bool, optional
+            If True, it will write a Cloud-Optimized GeoTIFF with
+            internal overviews to `to_file`. Default is False.
 
     Returns
     -------
@@ -791,7 +694,7 @@ def resample_grid(original_grid,
     match_ds, match_proj = load_raster(match_grid)
     match_geotrans = match_ds.GetGeoTransform()
 
-    if not to_file:
+    if not to_file or cog:
         # in memory raster
         dst_driver = gdal.GetDriverByName('MEM')
         dst_path = ""
@@ -804,7 +707,9 @@ def resample_grid(original_grid,
                             match_ds.RasterXSize,
                             match_ds.RasterYSize,
                             src.RasterCount,
-                            output_datatype)
+                            output_datatype,
+                            options=_creation_option_list(
+                                creation_options if dst_path else None))
 
     dst.SetGeoTransform(match_geotrans)
     dst.SetProjection(match_proj)
@@ -815,8 +720,17 @@ def resample_grid(original_grid,
             nodata_value = -9999
         dst.GetRasterBand(band_i).SetNoDataValue(nodata_value)
 
+    # only warp the part of the source covering the match grid
+    warp_src = src
+    if subset_source:
+        src_window = _source_window(src, src_proj, match_ds, match_proj,
+                                    _RESAMPLE_MARGIN.get(resample_method, 2))
+        if src_window is not None:
+            warp_src = gdal.Translate('', src, format='VRT',
+                                      srcWin=list(src_window))
+
     # extract subset and resample grid
-    gdal.ReprojectImage(src, dst,
+    gdal.ReprojectImage(warp_src, dst,
                         src_proj,
                         match_proj,
                         resample_method)
@@ -825,10 +739,58 @@ def resample_grid(original_grid,
         if as_gdal_grid:
             return GDALGrid(dst)
         return dst
+    if cog:
+        write_gtiff(dst, to_file, creation_options, cog)
     del dst
     return None
 
 
+_WARP_RESAMPLING = {
+    gdalconst.GRA_NearestNeighbour: 'near',
+    gdalconst.GRA_Bilinear: 'bilinear',
+    gdalconst.GRA_Cubic: 'cubic',
+    gdalconst.GRA_CubicSpline: 'cubicspline',
+    gdalconst.GRA_Lanczos: 'lanczos',
+    gdalconst.GRA_Average: 'average',
+    gdalconst.GRA_Mode: 'mode',
+}
+
+
+def _gdal_warp(src_ds, dst, src_wkt, dst_wkt, error_threshold, resampling,
+               creation_options, num_threads, warp_memory_limit,
+               output_bounds, resolution, size):
+    """Warps the dataset to a file or memory with :func:`gdal.Warp`"""
+    warp_kwargs = {}
+    if output_bounds is not None:
+        x_min, x_max, y_min, y_max = output_bounds
+        warp_kwargs['outputBounds'] = (x_min, y_min, x_max, y_max)
+    if resolution is not None:
+        warp_kwargs['xRes'], warp_kwargs['yRes'] = resolution
+    if size is not None:
+        warp_kwargs['width'], warp_kwargs['height'] = size
+    if num_threads is not None:
+        warp_kwargs['multithread'] = True
+        warp_kwargs['warpOptions'] = ['NUM_THREADS={0}'.format(num_threads)]
+    if warp_memory_limit is not None:
+        warp_kwargs['warpMemoryLimit'] = warp_memory_limit
+    if dst:
+        warp_kwargs['format'] = 'GTiff'
+        warp_kwargs['creationOptions'] = \
+            _creation_option_list(creation_options)
+    else:
+        warp_kwargs['format'] = 'MEM'
+        dst = ''
+
+    return gdal.Warp(dst, src_ds,
+                     options=gdal.WarpOptions(
+                         srcSRS=src_wkt,
+                         dstSRS=dst_wkt,
+                         errorThreshold=error_threshold,
+                         resampleAlg=_WARP_RESAMPLING.get(resampling,
+                                                          resampling),
+                         **warp_kwargs))
+
+
 def gdal_reproject(src,
                    dst=None,
                    src_srs=None,
@@ -836,10 +798,22 @@ def gdal_reproject(src,
                    epsg=None,
                    error_threshold=0.125,
                    resampling=gdalconst.GRA_NearestNeighbour,
-                   as_gdal_grid=False):
+                   as_gdal_grid=False,
+                   creation_options=None,
+                   num_threads=None,
+                   warp_memory_limit=None,
+                   output_bounds=None,
+                   resolution=None,
+                   size=None,
+                   cog=False):
     """
     Reproject a raster image.
 
+    If any of `num_threads`, `warp_memory_limit`, `output_bounds`,
+    `resolution` or `size` are set, the image is warped with
+    :func:`gdal.Warp` directly into `dst` (or memory) in chunks
+    bounded by the warp memory. Otherwise, a warped VRT is created.
+
     Based on: https://github.com/OpenDataAnalytics/
             gaia/blob/master/gaia/geo/gdal_functions.py
 
@@ -864,6 +838,26 @@ def gdal_reproject(src,
             `gdalconst.GRA_NearestNeighbour`.
         as_gdal_grid: bool, optional
             Return as :func:`~GDALGrid`. Default is False.
+        creation_options: :obj:`list` or :obj:`dict`, optional
+            GDAL creation options for the GeoTIFF driver when
+            writing to `dst`.
+            See: :func:`~gazar.writers.gtiff_creation_options`.
+        num_threads: int or :obj:`str`, optional
+            Number of threads used to warp (Ex. 4 or 'ALL_CPUS').
+        warp_memory_limit: int, optional
+            Memory used to warp chunks in MB.
+        output_bounds: :obj:`tuple`, optional
+            (x_min, x_max, y_min, y_max) of the output in the
+            destination projection.
+        resolution: :obj:`tuple`, optional
+            (x_cell_size, y_cell_size) of the output in the
+            destination projection.
+        size: :obj:`tuple`, optional
+            (x_size, y_size) - Number of columns and rows of the output.
+            Cannot be used with `resolution`.
+        cog: bool, optional
+            If True, it will write a Cloud-Optimized GeoTIFF with
+            internal overviews to `dst`. Default is False.
 
     Returns
     -------
@@ -876,8 +870,7 @@ def gdal_reproject(src,
 
     # Define target SRS
     if dst_srs is None:
-        dst_srs = osr.SpatialReference()
-        dst_srs.ImportFromEPSG(int(epsg))
+        dst_srs = get_spatial_reference(int(epsg))
 
     dst_wkt = dst_srs.ExportToWkt()
 
@@ -889,6 +882,25 @@ def gdal_reproject(src,
     if src_srs is not None:
         src_wkt = src_srs.ExportToWkt()
 
+    if any(option is not None for option in (num_threads,
+                                             warp_memory_limit,
+                                             output_bounds,
+                                             resolution,
+                                             size)):
+        # the Cloud-Optimized GeoTIFF is copied from memory
+        reprojected_ds = _gdal_warp(src_ds, None if cog else dst,
+                                    src_wkt, dst_wkt,
+                                    error_threshold, resampling,
+                                    creation_options, num_threads,
+                                    warp_memory_limit, output_bounds,
+                                    resolution, size)
+        if dst and cog:
+            reprojected_ds = write_gtiff(reprojected_ds, dst,
+                                         creation_options, cog)
+        if as_gdal_grid:
+            return GDALGrid(reprojected_ds)
+        return reprojected_ds
+
     # Call AutoCreateWarpedVRT() to fetch default values
     # for target raster dimensions and geotransform
     reprojected_ds = gdal.AutoCreateWarpedVRT(src_ds,
@@ -899,7 +911,7 @@ def gdal_reproject(src,
 
     # Create the final warped raster
     if dst:
-        gdal.GetDriverByName('GTiff').CreateCopy(dst, reprojected_ds)
+        write_gtiff(reprojected_ds, dst, creation_options, cog)
     if as_gdal_grid:
         return GDALGrid(reprojected_ds)
     return reprojected_ds
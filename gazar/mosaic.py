@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.mosaic
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.mosaic docstring
+This module contains the mosaicking of grids.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# external modules
+import numpy as np
+from osgeo import gdal, gdalconst
+
+# local modules
+from .grid import GDALGrid, load_raster
+from .writers import gtiff_creation_options, write_gtiff
+
+
+def _reduce_mosaic_block(grid_data, rule, nodata_value):
+    """Combines the stacked tiles of a block with the overlap rule"""
+    valid = grid_data != nodata_value
+    if grid_data.dtype.kind == 'f':
+        valid &= ~np.isnan(grid_data)
+    count = valid.sum(axis=0)
+    if rule == 'mean':
+        result = np.where(valid, grid_data, 0).sum(axis=0, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result /= count
+    elif rule == 'min':
+        result = np.where(valid, grid_data, np.inf).min(axis=0)
+    else:
+        result = np.where(valid, grid_data, -np.inf).max(axis=0)
+    result[count == 0] = nodata_value
+    return result
+
+
+def mosaic(inputs, out=None, rule='first', nodata_value=None, band=1,
+           resolution='highest', creation_options=None, chunk_size=None):
+    """
+    Combines many grids in the same projection into one grid.
+
+    The grids are combined in a VRT and written block by block,
+    so only one block of the output is in memory at a time.
+
+    Parameters
+    ----------
+    inputs: :obj:`list`
+        Paths, :func:`gdal.Dataset` or :func:`~GDALGrid` to combine.
+    out: :obj:`str`, optional
+        Path to the output GeoTIFF. Default is an in memory grid
+        (a VRT for the 'first' and 'last' rules).
+    rule: :obj:`str`, optional
+        Value used where grids overlap: 'first', 'last', 'min', 'max'
+        or 'mean'. NoData values are ignored. Default is 'first'.
+    nodata_value: int or float, optional
+        NoData value of the output. Default is the NoData
+        value of the first grid (-9999 if not set).
+    band: int, optional
+        Band number (1-based) combined with the 'min', 'max' and
+        'mean' rules. The 'first' and 'last' rules use all bands.
+        Default is 1.
+    resolution: :obj:`str`, optional
+        Output resolution when the grids differ: 'highest',
+        'lowest' or 'average'. Default is 'highest'.
+    creation_options: :obj:`list` or :obj:`dict`, optional
+        GDAL creation options for the GeoTIFF driver.
+        Default is :func:`~gazar.writers.gtiff_creation_options` (tiled).
+    chunk_size: :obj:`tuple`, optional
+        (x_size, y_size) minimum size of the blocks processed with
+        the 'min', 'max' and 'mean' rules.
+
+    Returns
+    -------
+    :func:`~GDALGrid`
+
+    Example::
+
+        from glob import glob
+        from gazar.mosaic import mosaic
+
+        mosaic(glob('dem_tiles/*.tif'), 'dem.tif', rule='mean')
+    """
+    if rule not in ('first', 'last', 'min', 'max', 'mean'):
+        raise ValueError("Invalid mosaic rule: {0} ...".format(rule))
+    datasets = [load_raster(grid)[0] for grid in inputs]
+    if not datasets:
+        raise ValueError("No grids to mosaic ...")
+    if nodata_value is None:
+        nodata_value = datasets[0].GetRasterBand(
+            1 if rule in ('first', 'last') else band).GetNoDataValue()
+    if nodata_value is None:
+        nodata_value = -9999
+    if creation_options is None:
+        creation_options = gtiff_creation_options()
+
+    if rule in ('first', 'last'):
+        # later grids in a VRT are drawn on top
+        if rule == 'first':
+            datasets = datasets[::-1]
+        vrt_ds = gdal.BuildVRT('', datasets, resolution=resolution,
+                               VRTNodata=nodata_value)
+        if out is None:
+            return GDALGrid(vrt_ds)
+        # GDAL copies the VRT block by block
+        return GDALGrid(write_gtiff(vrt_ds, out, creation_options))
+
+    # each grid is a band of the VRT covering the full extent
+    vrt_ds = gdal.BuildVRT('', datasets, resolution=resolution,
+                           separate=True, bandList=[band],
+                           VRTNodata=nodata_value)
+    vrt_grid = GDALGrid(vrt_ds)
+    gdal_dtype = gdalconst.GDT_Float64 if rule == 'mean' else None
+    out_grid = vrt_grid.create_like(out, num_bands=1, gdal_dtype=gdal_dtype,
+                                    nodata_value=nodata_value,
+                                    creation_options=creation_options)
+    for window, grid_data in vrt_grid.iter_blocks('all', chunk_size):
+        out_grid.write_block(window, _reduce_mosaic_block(
+            grid_data, rule, nodata_value))
+    out_grid.dataset.FlushCache()
+    return out_grid
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.pipeline
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.pipeline docstring
+This module contains a lazy processing pipeline that chains
+reprojection, resampling, clipping, band selection and scaling
+as VRT datasets and evaluates them block by block.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# external modules
+import numpy as np
+from osgeo import gdal, gdal_array, gdalconst
+
+# local modules
+from .grid import _WARP_RESAMPLING, GDALGrid, load_raster
+from .srs import get_spatial_reference
+from .writers import write_gtiff
+
+
+class Pipeline(object):
+    """
+    Lazy chain of processing steps on a grid.
+
+    Every method returns a new :obj:`Pipeline` with the step added.
+    Reprojection, resampling, clipping and band selection are virtual
+    (VRT) datasets, so no pixels are read until the result is requested
+    with :func:`~Pipeline.np_array` or :func:`~Pipeline.to_tif`. Then,
+    the chain is evaluated one block at a time.
+
+    Parameters
+    ----------
+    src: :obj:`str` or :func:`gdal.Dataset` or :func:`~GDALGrid`
+        The source grid.
+
+    Example::
+
+        from gazar.pipeline import Pipeline
+
+        Pipeline('conus_dem.tif') \\
+            .reproject(epsg=32615) \\
+            .resample('watershed_mask.tif') \\
+            .scale(0.3048) \\
+            .to_tif('watershed_dem.tif')
+
+    """
+    def __init__(self, src, steps=()):
+        self._src = src
+        self._steps = tuple(steps)
+        self._datasets = None
+
+    def _add_step(self, step):
+        """Returns a new pipeline with the step added"""
+        return Pipeline(self._src, self._steps + (step,))
+
+    def reproject(self, dst_srs=None, epsg=None,
+                  resampling=gdalconst.GRA_NearestNeighbour,
+                  error_threshold=0.125):
+        """Adds a reprojection step.
+
+        The output geometry is the same as
+        :func:`~gazar.grid.gdal_reproject`.
+
+        Parameters
+        ----------
+        dst_srs: :func:`osr.SpatialReference`, optional
+            The destination projection. If not provided,
+            `epsg` is used.
+        epsg: int, optional
+            The EPSG code to reproject to.
+        resampling: :func:`osgeo.gdalconst`, optional
+            Method to use for resampling. Default method is
+            `gdalconst.GRA_NearestNeighbour`.
+        error_threshold: float, optional
+            Default is 0.125 (same as gdalwarp commandline).
+
+        Returns
+        -------
+        :obj:`Pipeline`
+        """
+        if dst_srs is None:
+            dst_srs = get_spatial_reference(int(epsg))
+        dst_wkt = dst_srs.ExportToWkt()
+
+        def reproject_step(dataset):
+            """warp the dataset in a VRT"""
+            return gdal.Warp('', dataset, options=gdal.WarpOptions(
+                format='VRT',
+                dstSRS=dst_wkt,
+                errorThreshold=error_threshold,
+                resampleAlg=_WARP_RESAMPLING.get(resampling, resampling)))
+        return self._add_step(reproject_step)
+
+    def resample(self, match_grid, resampling=gdalconst.GRA_Average):
+        """Adds a step to resample to the geometry of a grid.
+
+        Parameters
+        ----------
+        match_grid: :obj:`str` or :func:`gdal.Dataset` or :func:`~GDALGrid`
+            The north up grid to match.
+        resampling: :func:`osgeo.gdalconst`, optional
+            Method to use for resampling. Default is
+            `gdalconst.GRA_Average`.
+
+        Returns
+        -------
+        :obj:`Pipeline`
+        """
+        match_ds, match_proj = load_raster(match_grid)
+        x_min, x_cell_size, _, y_max, _, y_cell_size = \
+            match_ds.GetGeoTransform()
+        x_size, y_size = match_ds.RasterXSize, match_ds.RasterYSize
+        output_bounds = (x_min, y_max + y_cell_size * y_size,
+                         x_min + x_cell_size * x_size, y_max)
+
+        def resample_step(dataset):
+            """warp the dataset to the match grid in a VRT"""
+            return gdal.Warp('', dataset, options=gdal.WarpOptions(
+                format='VRT',
+                dstSRS=match_proj,
+                outputBounds=output_bounds,
+                width=x_size,
+                height=y_size,
+                # exact transformation like resample_grid
+                errorThreshold=0,
+                resampleAlg=_WARP_RESAMPLING.get(resampling, resampling)))
+        return self._add_step(resample_step)
+
+    def clip(self, bounds=None, window=None):
+        """Adds a step to clip the grid without warping.
+
+        Parameters
+        ----------
+        bounds: :obj:`tuple`, optional
+            (x_min, x_max, y_min, y_max) in the projection at this
+            step. The window is snapped outward to the pixel edges.
+        window: :obj:`tuple`, optional
+            (x_off, y_off, x_size, y_size) - The pixel window.
+
+        Returns
+        -------
+        :obj:`Pipeline`
+        """
+        if (bounds is None) == (window is None):
+            raise ValueError("Either bounds or window needs to be set ...")
+
+        def clip_step(dataset):
+            """take a window of the dataset in a VRT"""
+            return GDALGrid(dataset).clip(bounds, window).dataset
+        return self._add_step(clip_step)
+
+    def select_bands(self, bands):
+        """Adds a step to select bands.
+
+        Parameters
+        ----------
+        bands: :obj:`list`
+            Band numbers (1-based) in the output order.
+
+        Returns
+        -------
+        :obj:`Pipeline`
+        """
+        band_list = [int(band) for band in bands]
+
+        def select_bands_step(dataset):
+            """take the bands of the dataset in a VRT"""
+            return gdal.Translate('', dataset, format='VRT',
+                                  bandList=band_list)
+        return self._add_step(select_bands_step)
+
+    def scale(self, scale=1.0, offset=0.0):
+        """Adds a step to scale the values (value * scale + offset).
+
+        The scaling is applied to each block after the VRT steps.
+        Integer sources are converted to floating point before the
+        VRT steps, so resampling does not round the values and the
+        result is the same as scaling before resampling.
+        NoData values are kept.
+
+        Parameters
+        ----------
+        scale: float, optional
+            Value to multiply by. Default is 1.0.
+        offset: float, optional
+            Value to add after the multiplication. Default is 0.0.
+
+        Returns
+        -------
+        :obj:`Pipeline`
+        """
+        return self._add_step((float(scale), float(offset)))
+
+    def _scale_offset(self):
+        """Returns the combined scaling of the pipeline or None"""
+        scale_offset = None
+        for step in self._steps:
+            if isinstance(step, tuple):
+                scale, offset = step
+                if scale_offset is not None:
+                    offset += scale * scale_offset[1]
+                    scale *= scale_offset[0]
+                scale_offset = (scale, offset)
+        return scale_offset
+
+    @property
+    def dataset(self):
+        """:func:`gdal.Dataset`: The VRT of the chained steps."""
+        if self._datasets is None:
+            # keep every dataset in the chain alive
+            datasets = [load_raster(self._src)[0]]
+            if self._scale_offset() is not None:
+                datasets.append(self._float_source(datasets[0]))
+            for step in self._steps:
+                if not isinstance(step, tuple):
+                    datasets.append(step(datasets[-1]))
+            self._datasets = datasets
+        return self._datasets[-1]
+
+    @staticmethod
+    def _float_source(dataset):
+        """Returns a floating point VRT of the source to resample
+        without rounding before the scaling"""
+        src_dtype = gdal_array.GDALTypeCodeToNumericTypeCode(
+            dataset.GetRasterBand(1).DataType)
+        float_dtype = np.result_type(src_dtype, np.float32)
+        return gdal.Translate(
+            '', dataset, format='VRT',
+            outputType=gdal_array.NumericTypeCodeToGDALTypeCode(float_dtype))
+
+    def grid(self):
+        """Returns the VRT of the chained steps without the scaling.
+
+        Returns
+        -------
+        :func:`~GDALGrid`
+        """
+        return GDALGrid(self.dataset)
+
+    def _scale_block(self, grid_data):
+        """Scales a block of the grid"""
+        scale, offset = self._scale_offset()
+        out_dtype = np.result_type(grid_data.dtype, np.float32)
+        return grid_data.astype(out_dtype) * scale + offset
+
+    def np_array(self, band=1, masked=True):
+        """Evaluates the pipeline block by block into an array.
+
+        Parameters
+        ----------
+        band: :obj:`int` or :obj:`str`, optional
+            Band number (1-based) or 'all'. Default is 1.
+        masked: bool, optional
+            If True, will return the array masked with the NoData
+            value. Default is True.
+
+        Returns
+        -------
+        :func:`numpy.array` or :func:`numpy.ma.array`
+        """
+        grid = self.grid()
+        if self._scale_offset() is None:
+            return grid.np_array(band, masked=masked)
+
+        out_array = None
+        mask = None
+        for window, grid_data in grid.iter_blocks(band, masked=True):
+            x_off, y_off, x_size, y_size = window
+            block = self._scale_block(np.ma.getdata(grid_data))
+            if out_array is None:
+                out_array = np.empty(block.shape[:-2] +
+                                     (grid.y_size, grid.x_size),
+                                     dtype=block.dtype)
+                mask = np.zeros(out_array.shape, dtype=bool)
+            out_array[..., y_off:y_off + y_size, x_off:x_off + x_size] = \
+                block
+            mask[..., y_off:y_off + y_size, x_off:x_off + x_size] = \
+                np.ma.getmaskarray(grid_data)
+
+        nodata_value = grid.dataset.GetRasterBand(
+            1 if band == 'all' else band).GetNoDataValue()
+        if masked:
+            return np.ma.array(out_array, mask=mask)
+        if nodata_value is not None:
+            out_array[mask] = nodata_value
+        return out_array
+
+    def to_tif(self, file_path, creation_options=None, num_threads=None):
+        """Evaluates the pipeline block by block into a GeoTIFF.
+
+        Parameters
+        ----------
+        file_path: :obj:`str`
+            Path to the output GeoTIFF.
+        creation_options: :obj:`list` or :obj:`dict`, optional
+            GDAL creation options for the GeoTIFF driver.
+            See: :func:`~gazar.writers.gtiff_creation_options`.
+        num_threads: int, optional
+            Number of threads used to scale the blocks.
+            Default is the number of CPUs.
+
+        Returns
+        -------
+        :func:`~GDALGrid`
+            The output grid.
+        """
+        grid = self.grid()
+        if self._scale_offset() is None:
+            # GDAL copies the VRT block by block
+            return GDALGrid(write_gtiff(grid.dataset, file_path,
+                                        creation_options))
+        return grid.apply(self._scale_block, out=file_path, band='all',
+                          num_threads=num_threads,
+                          creation_options=creation_options)
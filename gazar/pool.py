@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.pool
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.pool docstring
+This module contains a process-wide pool of open :func:`gdal.Dataset`
+objects for lazily opened grids. Each thread has its own handles.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# default modules
+import os
+import threading
+
+# external modules
+from osgeo import gdal, gdalconst
+
+# local modules
+from .srs import LRUCache
+
+DATASET_POOL = LRUCache(maxsize=64)
+
+
+def _dataset_key(file_path):
+    """Returns the canonical key for a dataset path"""
+    if os.path.exists(file_path):
+        return os.path.abspath(file_path)
+    # GDAL virtual file systems (Ex. /vsicurl/)
+    return file_path
+
+
+def open_dataset(file_path):
+    """Returns a read only :func:`gdal.Dataset` from the pool.
+
+    The dataset is opened if the current thread does not have a
+    handle for it in the pool. When the pool
+    is full, the least recently used dataset is released and
+    closed once it is no longer referenced.
+
+    Parameters
+    ----------
+    file_path: :obj:`str`
+        Path to the raster.
+
+    Returns
+    -------
+    :func:`gdal.Dataset`
+    """
+    key = _dataset_key(file_path)
+    return DATASET_POOL.get(
+        (key, threading.current_thread().ident),
+        lambda: gdal.Open(key, gdalconst.GA_ReadOnly))
+
+
+def release_dataset(file_path):
+    """Removes the dataset handles of all threads from the pool.
+
+    The next :func:`~open_dataset` call reopens the file.
+
+    Parameters
+    ----------
+    file_path: :obj:`str`
+        Path to the raster.
+    """
+    key = _dataset_key(file_path)
+    for pool_key in DATASET_POOL.keys():
+        if pool_key[0] == key:
+            DATASET_POOL.discard(pool_key)
+
+
+def pool_info():
+    """Returns the statistics of the dataset pool.
+
+    Returns
+    -------
+    :obj:`gazar.srs.CacheInfo`
+        (hits, misses, maxsize, currsize)
+    """
+    return DATASET_POOL.info()
+
+
+def set_pool_size(maxsize):
+    """Changes the maximum number of open datasets in the pool.
+
+    Parameters
+    ----------
+    maxsize: int
+        Maximum number of open datasets.
+    """
+    DATASET_POOL.resize(maxsize)
+
+
+def clear_pool():
+    """Releases all datasets in the pool."""
+    DATASET_POOL.clear()
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.regrid
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.regrid docstring
+This module contains a conservative (area weighted average) regridder
+that stores the overlap weights in a sparse matrix (requires scipy).
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# external modules
+import numpy as np
+from scipy import sparse
+
+# local modules
+from .grid import ArrayGrid, load_raster
+from .srs import get_spatial_reference, get_transformer
+from .warp import _read_grid_data, _source_pixel_index
+
+
+def _overlap_matrix(src_edges, dst_edges):
+    """Returns the sparse matrix of the 1D overlaps of the destination
+    cells with the source cells divided by the destination cell size.
+    The edges of both axes have to be in increasing order."""
+    dst_low, dst_high = dst_edges[:-1], dst_edges[1:]
+    src_start = np.maximum(
+        np.searchsorted(src_edges, dst_low, side='right') - 1, 0)
+    src_end = np.minimum(
+        np.searchsorted(src_edges, dst_high, side='left'),
+        src_edges.size - 1)
+    num_overlaps = np.maximum(src_end - src_start, 0)
+
+    dst_index = np.repeat(np.arange(dst_low.size), num_overlaps)
+    # position of each overlap within its destination cell
+    offsets = np.arange(num_overlaps.sum()) - \
+        np.repeat(np.cumsum(num_overlaps) - num_overlaps, num_overlaps)
+    src_index = np.repeat(src_start, num_overlaps) + offsets
+    overlap = np.minimum(dst_high[dst_index], src_edges[src_index + 1]) - \
+        np.maximum(dst_low[dst_index], src_edges[src_index])
+    overlap = np.maximum(overlap, 0) / \
+        (dst_high[dst_index] - dst_low[dst_index])
+    return sparse.csr_matrix((overlap, (dst_index, src_index)),
+                             shape=(dst_low.size, src_edges.size - 1))
+
+
+def _axis_weights(src_origin, src_cell_size, src_size,
+                  dst_origin, dst_cell_size, dst_size):
+    """Returns the 1D overlap matrix along one axis of the grids"""
+    src_edges = src_origin + src_cell_size * np.arange(src_size + 1.0)
+    dst_edges = dst_origin + dst_cell_size * np.arange(dst_size + 1.0)
+    # compute with increasing edges and restore the cell order
+    weights = _overlap_matrix(np.sort(src_edges), np.sort(dst_edges))
+    if dst_cell_size < 0:
+        weights = weights[np.arange(dst_size)[::-1]]
+    if src_cell_size < 0:
+        weights = weights[:, np.arange(src_size)[::-1]]
+    return weights
+
+
+class ConservativeRegridder(object):
+    """
+    Area weighted average regridding from a source grid geometry
+    to a match grid geometry.
+
+    The weights are the fractions of each destination cell covered
+    by each source cell. They are computed once in
+    :func:`~ConservativeRegridder.create` and applied to any number
+    of bands or time steps with a sparse matrix multiply.
+
+    Parameters
+    ----------
+    weights: :func:`scipy.sparse.csr_matrix`
+        (destination cells, source cells) overlap fractions.
+    src_shape: :obj:`tuple`
+        (y_size, x_size) of the source grid.
+    dst_shape: :obj:`tuple`
+        (y_size, x_size) of the destination grid.
+    dst_geotransform: :obj:`tuple`
+        Geotransform of the destination grid.
+    dst_wkt: :obj:`str`
+        WKT projection string of the destination grid.
+
+    Example::
+
+        from gazar.regrid import ConservativeRegridder
+
+        regridder = ConservativeRegridder.create('precip.nc', 'mask.tif')
+        regridded_grid = regridder.regrid_grid('precip.nc')
+
+    """
+    def __init__(self, weights, src_shape, dst_shape, dst_geotransform,
+                 dst_wkt):
+        self.weights = weights.tocsr()
+        self.src_shape = tuple(src_shape)
+        self.dst_shape = tuple(dst_shape)
+        self.dst_geotransform = tuple(dst_geotransform)
+        self.dst_wkt = dst_wkt
+        self._coverage = np.asarray(self.weights.sum(axis=1)).ravel()
+
+    @classmethod
+    def create(cls, src, match_grid, supersample=4, chunk_size=None):
+        """Computes the overlap weights between the grids.
+
+        The overlaps are exact when both grids are north up and in the
+        same projection. Otherwise, each destination cell is split
+        into `supersample` x `supersample` points that are
+        transformed into the source grid.
+
+        Parameters
+        ----------
+        src: :obj:`str` or :func:`gdal.Dataset` or :func:`~GDALGrid`
+            The source grid.
+        match_grid: :obj:`str` or :func:`gdal.Dataset` or :func:`~GDALGrid`
+            The grid to match.
+        supersample: int, optional
+            Number of points per destination cell in each direction
+            if the overlaps cannot be computed exactly. Default is 4.
+        chunk_size: int, optional
+            Number of destination rows transformed at a time
+            when supersampling. Default is about one million points.
+
+        Returns
+        -------
+        :obj:`ConservativeRegridder`
+        """
+        src_ds, src_proj = load_raster(src)
+        match_ds, match_proj = load_raster(match_grid)
+        src_geotransform = src_ds.GetGeoTransform()
+        dst_geotransform = match_ds.GetGeoTransform()
+        src_shape = (src_ds.RasterYSize, src_ds.RasterXSize)
+        dst_shape = (match_ds.RasterYSize, match_ds.RasterXSize)
+
+        north_up = src_geotransform[2] == src_geotransform[4] == \
+            dst_geotransform[2] == dst_geotransform[4] == 0
+        same_projection = bool(get_spatial_reference(src_proj).IsSame(
+            get_spatial_reference(match_proj)))
+        if north_up and same_projection:
+            weights = cls._separable_weights(src_geotransform, src_shape,
+                                             dst_geotransform, dst_shape)
+        else:
+            weights = cls._supersampled_weights(
+                src_geotransform, src_shape, src_proj,
+                dst_geotransform, dst_shape, match_proj,
+                supersample, chunk_size)
+        return cls(weights, src_shape, dst_shape, dst_geotransform,
+                   match_proj)
+
+    @staticmethod
+    def _separable_weights(src_geotransform, src_shape,
+                           dst_geotransform, dst_shape):
+        """Exact overlaps of north up grids in the same projection"""
+        y_weights = _axis_weights(src_geotransform[3], src_geotransform[5],
+                                  src_shape[0],
+                                  dst_geotransform[3], dst_geotransform[5],
+                                  dst_shape[0])
+        x_weights = _axis_weights(src_geotransform[0], src_geotransform[1],
+                                  src_shape[1],
+                                  dst_geotransform[0], dst_geotransform[1],
+                                  dst_shape[1])
+        weights = sparse.kron(y_weights, x_weights, format='csr')
+        weights.eliminate_zeros()
+        return weights
+
+    @staticmethod
+    def _supersampled_weights(src_geotransform, src_shape, src_proj,
+                              dst_geotransform, dst_shape, dst_proj,
+                              supersample, chunk_size):
+        """Overlaps approximated by points in each destination cell"""
+        src_y_size, src_x_size = src_shape
+        dst_y_size, dst_x_size = dst_shape
+        transformation = get_transformer(dst_proj, src_proj)
+        sub_offsets = (np.arange(supersample) + 0.5) / supersample
+        if chunk_size is None:
+            chunk_size = max(1, 1000000 // (dst_x_size * supersample ** 2))
+
+        dst_indices = []
+        src_indices = []
+        for row_start in range(0, dst_y_size, chunk_size):
+            row_end = min(row_start + chunk_size, dst_y_size)
+            dst_rows, dst_cols = np.meshgrid(np.arange(row_start, row_end),
+                                             np.arange(dst_x_size),
+                                             indexing='ij')
+            dst_rows = dst_rows.ravel()[:, None, None] + \
+                sub_offsets[None, :, None]
+            dst_cols = dst_cols.ravel()[:, None, None] + \
+                sub_offsets[None, None, :]
+            dst_rows, dst_cols = np.broadcast_arrays(dst_rows, dst_cols)
+            src_index, valid = _source_pixel_index(
+                transformation, dst_geotransform, dst_cols, dst_rows,
+                src_geotransform, src_shape)
+            dst_index = np.repeat(
+                np.arange(row_start * dst_x_size, row_end * dst_x_size),
+                supersample ** 2)
+            dst_indices.append(dst_index[valid])
+            src_indices.append(src_index[valid])
+
+        dst_index = np.concatenate(dst_indices)
+        return sparse.csr_matrix(
+            (np.full(dst_index.size, 1.0 / supersample ** 2),
+             (dst_index, np.concatenate(src_indices))),
+            shape=(dst_y_size * dst_x_size, src_y_size * src_x_size))
+
+    def apply(self, array, nodata_value=None, min_coverage=0.0):
+        """Regrids an array with the source grid geometry.
+
+        Source cells that are masked, NaN or equal to `nodata_value`
+        are left out and the weights of the other cells are
+        renormalized.
+
+        Parameters
+        ----------
+        array: :func:`numpy.array` or :func:`numpy.ma.array`
+            Array with the source shape in the last two dimensions
+            (Ex. (y_size, x_size) or (time, y_size, x_size)).
+        nodata_value: int or float, optional
+            The NoData value of the array and the output.
+            If not set, a :func:`numpy.ma.array` is returned.
+        min_coverage: float, optional
+            Minimum fraction of a destination cell covered by valid
+            source cells to have a value. Default is 0.0.
+
+        Returns
+        -------
+        :func:`numpy.array` or :func:`numpy.ma.array`
+        """
+        if array.shape[-2:] != self.src_shape:
+            raise ValueError("Array shape {0} does not match the source "
+                             "shape {1} of the regridder ..."
+                             .format(array.shape, self.src_shape))
+        lead_shape = array.shape[:-2]
+        values = np.ma.getdata(array).reshape(-1, self.weights.shape[1])
+        invalid = np.ma.getmaskarray(array).reshape(values.shape)
+        if values.dtype.kind == 'f':
+            invalid = invalid | np.isnan(values)
+        if nodata_value is not None:
+            invalid = invalid | (values == nodata_value)
+
+        values = np.where(invalid, 0, values).astype(np.float64)
+        regridded = self.weights.dot(values.T).T
+        if invalid.any():
+            coverage = self.weights.dot((~invalid).T.astype(np.float64)).T
+        else:
+            coverage = np.broadcast_to(self._coverage, regridded.shape)
+        no_data = coverage <= min_coverage
+        with np.errstate(invalid='ignore', divide='ignore'):
+            regridded = regridded / coverage
+
+        regridded = regridded.reshape(lead_shape + self.dst_shape)
+        no_data = no_data.reshape(regridded.shape)
+        if nodata_value is not None:
+            regridded[no_data] = nodata_value
+            return regridded
+        return np.ma.array(regridded, mask=no_data)
+
+    def regrid_grid(self, grid, band='all', min_coverage=0.0):
+        """Regrids a grid with the source grid geometry.
+
+        Parameters
+        ----------
+        grid: :obj:`str` or :func:`gdal.Dataset` or :func:`~GDALGrid`
+            The grid to regrid.
+        band: :obj:`int` or :obj:`str`, optional
+            Band number (1-based) or 'all'. Default is 'all'.
+        min_coverage: float, optional
+            Minimum fraction of a destination cell covered by valid
+            source cells to have a value. Default is 0.0.
+
+        Returns
+        -------
+        :func:`~gazar.grid.ArrayGrid`
+            Float64 grid with the NoData value of the source
+            (-9999 if not set).
+        """
+        grid_data, nodata_value = _read_grid_data(grid, band)
+        regridded = self.apply(grid_data, nodata_value, min_coverage)
+        if nodata_value is None:
+            nodata_value = -9999
+            regridded = regridded.filled(nodata_value)
+        return ArrayGrid(in_array=regridded,
+                         wkt_projection=self.dst_wkt,
+                         geotransform=self.dst_geotransform,
+                         nodata_value=nodata_value,
+                         copy=False)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.sample
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.sample docstring
+This module contains the sampling of grid values at points.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# external modules
+import numpy as np
+from osgeo import gdal_array
+
+
+class SampleMethodsMixin(object):
+    """Point sampling methods of :func:`~gazar.grid.GDALGrid`."""
+    def get_val(self, x_pixel, y_pixel, band=1):
+        """Returns value of raster
+
+        Parameters
+        ----------
+        x_pixel: int
+            X pixel location (0-based).
+        y_pixel: int
+            Y pixel location (0-based).
+        band: int, optional
+            Band number (1-based). Default is 1.
+
+        Returns
+        -------
+        object dtype
+        """
+        dataset = self.dataset
+        return dataset.GetRasterBand(band)\
+                      .ReadAsArray(x_pixel, y_pixel, 1, 1)[0][0]
+
+    def get_val_latlon(self, longitude, latitude, band=1):
+        """Returns value of raster from a latitude and longitude point.
+
+        Parameters
+        ----------
+        longitude: float
+            The longitude of the cell center.
+        latitude:  float
+            The latitude of the cell center.
+        band: int, optional
+            Band number (1-based). Default is 1.
+
+        Returns
+        -------
+        object dtype
+        """
+        x_pixel, y_pixel = self.lonlat2pixel(longitude, latitude)
+        return self.get_val(x_pixel, y_pixel, band)
+
+    def get_val_coord(self, x_coord, y_coord, band=1):
+        """Returns value of raster from a projected coordinate point.
+
+        Parameters
+        ----------
+        x_coord: float
+            The projected x coordinate of the cell center.
+        y_coord:  float
+            The projected y coordinate of the cell center.
+        band: int, optional
+            Band number (1-based). Default is 1.
+
+        Returns
+        -------
+        object dtype
+        """
+        x_pixel, y_pixel = self.coord2pixel(x_coord, y_coord)
+        return self.get_val(x_pixel, y_pixel, band)
+
+    def _group_by_block(self, block_size, x_pixels, y_pixels):
+        """Returns (x_off, y_off, point_ids) of the native blocks
+        containing the points"""
+        if x_pixels.size == 0:
+            return []
+        block_x_size, block_y_size = block_size
+        num_x_blocks = (self.x_size + block_x_size - 1) // block_x_size
+        block_ids = ((y_pixels // block_y_size) * num_x_blocks +
+                     x_pixels // block_x_size)
+
+        # group the points by block
+        order = np.argsort(block_ids, kind='mergesort')
+        sorted_ids = block_ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        ends = np.r_[starts[1:], sorted_ids.size]
+        return [(int(sorted_ids[start] % num_x_blocks) * block_x_size,
+                 int(sorted_ids[start] // num_x_blocks) * block_y_size,
+                 order[start:end])
+                for start, end in zip(starts, ends)]
+
+    def _get_block_vals(self, raster_band, block_groups, x_pixels, y_pixels):
+        """Samples a raster band reading each native block only once"""
+        block_x_size, block_y_size = raster_band.GetBlockSize()
+        vals = np.empty(x_pixels.size,
+                        dtype=gdal_array.GDALTypeCodeToNumericTypeCode(
+                            raster_band.DataType))
+        for x_off, y_off, point_ids in block_groups:
+            block_data = raster_band.ReadAsArray(
+                x_off, y_off,
+                min(block_x_size, self.x_size - x_off),
+                min(block_y_size, self.y_size - y_off))
+            vals[point_ids] = block_data[y_pixels[point_ids] - y_off,
+                                         x_pixels[point_ids] - x_off]
+        return vals
+
+    def get_vals(self, x_pixels, y_pixels, band=1, masked=True):
+        """Returns values of raster at many pixel locations.
+
+        The points are grouped by the native block of the raster
+        so that each block is only read once.
+
+        Parameters
+        ----------
+        x_pixels: :func:`numpy.array`
+            1D array of X pixel locations (0-based).
+        y_pixels: :func:`numpy.array`
+            1D array of Y pixel locations (0-based).
+        band: obj:`int`, optional
+            Band number (1-based). Default is 1. If 'all',
+            it will return the values for all of the bands.
+        masked: bool, optional
+            If True, the NoData values will be masked as well.
+            Default is True.
+
+        Returns
+        -------
+        :func:`numpy.ma.array`
+            Array of size N or (num_bands, N) if `band` is 'all'.
+            Points outside of the grid are masked.
+        """
+        x_pixels = np.asarray(x_pixels, dtype=np.int64)
+        y_pixels = np.asarray(y_pixels, dtype=np.int64)
+        valid = ((x_pixels >= 0) & (x_pixels < self.x_size) &
+                 (y_pixels >= 0) & (y_pixels < self.y_size))
+        x_valid = x_pixels[valid]
+        y_valid = y_pixels[valid]
+
+        band_ids = [band]
+        if band == 'all':
+            band_ids = range(1, self.num_bands + 1)
+
+        band_vals = []
+        band_masks = []
+        # bands with the same block size share the grouping
+        block_groups = {}
+        dataset = self.dataset
+        for band_id in band_ids:
+            raster_band = dataset.GetRasterBand(band_id)
+            block_size = tuple(raster_band.GetBlockSize())
+            if block_size not in block_groups:
+                block_groups[block_size] = self._group_by_block(
+                    block_size, x_valid, y_valid)
+            vals = np.zeros(x_pixels.shape,
+                            dtype=gdal_array.GDALTypeCodeToNumericTypeCode(
+                                raster_band.DataType))
+            vals[valid] = self._get_block_vals(raster_band,
+                                               block_groups[block_size],
+                                               x_valid, y_valid)
+            mask = ~valid
+            nodata_value = raster_band.GetNoDataValue()
+            if nodata_value is not None and masked:
+                mask |= (vals == nodata_value)
+            band_vals.append(vals)
+            band_masks.append(mask)
+
+        if band == 'all':
+            return np.ma.array(data=np.array(band_vals),
+                               mask=np.array(band_masks))
+        return np.ma.array(data=band_vals[0], mask=band_masks[0])
+
+    def get_vals_coord(self, x_coords, y_coords, band=1, masked=True):
+        """Returns values of raster from many projected coordinate points.
+
+        Parameters
+        ----------
+        x_coords: :func:`numpy.array`
+            1D array of projected x coordinates.
+        y_coords:  :func:`numpy.array`
+            1D array of projected y coordinates.
+        band: obj:`int`, optional
+            Band number (1-based). Default is 1. If 'all',
+            it will return the values for all of the bands.
+        masked: bool, optional
+            If True, the NoData values will be masked as well.
+            Default is True.
+
+        Returns
+        -------
+        :func:`numpy.ma.array`
+            See: :func:`~GDALGrid.get_vals`.
+        """
+        x_pixels, y_pixels = self.coord2pixel_array(x_coords, y_coords)[:2]
+        return self.get_vals(x_pixels, y_pixels, band, masked)
+
+    def get_vals_latlon(self, longitudes, latitudes, band=1, masked=True):
+        """Returns values of raster from many latitude and longitude points.
+
+        Parameters
+        ----------
+        longitudes: :func:`numpy.array`
+            1D array of longitudes.
+        latitudes:  :func:`numpy.array`
+            1D array of latitudes.
+        band: obj:`int`, optional
+            Band number (1-based). Default is 1. If 'all',
+            it will return the values for all of the bands.
+        masked: bool, optional
+            If True, the NoData values will be masked as well.
+            Default is True.
+
+        Returns
+        -------
+        :func:`numpy.ma.array`
+            See: :func:`~GDALGrid.get_vals`.
+        """
+        x_pixels, y_pixels = self.lonlat2pixel_array(longitudes,
+                                                     latitudes)[:2]
+        return self.get_vals(x_pixels, y_pixels, band, masked)
@@ -16,10 +16,12 @@ Documentation can be found at `_gazar Documentation HOWTO`_.
 # default modules
 from os import path
 # external modules
-from osgeo import gdal, ogr, osr
+from osgeo import gdal, ogr
 # local modules
-from .grid import (GDALGrid, load_raster, project_to_geographic,
-                   utm_proj_from_latlon)
+from .grid import GDALGrid, load_raster
+from .srs import get_spatial_reference, get_transformation
+from .transform import project_to_geographic, utm_proj_from_latlon
+from .writers import _creation_option_list, write_gtiff
 
 
 def reproject_layer(in_path, out_path, out_spatial_ref):
@@ -49,8 +51,7 @@ def reproject_layer(in_path, out_path, out_spatial_ref):
     in_spatial_ref = in_layer.GetSpatialRef()
 
     # create the CoordinateTransformation
-    coord_trans = osr.CoordinateTransformation(in_spatial_ref,
-                                               out_spatial_ref)
+    coord_trans = get_transformation(in_spatial_ref, out_spatial_ref)
 
     # create the output layer
     output_shapefile = out_path
@@ -113,7 +114,9 @@ def rasterize_shapefile(shapefile_path,
                         convert_to_utm=False,
                         raster_dtype=gdal.GDT_Int32,
                         raster_nodata=-9999,
-                        as_gdal_grid=False):
+                        as_gdal_grid=False,
+                        creation_options=None,
+                        cog=False):
     """
     Convert shapefile to raster from specified attribute
 
@@ -145,6 +148,13 @@ def rasterize_shapefile(shapefile_path,
             No data value for output raster. Default is -9999,
         as_gdal_grid: bool, optional
             Return as :func:`~GDALGrid`. Default is False.
+        creation_options: :obj:`list` or :obj:`dict`, optional
+            GDAL creation options for the GeoTIFF driver when writing
+            to `out_raster_path`.
+            See: :func:`~gazar.writers.gtiff_creation_options`.
+        cog: bool, optional
+            If True, it will write a Cloud-Optimized GeoTIFF with
+            internal overviews to `out_raster_path`. Default is False.
 
     Returns
     -------
@@ -182,14 +192,18 @@ def rasterize_shapefile(shapefile_path,
         gr.to_grass_ascii(new_grid, print_nodata=False)
 
     """
-    if as_gdal_grid:
-        raster_driver = gdal.GetDriverByName('MEM')
-        out_raster_path = ''
-    elif out_raster_path is not None:
-        raster_driver = gdal.GetDriverByName('GTiff')
-    else:
+    if not as_gdal_grid and out_raster_path is None:
         raise ValueError("Either out_raster_path or as_gdal_grid "
                          "need to be set ...")
+    if as_gdal_grid or cog:
+        # in memory raster (copied to the Cloud-Optimized GeoTIFF)
+        raster_driver = gdal.GetDriverByName('MEM')
+        target_path = ''
+        target_options = None
+    else:
+        raster_driver = gdal.GetDriverByName('GTiff')
+        target_path = out_raster_path
+        target_options = creation_options
 
     # open the data source
     shapefile = ogr.Open(shapefile_path)
@@ -215,8 +229,7 @@ def rasterize_shapefile(shapefile_path,
         shapefile_basename = path.splitext(shapefile_path)[0]
         reprojected_layer = "{shapefile_basename}_projected.shp" \
             .format(shapefile_basename=shapefile_basename)
-        out_spatial_ref = osr.SpatialReference()
-        out_spatial_ref.ImportFromWkt(raster_wkt_proj)
+        out_spatial_ref = get_spatial_reference(raster_wkt_proj)
         reproject_layer(shapefile_path, reprojected_layer, out_spatial_ref)
         reprojected_shapefile = ogr.Open(reprojected_layer)
         source_layer = reprojected_shapefile.GetLayer(0)
@@ -248,11 +261,13 @@ def rasterize_shapefile(shapefile_path,
         raise ValueError("Invalid parameters for output grid entered ...")
 
     # geotiff
-    target_ds = raster_driver.Create(out_raster_path,
+    target_ds = raster_driver.Create(target_path,
                                      x_num_cells,
                                      y_num_cells,
                                      1,
-                                     raster_dtype)
+                                     raster_dtype,
+                                     options=_creation_option_list(
+                                         target_options))
 
     target_ds.SetGeoTransform(match_geotrans)
     target_ds.SetProjection(match_proj)
@@ -286,8 +301,11 @@ def rasterize_shapefile(shapefile_path,
                                              error_threshold)
         if not as_gdal_grid:
             # Create the final warped raster
-            target_ds = gdal.GetDriverByName('GTiff') \
-                .CreateCopy(out_raster_path, target_ds)
+            target_ds = write_gtiff(target_ds, out_raster_path,
+                                    creation_options, cog)
+    elif cog and not as_gdal_grid:
+        target_ds = write_gtiff(target_ds, out_raster_path,
+                                creation_options, cog)
 
     # clean up
     if reprojected_layer is not None:
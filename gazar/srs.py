@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.srs
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.srs docstring
+This module contains a shared cache of :func:`osr.SpatialReference`,
+:func:`osr.CoordinateTransformation` and :func:`pyproj.Transformer`
+objects.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# default modules
+from collections import namedtuple, OrderedDict
+import threading
+import weakref
+
+# external modules
+from osgeo import osr
+import pyproj
+try:
+    from pyproj import Transformer
+except ImportError:  # pyproj < 2.1
+    Transformer = None
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LRUCache(object):
+    """
+    Thread safe, bounded cache that discards the least
+    recently used items first.
+
+    Parameters
+    ----------
+    maxsize: int, optional
+        Maximum number of items in the cache. Default is 128.
+
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key, factory):
+        """Returns the cached item or creates it with `factory`.
+
+        Parameters
+        ----------
+        key: hashable
+            The key for the item.
+        factory: callable
+            Function without arguments that creates the item
+            when it is not in the cache. It is called without
+            holding the lock of the cache.
+
+        Returns
+        -------
+        object
+        """
+        with self._lock:
+            try:
+                item = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items[key] = item
+                return item
+
+        # create the item without blocking the other threads
+        item = factory()
+        with self._lock:
+            # keep the item if another thread was faster
+            item = self._items.pop(key, item)
+            self._items[key] = item
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            return item
+
+    def discard(self, key):
+        """Removes the item from the cache if it exists.
+
+        Parameters
+        ----------
+        key: hashable
+            The key for the item.
+        """
+        with self._lock:
+            self._items.pop(key, None)
+
+    def keys(self):
+        """Returns the keys of the cached items.
+
+        Returns
+        -------
+        :obj:`list`
+        """
+        with self._lock:
+            return list(self._items)
+
+    def info(self):
+        """Returns the statistics of the cache.
+
+        Returns
+        -------
+        :obj:`CacheInfo`
+            (hits, misses, maxsize, currsize)
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses,
+                             self.maxsize, len(self._items))
+
+    def resize(self, maxsize):
+        """Changes the maximum number of items in the cache.
+
+        Parameters
+        ----------
+        maxsize: int
+            Maximum number of items in the cache.
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """Removes all items and resets the statistics."""
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class ThreadLocalLRUCache(object):
+    """
+    Bounded cache with a separate :obj:`LRUCache` for each thread
+    for items that cannot be used by several threads at once.
+
+    Parameters
+    ----------
+    maxsize: int, optional
+        Maximum number of items in the cache of each thread.
+        Default is 128.
+
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._caches = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _thread_cache(self):
+        """Returns the cache of the current thread"""
+        try:
+            return self._local.cache
+        except AttributeError:
+            with self._lock:
+                cache = self._local.cache = LRUCache(self.maxsize)
+                self._caches.add(cache)
+            return cache
+
+    def _all_caches(self):
+        """Returns the caches of all threads"""
+        with self._lock:
+            return list(self._caches)
+
+    def get(self, key, factory):
+        """Returns the item of the current thread or creates it
+        with `factory`. See: :func:`~LRUCache.get`."""
+        return self._thread_cache().get(key, factory)
+
+    def info(self):
+        """Returns the combined statistics of the caches of all threads.
+
+        Returns
+        -------
+        :obj:`CacheInfo`
+            (hits, misses, maxsize, currsize)
+        """
+        infos = [cache.info() for cache in self._all_caches()]
+        return CacheInfo(sum(info.hits for info in infos),
+                         sum(info.misses for info in infos),
+                         self.maxsize,
+                         sum(info.currsize for info in infos))
+
+    def resize(self, maxsize):
+        """Changes the maximum number of items in the cache of each thread.
+
+        Parameters
+        ----------
+        maxsize: int
+            Maximum number of items in the cache of each thread.
+        """
+        with self._lock:
+            self.maxsize = maxsize
+        for cache in self._all_caches():
+            cache.resize(maxsize)
+
+    def clear(self):
+        """Removes all items and resets the statistics of all threads."""
+        for cache in self._all_caches():
+            cache.clear()
+
+
+SPATIAL_REFERENCE_CACHE = ThreadLocalLRUCache()
+TRANSFORMATION_CACHE = ThreadLocalLRUCache()
+TRANSFORMER_CACHE = ThreadLocalLRUCache()
+# projection inputs (Ex. WKT strings) to their canonical keys
+CANONICAL_KEY_CACHE = LRUCache(maxsize=256)
+
+
+def _input_key(projection):
+    """Returns the hashable key of the projection input"""
+    if isinstance(projection, osr.SpatialReference):
+        return projection.ExportToWkt()
+    try:
+        return 'EPSG:{0}'.format(int(projection))
+    except (TypeError, ValueError):
+        pass
+    if isinstance(projection, (str, type(u''))):
+        return projection
+    raise ValueError("Unsupported projection {0!r}. Use an EPSG code, "
+                     "a WKT string or a SpatialReference ..."
+                     .format(projection))
+
+
+def _create_canonical_key(input_key):
+    """Returns 'EPSG:<code>' if the projection is identified as an
+    EPSG projection and the normalized WKT string otherwise"""
+    if input_key.startswith('EPSG:'):
+        return input_key
+    sp_ref = osr.SpatialReference()
+    sp_ref.SetFromUserInput(input_key)
+    try:
+        sp_ref.AutoIdentifyEPSG()
+    except RuntimeError:
+        pass
+    epsg_code = sp_ref.GetAuthorityCode(None)
+    if sp_ref.GetAuthorityName(None) == 'EPSG' and epsg_code:
+        epsg_ref = osr.SpatialReference()
+        if epsg_ref.ImportFromEPSG(int(epsg_code)) == 0 and \
+                sp_ref.IsSame(epsg_ref):
+            return 'EPSG:{0}'.format(epsg_code)
+    return sp_ref.ExportToWkt()
+
+
+def _spatial_reference_key(projection):
+    """Returns the canonical key for a projection, so that the
+    same projection given as EPSG code or WKT shares one entry"""
+    input_key = _input_key(projection)
+    return CANONICAL_KEY_CACHE.get(
+        input_key, lambda: _create_canonical_key(input_key))
+
+
+def _create_spatial_reference(key):
+    """Parses the canonical key into a SpatialReference"""
+    sp_ref = osr.SpatialReference()
+    if key.startswith('EPSG:'):
+        sp_ref.ImportFromEPSG(int(key[5:]))
+    else:
+        sp_ref.SetFromUserInput(key)
+    # keep longitude, latitude order with GDAL 3+
+    if hasattr(osr, 'OAMS_TRADITIONAL_GIS_ORDER'):
+        sp_ref.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    return sp_ref
+
+
+def get_spatial_reference(projection):
+    """Returns a cached :func:`osr.SpatialReference` for the projection.
+
+    Each thread has its own cache.
+
+    .. warning:: The returned object is shared by all callers in the
+                 thread. Do not modify it (Ex. with `AutoIdentifyEPSG`
+                 or `MorphToESRI`). Use `Clone` to get a copy instead.
+
+    Parameters
+    ----------
+    projection: int or :obj:`str` or :func:`osr.SpatialReference`
+        EPSG code, WKT string or spatial reference.
+
+    Returns
+    -------
+    :func:`osr.SpatialReference`
+    """
+    key = _spatial_reference_key(projection)
+    return SPATIAL_REFERENCE_CACHE.get(
+        key, lambda: _create_spatial_reference(key))
+
+
+def get_transformation(src_projection, dst_projection):
+    """Returns a cached :func:`osr.CoordinateTransformation`.
+
+    A :func:`osr.CoordinateTransformation` cannot be used by
+    several threads at once, so each thread has its own cache.
+
+    Parameters
+    ----------
+    src_projection: int or :obj:`str` or :func:`osr.SpatialReference`
+        Source EPSG code, WKT string or spatial reference.
+    dst_projection: int or :obj:`str` or :func:`osr.SpatialReference`
+        Destination EPSG code, WKT string or spatial reference.
+
+    Returns
+    -------
+    :func:`osr.CoordinateTransformation`
+    """
+    src_key = _spatial_reference_key(src_projection)
+    dst_key = _spatial_reference_key(dst_projection)
+
+    def create_transformation():
+        """create the transformation from the cached projections"""
+        return osr.CoordinateTransformation(get_spatial_reference(src_key),
+                                            get_spatial_reference(dst_key))
+
+    return TRANSFORMATION_CACHE.get((src_key, dst_key),
+                                    create_transformation)
+
+
+# shim with the transform method of pyproj.Transformer for pyproj < 2.1
+class _ProjTransformer(object):  # pylint: disable=too-few-public-methods
+    """Transforms arrays of points with pyproj < 2.1"""
+    def __init__(self, src_proj4, dst_proj4):
+        self._src_proj = pyproj.Proj(src_proj4)
+        self._dst_proj = pyproj.Proj(dst_proj4)
+
+    def transform(self, x_coords, y_coords):
+        """Transforms the coordinate arrays"""
+        return pyproj.transform(self._src_proj, self._dst_proj,
+                                x_coords, y_coords)
+
+
+def get_transformer(src_projection, dst_projection):
+    """Returns a cached :func:`pyproj.Transformer` that transforms
+    whole coordinate arrays in one call.
+
+    The coordinates are in (x, y) or (longitude, latitude) order.
+    Each thread has its own cache.
+
+    Parameters
+    ----------
+    src_projection: int or :obj:`str` or :func:`osr.SpatialReference`
+        Source EPSG code, WKT string or spatial reference.
+    dst_projection: int or :obj:`str` or :func:`osr.SpatialReference`
+        Destination EPSG code, WKT string or spatial reference.
+
+    Returns
+    -------
+    :func:`pyproj.Transformer`
+        Object with a `transform(x_coords, y_coords)` method.
+    """
+    src_key = _spatial_reference_key(src_projection)
+    dst_key = _spatial_reference_key(dst_projection)
+
+    def create_transformer():
+        """create the transformer from the canonical keys"""
+        if Transformer is not None:
+            return Transformer.from_crs(src_key, dst_key, always_xy=True)
+        return _ProjTransformer(
+            get_spatial_reference(src_key).ExportToProj4(),
+            get_spatial_reference(dst_key).ExportToProj4())
+
+    return TRANSFORMER_CACHE.get((src_key, dst_key), create_transformer)
+
+
+def cache_info():
+    """Returns the statistics of the projection caches.
+
+    Returns
+    -------
+    :obj:`dict`
+        :obj:`CacheInfo` for 'spatial_reference', 'transformation'
+        and 'transformer'.
+    """
+    return {'spatial_reference': SPATIAL_REFERENCE_CACHE.info(),
+            'transformation': TRANSFORMATION_CACHE.info(),
+            'transformer': TRANSFORMER_CACHE.info()}
+
+
+def set_cache_size(spatial_reference=None, transformation=None):
+    """Changes the maximum size of the projection caches.
+
+    Parameters
+    ----------
+    spatial_reference: int, optional
+        Maximum number of spatial references in the cache
+        of each thread.
+    transformation: int, optional
+        Maximum number of transformations and transformers
+        in the caches of each thread.
+    """
+    if spatial_reference is not None:
+        SPATIAL_REFERENCE_CACHE.resize(spatial_reference)
+    if transformation is not None:
+        TRANSFORMATION_CACHE.resize(transformation)
+        TRANSFORMER_CACHE.resize(transformation)
+
+
+def clear_cache():
+    """Removes all items from the projection caches."""
+    SPATIAL_REFERENCE_CACHE.clear()
+    TRANSFORMATION_CACHE.clear()
+    TRANSFORMER_CACHE.clear()
+    CANONICAL_KEY_CACHE.clear()
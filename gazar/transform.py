@@ -0,0 +1,541 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.transform
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.transform docstring
+This module contains the coordinate transformations of the grids.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# external modules
+import numpy as np
+from osgeo import osr
+import utm
+
+# local modules
+from .srs import (get_spatial_reference, get_transformation,
+                  get_transformer)
+
+
+def utm_proj_from_latlon(latitude, longitude, as_wkt=False, as_osr=False):
+    """
+    Returns UTM projection information from a latitude,
+    longitude corrdinate pair.
+
+    Parameters
+    ----------
+    latitude : float
+        The center latitude.
+    longitude:  float
+        The center longitude.
+    as_wkt:  bool, optional
+        If True, will return the WKT projection string.
+    as_osr: bool, optional
+        If True, will return the :func:`osr.SpatialReference` object.
+
+    Returns
+    -------
+    :obj:`str` or :func:`osr.SpatialReference`
+        Defaults to the proj.4 string.
+    """
+    # get utm coordinates
+    utm_centroid_info = utm.from_latlon(latitude, longitude)
+    zone_number, zone_letter = utm_centroid_info[2:]
+
+    # METHOD USING SetUTM. Not sure if better/worse
+    sp_ref = osr.SpatialReference()
+
+    south_string = ''
+    if zone_letter < 'N':
+        south_string = ', +south'
+    proj4_utm_string = ('+proj=utm +zone={zone_number}{zone_letter}'
+                        '{south_string} +ellps=WGS84 +datum=WGS84 '
+                        '+units=m +no_defs')\
+        .format(zone_number=abs(zone_number),
+                zone_letter=zone_letter,
+                south_string=south_string)
+    ret_val = sp_ref.ImportFromProj4(proj4_utm_string)
+    if ret_val == 0:
+        north_zone = True
+        if zone_letter < 'N':
+            north_zone = False
+        sp_ref.SetUTM(abs(zone_number), north_zone)
+
+    sp_ref.AutoIdentifyEPSG()
+
+    if as_osr:  # pylint: disable=no-else-return
+        return sp_ref
+    elif as_wkt:
+        return sp_ref.ExportToWkt()
+    return sp_ref.ExportToProj4()
+
+
+def project_to_geographic(x_coord, y_coord, osr_projetion):
+    """Project point to EPSG:4326
+
+    Parameters
+    ----------
+    x_coord : float
+        The point x-coordinate.
+    y_coord:  float
+        The point y-coordinate.
+    osr_projetion:  :func:`osr.SpatialReference`
+        The projection for the point.
+
+    Returns
+    -------
+    :obj:`tuple`
+        The projected point coordinates.
+        (x_coord, y_coord)
+    """
+    # Make sure projected into global projection
+    trans = get_transformation(osr_projetion, 4326)
+    return trans.TransformPoint(x_coord, y_coord)[:2]
+
+
+def transform_points(transformation, x_coords, y_coords):
+    """Transform arrays of points in a single call.
+
+    Parameters
+    ----------
+    transformation : :func:`pyproj.Transformer`
+        The transformation to apply to the points.
+        See: :func:`gazar.srs.get_transformer`. An
+        :func:`osr.CoordinateTransformation` is also accepted, but it
+        converts every point to a Python object.
+    x_coords: :func:`numpy.array`
+        1D array of x coordinates.
+    y_coords:  :func:`numpy.array`
+        1D array of y coordinates.
+
+    Returns
+    -------
+    :obj:`tuple`
+        The transformed point coordinates as arrays.
+        (x_coords, y_coords)
+    """
+    x_coords = np.asarray(x_coords, dtype=np.float64).ravel()
+    y_coords = np.asarray(y_coords, dtype=np.float64).ravel()
+    if x_coords.size == 0:
+        return x_coords, y_coords
+    if hasattr(transformation, 'transform'):
+        x_coords, y_coords = transformation.transform(x_coords, y_coords)
+        return (np.asarray(x_coords, dtype=np.float64),
+                np.asarray(y_coords, dtype=np.float64))
+    points = np.array(transformation.TransformPoints(
+        list(zip(x_coords.tolist(), y_coords.tolist()))))
+    return points[:, 0], points[:, 1]
+
+
+class TransformMethodsMixin(object):
+    """Pixel and coordinate methods of :func:`~gazar.grid.GDALGrid`.
+
+    Uses the `affine`, `inverse_affine`, `projection`, `wkt`,
+    `x_size` and `y_size` attributes of the grid.
+    """
+    def bounds(self, as_geographic=False, as_utm=False, as_projection=None):
+        """Returns bounding coordinates for the dataset.
+
+        Parameters
+        ----------
+        as_geographic : bool, optional
+            If True, this will return the bounds in EPSG:4326.
+            Default is False.
+        as_utm:  bool, optional
+            If True, it will attempt to find the UTM zone and
+            will return bounds in that UTM zone.
+        as_projection:  :func:`osr.SpatialReference`, optional
+            Output projection for bounds.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (x_min, x_max, y_min, y_max)
+            Bounds for the grid in the format
+
+        """
+        new_proj = None
+        x_min, y_min = self.affine * (0, self.y_size)
+        x_max, y_max = self.affine * (self.x_size, 0)
+
+        if as_geographic:
+            new_proj = get_spatial_reference(4326)
+        elif as_utm:
+            lon_min, lat_max = project_to_geographic(x_min, y_max,
+                                                     self.projection)
+            lon_max, lat_min = project_to_geographic(x_max, y_min,
+                                                     self.projection)
+            # convert to UTM
+            new_proj = utm_proj_from_latlon((lat_min + lat_max) / 2.0,
+                                            (lon_min + lon_max) / 2.0,
+                                            as_osr=True)
+        elif as_projection:
+            new_proj = as_projection
+
+        if new_proj is not None:
+            ggrid = self.to_projection(new_proj)
+            return ggrid.bounds()
+
+        return x_min, x_max, y_min, y_max
+
+    def pixel2coord(self, col, row):
+        """Returns global coordinates to pixel center using base-0 raster index.
+
+        Parameters
+        ----------
+        col: int
+            The 0-based column index.
+        row:  int
+            The 0-based row index.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (x_coord, y_coord) - The x, y coordinate of the pixel
+            center in the dataset's projection.
+
+        """
+        if col >= self.x_size:
+            raise IndexError("Column index out of bounds...")
+        if row >= self.y_size:
+            raise IndexError("Row index is out of bounds ...")
+        return self.affine * (col + 0.5, row + 0.5)
+
+    def coord2pixel(self, x_coord, y_coord):
+        """Returns base-0 raster index using global coordinates to pixel center
+
+        Parameters
+        ----------
+        x_coord: float
+            The projected x coordinate of the cell center.
+        y_coord:  float
+            The projected y coordinate of the cell center.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (col, row) - The 0-based column and row index of the pixel.
+        """
+        col, row = self.inverse_affine * (x_coord, y_coord)
+        if col > self.x_size or col < 0:
+            raise IndexError("Longitude {0} is out of bounds ..."
+                             .format(x_coord))
+        if row > self.y_size or row < 0:
+            raise IndexError("Latitude {0} is out of bounds ..."
+                             .format(y_coord))
+
+        return int(col), int(row)
+
+    def pixel2coord_array(self, cols, rows):
+        """Returns global coordinates to pixel centers for arrays of
+        base-0 raster indices.
+
+        Parameters
+        ----------
+        cols: :func:`numpy.array`
+            1D array of 0-based column indices.
+        rows:  :func:`numpy.array`
+            1D array of 0-based row indices.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (x_coords, y_coords, valid) - The x, y coordinates of the
+            pixel centers in the dataset's projection and a boolean
+            array that is False where the index is outside of the grid.
+
+        """
+        cols = np.asarray(cols)
+        rows = np.asarray(rows)
+        valid = ((cols >= 0) & (cols < self.x_size) &
+                 (rows >= 0) & (rows < self.y_size))
+        x_coords, y_coords = self.affine * (cols + 0.5, rows + 0.5)
+        return x_coords, y_coords, valid
+
+    def coord2pixel_array(self, x_coords, y_coords):
+        """Returns base-0 raster indices for arrays of global coordinates.
+
+        Unlike :func:`~GDALGrid.coord2pixel`, points outside of the grid
+        do not raise an error. They are flagged in the returned mask.
+
+        Parameters
+        ----------
+        x_coords: :func:`numpy.array`
+            1D array of projected x coordinates.
+        y_coords:  :func:`numpy.array`
+            1D array of projected y coordinates.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (cols, rows, valid) - The 0-based column and row indices of
+            the pixels and a boolean array that is False where the
+            coordinate is outside of the grid. The indices of points
+            outside of the grid are set to -1.
+        """
+        cols, rows = self.inverse_affine * (
+            np.asarray(x_coords, dtype=np.float64),
+            np.asarray(y_coords, dtype=np.float64))
+        with np.errstate(invalid='ignore'):
+            valid = ((cols >= 0) & (cols < self.x_size) &
+                     (rows >= 0) & (rows < self.y_size))
+        cols = np.floor(np.where(valid, cols, -1)).astype(np.int64)
+        rows = np.floor(np.where(valid, rows, -1)).astype(np.int64)
+        return cols, rows, valid
+
+    def pixel2lonlat(self, col, row):
+        """Returns latitude and longitude to pixel center using base-0 raster index
+
+        Parameters
+        ----------
+        col: int
+            The 0-based column index.
+        row:  int
+            The 0-based row index.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (longitude, latitude) - The lat, lon of the pixel
+            center in the dataset's projection.
+        """
+        x_coord, y_coord = self.pixel2coord(col, row)
+        longitude, latitude = project_to_geographic(x_coord, y_coord,
+                                                    self.projection)
+        return longitude, latitude
+
+    def lonlat2pixel(self, longitude, latitude):
+        """Returns base-0 raster index using longitude and latitude of pixel center
+
+        Parameters
+        ----------
+        longitude: float
+            The longitude of the cell center.
+        latitude:  float
+            The latitude of the cell center.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (col, row) - The 0-based column and row index of the pixel.
+        """
+        transx = get_transformation(4326, self.wkt)
+        x_coord, y_coord = transx.TransformPoint(longitude, latitude)[:2]
+        return self.coord2pixel(x_coord, y_coord)
+
+    def pixel2lonlat_array(self, cols, rows):
+        """Returns longitudes and latitudes of pixel centers for arrays
+        of base-0 raster indices in a single transformation.
+
+        Parameters
+        ----------
+        cols: :func:`numpy.array`
+            1D array of 0-based column indices.
+        rows:  :func:`numpy.array`
+            1D array of 0-based row indices.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (longitudes, latitudes, valid) - The lon, lat of the pixel
+            centers and a boolean array that is False where the index
+            is outside of the grid.
+        """
+        x_coords, y_coords, valid = self.pixel2coord_array(cols, rows)
+        transx = get_transformer(self.wkt, 4326)
+        longitudes, latitudes = transform_points(transx, x_coords, y_coords)
+        return longitudes, latitudes, valid
+
+    def lonlat2pixel_array(self, longitudes, latitudes):
+        """Returns base-0 raster indices for arrays of longitudes
+        and latitudes in a single transformation.
+
+        Parameters
+        ----------
+        longitudes: :func:`numpy.array`
+            1D array of longitudes.
+        latitudes:  :func:`numpy.array`
+            1D array of latitudes.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (cols, rows, valid) - See: :func:`~GDALGrid.coord2pixel_array`.
+        """
+        transx = get_transformer(4326, self.wkt)
+        x_coords, y_coords = transform_points(transx, longitudes, latitudes)
+        return self.coord2pixel_array(x_coords, y_coords)
+
+    @property
+    def x_coords(self):
+        """Returns x coordinate array representing the grid.
+        Use method from: https://github.com/pydata/xarray/pull/1712
+
+        Returns
+        -------
+        x_coords: :func:`numpy.array`
+            The X coordinate array.
+        """
+        x_coords, _ = (np.arange(self.x_size) + 0.5,
+                       np.zeros(self.x_size) + 0.5) * self.affine
+        return x_coords
+
+    @property
+    def y_coords(self):
+        """Returns y coordinate array representing the grid.
+        Use method from: https://github.com/pydata/xarray/pull/1712
+
+        Returns
+        -------
+        y_coords: :func:`numpy.array`
+            The Y coordinate array.
+        """
+        _, y_coords = (np.zeros(self.y_size) + 0.5,
+                       np.arange(self.y_size) + 0.5) * self.affine
+        return y_coords
+
+    @property
+    def latlon(self):
+        """Returns latitude and longitude arrays representing the grid.
+
+        Returns
+        -------
+        proj_lats: :func:`numpy.array`
+            The latitude array.
+        proj_lons: :func:`numpy.array`
+            The longitude array.
+        """
+        return self.get_latlon()
+
+    @property
+    def is_geographic(self):
+        """bool: True if the projection is EPSG:4326."""
+        return self._cached(
+            'is_geographic',
+            lambda: bool(self.projection.IsSame(get_spatial_reference(4326))))
+
+    def iter_latlon(self, chunk_size=None, dtype=np.float64):
+        """Yields latitude and longitude arrays for chunks of rows.
+
+        Parameters
+        ----------
+        chunk_size: int, optional
+            Number of rows in each chunk. Default is about
+            one million cells per chunk.
+        dtype: :func:`numpy.dtype`, optional
+            Data type of the output arrays. Default is float64.
+
+        Yields
+        ------
+        row_slice: :obj:`slice`
+            The rows of the grid in the chunk.
+        proj_lats: :func:`numpy.array`
+            The latitude array of the chunk.
+        proj_lons: :func:`numpy.array`
+            The longitude array of the chunk.
+        """
+        if chunk_size is None:
+            chunk_size = max(1, 2**20 // self.x_size)
+        x_coords = self.x_coords
+        y_coords = self.y_coords
+        transx = None
+        if not self.is_geographic:
+            transx = get_transformer(self.wkt, 4326)
+
+        for row_start in range(0, self.y_size, chunk_size):
+            row_slice = slice(row_start,
+                              min(row_start + chunk_size, self.y_size))
+            x_2d_coords, y_2d_coords = np.meshgrid(x_coords,
+                                                   y_coords[row_slice])
+            if transx is not None:
+                proj_lons, proj_lats = transform_points(transx,
+                                                        x_2d_coords,
+                                                        y_2d_coords)
+                x_2d_coords = proj_lons.reshape(x_2d_coords.shape)
+                y_2d_coords = proj_lats.reshape(y_2d_coords.shape)
+            yield (row_slice,
+                   y_2d_coords.astype(dtype, copy=False),
+                   x_2d_coords.astype(dtype, copy=False))
+
+    def get_latlon(self, dtype=np.float64, chunk_size=None,
+                   broadcast=False, out=None):
+        """Returns latitude and longitude arrays representing the grid.
+
+        The coordinates are transformed in chunks of rows to limit
+        the memory used by the transformation.
+
+        Parameters
+        ----------
+        dtype: :func:`numpy.dtype`, optional
+            Data type of the output arrays. Default is float64.
+        chunk_size: int, optional
+            Number of rows transformed at a time.
+            See: :func:`~GDALGrid.iter_latlon`.
+        broadcast: bool, optional
+            If True and the grid is in EPSG:4326, it will skip the
+            transformation and return 1D arrays shaped (y_size, 1)
+            and (1, x_size) that broadcast to the grid.
+            Default is False.
+        out: :obj:`tuple`, optional
+            (proj_lats, proj_lons) arrays of shape (y_size, x_size)
+            to write the output into.
+
+        Returns
+        -------
+        proj_lats: :func:`numpy.array`
+            The latitude array.
+        proj_lons: :func:`numpy.array`
+            The longitude array.
+        """
+        if self.is_geographic and (broadcast or out is not None):
+            proj_lats = self.y_coords.astype(dtype)[:, None]
+            proj_lons = self.x_coords.astype(dtype)[None, :]
+            if out is None:
+                return proj_lats, proj_lons
+            np.copyto(out[0], proj_lats)
+            np.copyto(out[1], proj_lons)
+            return out
+
+        if out is None:
+            out = (np.empty((self.y_size, self.x_size), dtype=dtype),
+                   np.empty((self.y_size, self.x_size), dtype=dtype))
+        for row_slice, proj_lats, proj_lons in \
+                self.iter_latlon(chunk_size, dtype):
+            out[0][row_slice] = proj_lats
+            out[1][row_slice] = proj_lons
+        return out
+
+    def bounds2window(self, bounds):
+        """Returns the pixel window covering projected bounds.
+
+        The window is snapped outward to the pixel edges and
+        clipped to the grid.
+
+        Parameters
+        ----------
+        bounds: :obj:`tuple`
+            (x_min, x_max, y_min, y_max) in the grid's projection.
+
+        Returns
+        -------
+        :obj:`tuple`
+            (x_off, y_off, x_size, y_size) - The pixel window.
+        """
+        x_min, x_max, y_min, y_max = bounds
+        col_a, row_a = self.inverse_affine * (x_min, y_max)
+        col_b, row_b = self.inverse_affine * (x_max, y_min)
+        # small tolerance to not grab a pixel due to rounding errors
+        col_start = max(0, int(np.floor(min(col_a, col_b) + 1e-9)))
+        row_start = max(0, int(np.floor(min(row_a, row_b) + 1e-9)))
+        col_end = min(self.x_size, int(np.ceil(max(col_a, col_b) - 1e-9)))
+        row_end = min(self.y_size, int(np.ceil(max(row_a, row_b) - 1e-9)))
+        if col_end <= col_start or row_end <= row_start:
+            raise ValueError("Bounds {0} do not intersect the grid ..."
+                             .format(bounds))
+        return col_start, row_start, col_end - col_start, row_end - row_start
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.warp
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.warp docstring
+This module contains reusable nearest neighbour warp plans for
+reprojecting many grids that share the same geometry.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# external modules
+from affine import Affine
+import numpy as np
+from osgeo import gdal, gdalconst
+
+# local modules
+from .grid import ArrayGrid, load_raster
+from .srs import get_spatial_reference, get_transformer
+from .transform import transform_points
+
+
+def _read_grid_data(grid, band):
+    """Returns the array of the band(s) of the grid and the
+    NoData value of the (first) band"""
+    src_ds = load_raster(grid)[0]
+    nodata_value = src_ds.GetRasterBand(
+        1 if band == 'all' else band).GetNoDataValue()
+    if band == 'all':
+        return src_ds.ReadAsArray(), nodata_value
+    return src_ds.GetRasterBand(band).ReadAsArray(), nodata_value
+
+
+def _source_pixel_index(transformation, dst_geotransform, dst_cols,
+                        dst_rows, src_geotransform, src_shape,
+                        index_dtype=np.int64):
+    """Returns the flat index of the source pixel containing each
+    destination pixel position (0 outside of the source grid) and
+    where the positions are inside of the source grid"""
+    src_y_size, src_x_size = src_shape
+    x_coords, y_coords = transform_points(
+        transformation,
+        *(Affine.from_gdal(*dst_geotransform) *
+          (np.ravel(dst_cols), np.ravel(dst_rows))))
+    src_cols, src_rows = \
+        ~Affine.from_gdal(*src_geotransform) * (x_coords, y_coords)
+    with np.errstate(invalid='ignore'):
+        src_cols = np.floor(src_cols)
+        src_rows = np.floor(src_rows)
+        valid = ((src_cols >= 0) & (src_cols < src_x_size) &
+                 (src_rows >= 0) & (src_rows < src_y_size))
+    src_index = np.zeros(src_cols.shape, dtype=index_dtype)
+    src_index[valid] = (src_rows[valid].astype(index_dtype) * src_x_size +
+                        src_cols[valid].astype(index_dtype))
+    return src_index, valid
+
+
+class WarpPlan(object):
+    """
+    Nearest neighbour lookup table from a source grid geometry
+    to a destination grid geometry.
+
+    The transformation is computed once in :func:`~WarpPlan.create`.
+    Afterwards, warping an array is a :mod:`numpy` indexing operation.
+
+    Parameters
+    ----------
+    src_shape: :obj:`tuple`
+        (y_size, x_size) of the source grid.
+    dst_shape: :obj:`tuple`
+        (y_size, x_size) of the destination grid.
+    dst_geotransform: :obj:`tuple`
+        Geotransform of the destination grid.
+    dst_wkt: :obj:`str`
+        WKT projection string of the destination grid.
+    src_index: :func:`numpy.array`
+        Flat source index for each destination pixel.
+    valid: :func:`numpy.array`
+        True where the destination pixel is inside of the source grid.
+
+    Example::
+
+        from gazar.grid import GDALGrid
+        from gazar.warp import WarpPlan
+
+        plan = WarpPlan.create('forecast_000.tif', epsg=32651)
+        plan.save('forecast_plan.npz')
+        for file_path in forecast_files:
+            utm_grid = plan.apply_grid(GDALGrid(file_path))
+
+    """
+    def __init__(self, src_shape, dst_shape, dst_geotransform, dst_wkt,
+                 src_index, valid):
+        self.src_shape = tuple(int(size) for size in src_shape)
+        self.dst_shape = tuple(int(size) for size in dst_shape)
+        self.dst_geotransform = tuple(float(value)
+                                      for value in dst_geotransform)
+        self.dst_wkt = str(dst_wkt)
+        self.src_index = src_index
+        self.valid = valid
+
+    @classmethod
+    def create(cls, src, dst_srs=None, epsg=None, match_grid=None,
+               chunk_size=None):
+        """Computes the warp plan for the source grid geometry.
+
+        The destination geometry is the one of `match_grid` if set.
+        Otherwise, it is the default output of
+        :func:`~gazar.grid.gdal_reproject` to `dst_srs` or `epsg`.
+
+        Parameters
+        ----------
+        src: :obj:`str` or :func:`gdal.Dataset` or :func:`~GDALGrid`
+            The source grid.
+        dst_srs: :func:`osr.SpatialReference`, optional
+            The destination projection.
+        epsg: int, optional
+            The EPSG code of the destination projection.
+        match_grid: :obj:`str` or :func:`gdal.Dataset` or \
+                    :func:`~GDALGrid`, optional
+            The grid to match.
+        chunk_size: int, optional
+            Number of destination rows transformed at a time.
+            Default is about one million cells.
+
+        Returns
+        -------
+        :obj:`WarpPlan`
+        """
+        src_ds, src_proj = load_raster(src)
+        if match_grid is not None:
+            dst_ds, dst_wkt = load_raster(match_grid)
+        else:
+            if dst_srs is None:
+                dst_srs = get_spatial_reference(int(epsg))
+            dst_wkt = dst_srs.ExportToWkt()
+            # same output geometry as gdal_reproject
+            dst_ds = gdal.AutoCreateWarpedVRT(
+                src_ds, src_proj, dst_wkt,
+                gdalconst.GRA_NearestNeighbour, 0.125)
+        dst_geotransform = dst_ds.GetGeoTransform()
+        dst_x_size, dst_y_size = dst_ds.RasterXSize, dst_ds.RasterYSize
+        src_x_size, src_y_size = src_ds.RasterXSize, src_ds.RasterYSize
+
+        transformation = get_transformer(dst_wkt, src_proj)
+        if chunk_size is None:
+            chunk_size = max(1, 1000000 // dst_x_size)
+
+        index_dtype = np.int32 if src_x_size * src_y_size < 2 ** 31 \
+            else np.int64
+        src_index = np.zeros((dst_y_size, dst_x_size), dtype=index_dtype)
+        valid = np.zeros((dst_y_size, dst_x_size), dtype=bool)
+        for row_start in range(0, dst_y_size, chunk_size):
+            row_end = min(row_start + chunk_size, dst_y_size)
+            dst_cols, dst_rows = np.meshgrid(
+                np.arange(dst_x_size) + 0.5,
+                np.arange(row_start, row_end) + 0.5)
+            chunk_index, chunk_valid = _source_pixel_index(
+                transformation, dst_geotransform, dst_cols, dst_rows,
+                src_ds.GetGeoTransform(), (src_y_size, src_x_size),
+                index_dtype)
+            src_index[row_start:row_end] = \
+                chunk_index.reshape(row_end - row_start, dst_x_size)
+            valid[row_start:row_end] = \
+                chunk_valid.reshape(row_end - row_start, dst_x_size)
+
+        return cls((src_y_size, src_x_size), (dst_y_size, dst_x_size),
+                   dst_geotransform, dst_wkt, src_index, valid)
+
+    def apply(self, array, nodata_value=None):
+        """Warps an array with the source grid geometry.
+
+        Parameters
+        ----------
+        array: :func:`numpy.array`
+            Array with the source shape in the last two dimensions
+            (Ex. (y_size, x_size) or (bands, y_size, x_size)).
+        nodata_value: int or float, optional
+            Value for destination pixels outside of the source grid.
+            If not set, a :func:`numpy.ma.array` masking them
+            is returned.
+
+        Returns
+        -------
+        :func:`numpy.array` or :func:`numpy.ma.array`
+        """
+        if array.shape[-2:] != self.src_shape:
+            raise ValueError("Array shape {0} does not match the source "
+                             "shape {1} of the warp plan ..."
+                             .format(array.shape, self.src_shape))
+        flat_array = array.reshape(array.shape[:-2] + (-1,))
+        warped = flat_array[..., self.src_index]
+        if nodata_value is not None:
+            warped = np.ma.filled(warped, nodata_value)
+            warped[..., ~self.valid] = nodata_value
+            return warped
+        return np.ma.array(warped,
+                           mask=np.ma.getmaskarray(warped) | ~self.valid)
+
+    def apply_grid(self, grid, band='all'):
+        """Warps a grid with the source grid geometry.
+
+        Parameters
+        ----------
+        grid: :obj:`str` or :func:`gdal.Dataset` or :func:`~GDALGrid`
+            The grid to warp.
+        band: :obj:`int` or :obj:`str`, optional
+            Band number (1-based) or 'all'. Default is 'all'.
+
+        Returns
+        -------
+        :func:`~gazar.grid.ArrayGrid`
+        """
+        grid_data, nodata_value = _read_grid_data(grid, band)
+        if nodata_value is None:
+            nodata_value = -9999
+        return ArrayGrid(in_array=self.apply(grid_data, nodata_value),
+                         wkt_projection=self.dst_wkt,
+                         geotransform=self.dst_geotransform,
+                         nodata_value=nodata_value,
+                         copy=False)
+
+    def save(self, file_path):
+        """Saves the warp plan to a compressed .npz file.
+
+        Parameters
+        ----------
+        file_path: :obj:`str`
+            Path to the output file.
+        """
+        np.savez_compressed(file_path,
+                            src_shape=self.src_shape,
+                            dst_shape=self.dst_shape,
+                            dst_geotransform=self.dst_geotransform,
+                            dst_wkt=self.dst_wkt,
+                            src_index=self.src_index,
+                            valid=self.valid)
+
+    @classmethod
+    def load(cls, file_path):
+        """Loads a warp plan saved with :func:`~WarpPlan.save`.
+
+        Parameters
+        ----------
+        file_path: :obj:`str`
+            Path to the .npz file.
+
+        Returns
+        -------
+        :obj:`WarpPlan`
+        """
+        with np.load(file_path) as plan_file:
+            return cls(plan_file['src_shape'],
+                       plan_file['dst_shape'],
+                       plan_file['dst_geotransform'],
+                       plan_file['dst_wkt'],
+                       plan_file['src_index'],
+                       plan_file['valid'])
@@ -0,0 +1,466 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.windows
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.windows docstring
+This module contains the windowed and block-wise reading and
+writing of the grids.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# default modules
+from collections import deque
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+import os
+
+# external modules
+import numpy as np
+from osgeo import gdal, gdal_array, gdalconst
+
+# local modules
+from .pool import release_dataset
+
+
+def gdal_dtype_from_numpy(dtype):
+    """Returns the GDAL data type for a numpy data type.
+
+    Parameters
+    ----------
+    dtype : :func:`numpy.dtype` or :func:`gdalconst`
+        The numpy data type. GDAL data types are returned as is.
+
+    Returns
+    -------
+    :func:`gdalconst`
+        The GDAL data type (Ex. gdalconst.GDT_Float32).
+    """
+    if isinstance(dtype, int):
+        return dtype
+    dtype = np.dtype(dtype)
+    if dtype == np.bool_:
+        return gdalconst.GDT_Byte
+    gdal_dtype = gdal_array.NumericTypeCodeToGDALTypeCode(dtype)
+    if gdal_dtype is None:
+        raise ValueError("Data type {0} is not supported by GDAL ..."
+                         .format(dtype))
+    return gdal_dtype
+
+
+def _nodata_dtype(nodata_value):
+    """Returns the smallest data type that holds the NoData value"""
+    if float(nodata_value).is_integer() and abs(nodata_value) < 2**63:
+        # GDAL returns integer NoData values as floats
+        return np.min_scalar_type(int(nodata_value))
+    return np.min_scalar_type(nodata_value)
+
+
+class WindowMethodsMixin(object):
+    """Window, block and overview methods of
+    :func:`~gazar.grid.GDALGrid`.
+    """
+    @property
+    def overview_count(self):
+        """int: number of overviews of the first band"""
+        dataset = self.dataset
+        return dataset.GetRasterBand(1).GetOverviewCount()
+
+    def build_overviews(self, levels=None, resampling='AVERAGE',
+                        external=False, callback=None):
+        """Builds overviews (pyramids) for the grid.
+
+        The grid is updated through a separate dataset handle,
+        so this can run in a background thread. The grid switches to
+        a new handle with the overviews once they are built.
+        Only grids backed by a raster file are supported.
+
+        Parameters
+        ----------
+        levels: :obj:`list`, optional
+            Overview decimation factors (Ex. [2, 4, 8]). Default
+            is powers of 2 until the overview fits in 256 pixels.
+        resampling: :obj:`str`, optional
+            Resampling method (Ex. 'NEAREST', 'AVERAGE', 'MODE',
+            'CUBIC'). Default is 'AVERAGE'.
+        external: bool, optional
+            If True, the overviews are written to an external .ovr
+            file instead of inside of the raster. Default is False.
+        callback: callable, optional
+            GDAL progress callback.
+        """
+        dataset = self.dataset
+        file_path = dataset.GetDescription()
+        if dataset.GetDriver().ShortName == 'MEM' or \
+                not file_path or not os.path.exists(file_path):
+            raise ValueError("Overviews can only be built for grids "
+                             "backed by a raster file ...")
+
+        if levels is None:
+            levels = []
+            level = 1
+            while -(-max(self.x_size, self.y_size) // level) > 256:
+                level *= 2
+                levels.append(level)
+        if not levels:
+            return
+
+        # read only datasets get external overviews
+        access = gdalconst.GA_ReadOnly if external else gdalconst.GA_Update
+        overview_ds = gdal.Open(file_path, access)
+        overview_ds.BuildOverviews(resampling, levels, callback=callback)
+        overview_ds = None
+        if self._file_path is None:
+            self.dataset = gdal.Open(file_path, gdalconst.GA_ReadOnly)
+        elif self._dataset is None:
+            release_dataset(self._file_path)
+        else:
+            # reopen the handles of all threads
+            self._dataset = gdal.Open(file_path, gdalconst.GA_ReadOnly)
+            self._handles.reset()
+
+    def preview(self, max_size=512, band=1, masked=True):
+        """Returns a decimated copy of the grid for quick looks.
+
+        The data is read from the closest overview if available.
+
+        Parameters
+        ----------
+        max_size: int, optional
+            Maximum number of rows or columns. Default is 512.
+        band: obj:`int`, optional
+            Band number (1-based). Default is 1.
+        masked: bool, optional
+            If True, will return the array masked with the NoData
+            value. Default is True.
+
+        Returns
+        -------
+        :func:`numpy.array` or :func:`numpy.ma.array`
+        """
+        scale = max(1.0, float(max(self.x_size, self.y_size)) / max_size)
+        return self.np_array(band, masked=masked,
+                             buf_xsize=max(1, int(self.x_size / scale)),
+                             buf_ysize=max(1, int(self.y_size / scale)))
+
+    def iter_windows(self, band=1, chunk_size=None):
+        """Yields pixel windows following the native blocks of the band.
+
+        Parameters
+        ----------
+        band: obj:`int`, optional
+            Band number (1-based) to get the block size from.
+            Default is 1. If 'all', the first band is used.
+        chunk_size: :obj:`tuple`, optional
+            (x_size, y_size) minimum size of the windows. The size is
+            rounded up to a multiple of the native block size in order
+            to coalesce blocks into larger chunks.
+            Default is the native block size.
+
+        Yields
+        ------
+        :obj:`tuple`
+            (x_off, y_off, x_size, y_size) - The pixel window.
+        """
+        if band == 'all':
+            band = 1
+        dataset = self.dataset
+        block_x_size, block_y_size = \
+            dataset.GetRasterBand(band).GetBlockSize()
+        if chunk_size is not None:
+            block_x_size *= max(1, -(-int(chunk_size[0]) // block_x_size))
+            block_y_size *= max(1, -(-int(chunk_size[1]) // block_y_size))
+
+        for y_off in range(0, self.y_size, block_y_size):
+            win_ysize = min(block_y_size, self.y_size - y_off)
+            for x_off in range(0, self.x_size, block_x_size):
+                yield (x_off, y_off,
+                       min(block_x_size, self.x_size - x_off), win_ysize)
+
+    def read_window(self, window, band=1, halo=0, masked=False):
+        """Returns the data in a pixel window with an optional halo.
+
+        Parameters
+        ----------
+        window: :obj:`tuple`
+            (x_off, y_off, x_size, y_size) pixel window to read.
+        band: obj:`int`, optional
+            Band number (1-based). Default is 1. If 'all',
+            it will return all of the data as a 3D array.
+        halo: int, optional
+            Number of extra pixels to read on each side of the window.
+            Outside of the grid, the halo is filled with the NoData
+            value or with the nearest edge value if there is no
+            NoData value. Default is 0.
+        masked: bool, optional
+            If True, will return the array masked with the NoData
+            value. Default is False.
+
+        Returns
+        -------
+        :func:`numpy.array` or :func:`numpy.ma.array`
+            Array of shape (y_size + 2 * halo, x_size + 2 * halo).
+        """
+        x_off, y_off, win_xsize, win_ysize = window
+        read_x_off = max(0, x_off - halo)
+        read_y_off = max(0, y_off - halo)
+        read_window = (read_x_off, read_y_off,
+                       min(self.x_size, x_off + win_xsize + halo) -
+                       read_x_off,
+                       min(self.y_size, y_off + win_ysize + halo) -
+                       read_y_off)
+        grid_data = self.np_array(band, masked=False, window=read_window)
+
+        dataset = self.dataset
+        nodata_value = dataset.GetRasterBand(
+            1 if band == 'all' else band).GetNoDataValue()
+        if halo > 0:
+            pad_width = [(read_y_off - (y_off - halo),
+                          y_off + win_ysize + halo -
+                          read_y_off - read_window[3]),
+                         (read_x_off - (x_off - halo),
+                          x_off + win_xsize + halo -
+                          read_x_off - read_window[2])]
+            if grid_data.ndim == 3:
+                pad_width.insert(0, (0, 0))
+            if nodata_value is not None:
+                grid_data = np.pad(grid_data, pad_width, mode='constant',
+                                   constant_values=nodata_value)
+            else:
+                grid_data = np.pad(grid_data, pad_width, mode='edge')
+
+        if nodata_value is not None and masked:
+            return np.ma.array(data=grid_data,
+                               mask=(grid_data == nodata_value))
+        return grid_data
+
+    def iter_blocks(self, band=1, chunk_size=None, halo=0, masked=False):
+        """Yields the data of the grid block by block.
+
+        Parameters
+        ----------
+        band: obj:`int`, optional
+            Band number (1-based). Default is 1. If 'all',
+            it will yield all of the bands as 3D arrays.
+        chunk_size: :obj:`tuple`, optional
+            (x_size, y_size) minimum size of the chunks.
+            See: :func:`~GDALGrid.iter_windows`.
+        halo: int, optional
+            Number of extra pixels to read on each side of the block.
+            See: :func:`~GDALGrid.read_window`.
+        masked: bool, optional
+            If True, will return the arrays masked with the NoData
+            value. Default is False.
+
+        Yields
+        ------
+        window: :obj:`tuple`
+            (x_off, y_off, x_size, y_size) - The pixel window of the
+            block without the halo.
+        grid_data: :func:`numpy.array` or :func:`numpy.ma.array`
+            The data of the block including the halo.
+        """
+        for window in self.iter_windows(band, chunk_size):
+            yield window, self.read_window(window, band, halo, masked)
+
+    def write_block(self, window, grid_data, band=1, halo=0):
+        """Writes the data of a block into the grid.
+
+        Parameters
+        ----------
+        window: :obj:`tuple`
+            (x_off, y_off, x_size, y_size) pixel window to write to.
+        grid_data: :func:`numpy.array` or :func:`numpy.ma.array`
+            The data to write. Masked values are written
+            as the NoData value.
+        band: obj:`int`, optional
+            Band number (1-based). Default is 1. If 'all',
+            `grid_data` is a 3D array with all of the bands.
+        halo: int, optional
+            Number of pixels to trim from each side of `grid_data`
+            before writing. Default is 0.
+        """
+        x_off, y_off, win_xsize, win_ysize = window
+        grid_data = grid_data[...,
+                              halo:halo + win_ysize,
+                              halo:halo + win_xsize]
+        if band == 'all':
+            band_ids = range(1, self.num_bands + 1)
+        else:
+            band_ids = [band]
+            grid_data = grid_data[np.newaxis]
+
+        dataset = self.dataset
+        for band_id, band_data in zip(band_ids, grid_data):
+            raster_band = dataset.GetRasterBand(band_id)
+            if np.ma.isMaskedArray(band_data):
+                nodata_value = raster_band.GetNoDataValue()
+                band_data = band_data.filled(
+                    band_data.fill_value if nodata_value is None
+                    else nodata_value)
+            raster_band.WriteArray(band_data, int(x_off), int(y_off))
+
+    def _apply_block(self, func, window, band, halo, out_dtype,
+                     nodata_value):
+        """Reads a block, applies the function and propagates NoData"""
+        if self._file_path is None:
+            # a single dataset handle cannot be shared between threads
+            with self._handles.lock:
+                grid_data = self.read_window(window, band, halo)
+                dataset = self.dataset
+                in_nodata = dataset.GetRasterBand(
+                    1 if band == 'all' else band).GetNoDataValue()
+        else:
+            grid_data = self.read_window(window, band, halo)
+            dataset = self.dataset
+            in_nodata = dataset.GetRasterBand(
+                1 if band == 'all' else band).GetNoDataValue()
+
+        result = np.asarray(func(grid_data))
+        if halo > 0 and result.shape[-2:] == grid_data.shape[-2:]:
+            result = result[...,
+                            halo:halo + window[3],
+                            halo:halo + window[2]]
+        if out_dtype is not None:
+            result = result.astype(out_dtype, copy=False)
+        if nodata_value is not None:
+            nodata_dtype = _nodata_dtype(nodata_value)
+            if not np.can_cast(nodata_dtype, result.dtype):
+                if out_dtype is not None:
+                    raise ValueError("NoData value {0} does not fit in the "
+                                     "output data type {1}. Set another "
+                                     "nodata_value ..."
+                                     .format(nodata_value, out_dtype))
+                result = result.astype(
+                    np.promote_types(result.dtype, nodata_dtype))
+
+        if in_nodata is not None and nodata_value is not None:
+            block_data = grid_data[...,
+                                   halo:halo + window[3],
+                                   halo:halo + window[2]]
+            if np.isnan(in_nodata):
+                nodata_mask = np.isnan(block_data)
+            else:
+                nodata_mask = block_data == in_nodata
+            if nodata_mask.ndim == 3:
+                nodata_mask = nodata_mask.any(axis=0)
+            if not result.flags.writeable:
+                result = result.copy()
+            result[..., nodata_mask] = nodata_value
+        return result
+
+    def apply(self, func, out=None, band=1, dtype=None, nodata_value=None,
+              num_threads=None, chunk_size=None, halo=0,
+              creation_options=None):
+        """Applies a numpy function to the grid block by block
+        using a pool of threads.
+
+        The blocks are read in the worker threads, so the GDAL decoding
+        and the numpy function run in parallel. The results are written
+        in order by the calling thread.
+
+        Parameters
+        ----------
+        func: callable
+            Function that takes the 2D array of a block (3D if `band`
+            is 'all') and returns an array of the same size.
+            If `halo` is set, the result may either include the halo
+            or be the size of the block without the halo.
+        out: :obj:`str` or :func:`~GDALGrid`, optional
+            Output grid to write to. If :obj:`str`, it writes to a
+            GeoTIFF at that path. Default is an in memory grid.
+        band: obj:`int`, optional
+            Band number (1-based). Default is 1. If 'all',
+            the function receives all of the bands as a 3D array.
+        dtype: :func:`numpy.dtype` or :func:`gdalconst`, optional
+            Output data type. Default is the data type returned
+            by `func` for the first block, promoted to hold the
+            NoData value if needed.
+        nodata_value: int or float, optional
+            NoData value of the output. Pixels that are NoData
+            in the input are set to this value in the output.
+            Default is the NoData value of the input.
+        num_threads: int, optional
+            Number of threads. Default is the number of CPUs.
+        chunk_size: :obj:`tuple`, optional
+            (x_size, y_size) minimum size of the blocks.
+            See: :func:`~GDALGrid.iter_windows`.
+        halo: int, optional
+            Number of extra pixels given to `func` on each side
+            of the block. See: :func:`~GDALGrid.read_window`.
+        creation_options: :obj:`list` or :obj:`dict`, optional
+            GDAL creation options for a GeoTIFF output.
+            See: :func:`~gazar.writers.gtiff_creation_options`.
+
+        Returns
+        -------
+        :func:`~GDALGrid`
+            The output grid.
+        """
+        if num_threads is None:
+            num_threads = cpu_count()
+        if nodata_value is None:
+            dataset = self.dataset
+            nodata_value = dataset.GetRasterBand(
+                1 if band == 'all' else band).GetNoDataValue()
+        out_dtype = None
+        if dtype is not None:
+            if isinstance(dtype, int):
+                out_dtype = np.dtype(
+                    gdal_array.GDALTypeCodeToNumericTypeCode(dtype))
+            else:
+                out_dtype = np.dtype(dtype)
+
+        out_grid = out if isinstance(out, WindowMethodsMixin) else None
+        pool = ThreadPool(num_threads)
+        pending = deque()
+        try:
+            for window in self.iter_windows(band, chunk_size):
+                pending.append((window, pool.apply_async(
+                    self._apply_block,
+                    (func, window, band, halo, out_dtype, nodata_value))))
+                # limit the number of blocks held in memory
+                while len(pending) >= 2 * num_threads or \
+                        (pending and pending[0][1].ready()):
+                    window, async_result = pending.popleft()
+                    out_grid = self._write_apply_result(
+                        out_grid, out, window, async_result.get(),
+                        nodata_value, creation_options)
+            while pending:
+                window, async_result = pending.popleft()
+                out_grid = self._write_apply_result(
+                    out_grid, out, window, async_result.get(),
+                    nodata_value, creation_options)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        if out_grid is None:
+            # the grid has no blocks
+            out_grid = self.create_like(
+                out, num_bands=self.num_bands if band == 'all' else 1,
+                gdal_dtype=None if out_dtype is None
+                else gdal_dtype_from_numpy(out_dtype),
+                nodata_value=nodata_value,
+                creation_options=creation_options)
+        out_grid.dataset.FlushCache()
+        return out_grid
+
+    def _write_apply_result(self, out_grid, out, window, result,
+                            nodata_value, creation_options):
+        """Writes a block result, creating the output grid if needed"""
+        if result.ndim == 2:
+            result = result[np.newaxis]
+        if out_grid is None:
+            out_grid = self.create_like(
+                out, num_bands=result.shape[0],
+                gdal_dtype=gdal_dtype_from_numpy(result.dtype),
+                nodata_value=nodata_value,
+                creation_options=creation_options)
+        out_grid.write_block(window, result, band='all')
+        return out_grid
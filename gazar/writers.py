@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+#
+#  gazar.writers
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+"""gazar.writers docstring
+This module contains the GeoTIFF, ASCII, projection and polygon
+writers of the grids.
+Documentation can be found at `_gazar Documentation HOWTO`_.
+
+.. _gazar Documentation HOWTO:
+   https://github.com/snowman2/gazar
+
+"""
+# default modules
+import os
+
+# external modules
+import numpy as np
+from osgeo import gdal, gdal_array, ogr
+
+
+def gtiff_creation_options(tiled=True, block_size=256, compress='DEFLATE',
+                           predictor=None, bigtiff='IF_SAFER',
+                           num_threads='ALL_CPUS'):
+    """Returns creation options for GeoTIFF outputs.
+
+    Parameters
+    ----------
+    tiled : bool, optional
+        If True, the GeoTIFF is tiled. Default is True.
+    block_size: int, optional
+        Size of the tiles. Default is 256.
+    compress: :obj:`str`, optional
+        Compression method (Ex. 'DEFLATE', 'LZW', 'ZSTD').
+        Default is 'DEFLATE'. Use None for no compression.
+    predictor: int, optional
+        Predictor for the compression. 2 for integers and 3 for
+        floating point. Default is None.
+    bigtiff: :obj:`str`, optional
+        BIGTIFF option ('YES', 'NO', 'IF_NEEDED', 'IF_SAFER').
+        Default is 'IF_SAFER'.
+    num_threads: int or :obj:`str`, optional
+        Number of threads used for the compression.
+        Default is 'ALL_CPUS'.
+
+    Returns
+    -------
+    :obj:`list`
+        List of creation options for :func:`gdal.Driver.Create`.
+    """
+    options = []
+    if tiled:
+        options += ['TILED=YES',
+                    'BLOCKXSIZE={0}'.format(block_size),
+                    'BLOCKYSIZE={0}'.format(block_size)]
+    if compress is not None:
+        options.append('COMPRESS={0}'.format(compress))
+    if predictor is not None:
+        options.append('PREDICTOR={0}'.format(predictor))
+    if bigtiff is not None:
+        options.append('BIGTIFF={0}'.format(bigtiff))
+    if num_threads is not None:
+        options.append('NUM_THREADS={0}'.format(num_threads))
+    return options
+
+
+def _creation_option_list(creation_options):
+    """Converts creation options to a list of KEY=VALUE strings"""
+    if creation_options is None:
+        return []
+    if isinstance(creation_options, dict):
+        return ['{0}={1}'.format(key, value)
+                for key, value in creation_options.items()]
+    return list(creation_options)
+
+
+def write_gtiff(dataset, file_path, creation_options=None, cog=False,
+                overview_resampling='NEAREST'):
+    """Writes a dataset to a GeoTIFF.
+
+    Parameters
+    ----------
+    dataset : :func:`gdal.Dataset`
+        The dataset to write.
+    file_path:  :obj:`str`
+        Output path for file.
+    creation_options: :obj:`list` or :obj:`dict`, optional
+        GDAL creation options for the GeoTIFF driver.
+        See: :func:`~gazar.writers.gtiff_creation_options`.
+    cog: bool, optional
+        If True, it will write a Cloud-Optimized GeoTIFF with internal
+        overviews. Default is False.
+    overview_resampling: :obj:`str`, optional
+        Resampling method for the overviews of a Cloud-Optimized
+        GeoTIFF. Default is 'NEAREST'.
+
+    Returns
+    -------
+    :func:`gdal.Dataset`
+        The written dataset.
+    """
+    creation_options = _creation_option_list(creation_options)
+    if not cog:
+        return gdal.GetDriverByName('GTiff').CreateCopy(
+            file_path, dataset, options=creation_options)
+
+    option_dict = dict(option.split('=', 1) for option in creation_options)
+    option_dict = dict((key.upper(), value)
+                       for key, value in option_dict.items())
+    block_size = int(option_dict.pop('BLOCKXSIZE',
+                                     option_dict.pop('BLOCKSIZE', 512)))
+    option_dict.pop('BLOCKYSIZE', None)
+    option_dict.pop('TILED', None)
+    option_dict.setdefault('COMPRESS', 'DEFLATE')
+
+    cog_driver = gdal.GetDriverByName('COG')
+    if cog_driver is not None:
+        option_dict['BLOCKSIZE'] = block_size
+        option_dict.setdefault('OVERVIEW_RESAMPLING', overview_resampling)
+        return cog_driver.CreateCopy(
+            file_path, dataset,
+            options=_creation_option_list(option_dict))
+
+    # GDAL < 3.1: build the overviews on a temporary tiled GeoTIFF
+    # and copy them in front of the data
+    option_dict.update({'TILED': 'YES',
+                        'BLOCKXSIZE': block_size,
+                        'BLOCKYSIZE': block_size})
+    creation_options = _creation_option_list(option_dict)
+    tmp_path = "{0}.tmp.tif".format(os.path.splitext(file_path)[0])
+    tmp_ds = gdal.GetDriverByName('GTiff').CreateCopy(
+        tmp_path, dataset, options=creation_options)
+    try:
+        # add overviews until they fit in a single block
+        levels = []
+        level = 1
+        while -(-max(dataset.RasterXSize, dataset.RasterYSize) // level) \
+                > block_size:
+            level *= 2
+            levels.append(level)
+        if levels:
+            tmp_ds.BuildOverviews(overview_resampling, levels)
+        out_ds = gdal.GetDriverByName('GTiff').CreateCopy(
+            file_path, tmp_ds,
+            options=creation_options + ['COPY_SRC_OVERVIEWS=YES'])
+    finally:
+        tmp_ds = None
+        gdal.GetDriverByName('GTiff').Delete(tmp_path)
+    return out_ds
+
+
+def _format_integers(values, num_cols):
+    """Returns the ASCII bytes of integer values formatted with '%d',
+    space separated with a new line after every `num_cols` values.
+
+    The digits of all values are computed with :mod:`numpy` into a
+    fixed width character array padded with NUL characters
+    that are removed afterwards.
+    """
+    magnitude = np.abs(values.astype(np.int64)).astype(np.int32)
+    num_digits = len(str(int(magnitude.max())))
+    sign_chars = (values < 0).view(np.uint8) * np.uint8(ord('-'))
+    chars = np.zeros((num_digits + 2, values.size), dtype=np.uint8)
+    position = num_digits
+    for digit in range(num_digits):
+        quotient = magnitude // 10
+        digit_chars = magnitude - quotient * 10 + ord('0')
+        if digit > 0:
+            # sign in place of the first leading zero
+            has_digit = magnitude > 0
+            chars[position] = np.where(has_digit, digit_chars, sign_chars)
+            sign_chars *= has_digit
+        else:
+            chars[position] = digit_chars
+        magnitude = quotient
+        position -= 1
+    chars[0] = sign_chars
+    chars[-1] = ord(' ')
+    chars[-1, num_cols - 1::num_cols] = ord('\n')
+    return chars.T.tobytes().translate(None, b'\x00')
+
+
+def _float32_row_format(values, num_cols):
+    """Returns the format string of float32 values with the fewest
+    significant digits ('%.1g' to '%.9g') that read back the same value,
+    space separated with a new line after every `num_cols` values."""
+    values64 = values.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exponent = np.floor(np.log10(np.abs(values64)))
+    exponent[~np.isfinite(exponent)] = 0
+    unit_scale = 10.0 ** -exponent
+    precision = np.full(values.size, 9, dtype=np.uint8)
+    for digits in range(8, 0, -1):
+        scale = unit_scale * 10.0 ** (digits - 1)
+        with np.errstate(invalid='ignore', over='ignore'):
+            rounded = (np.round(values64 * scale) / scale).astype(np.float32)
+        precision[rounded == values] = digits
+    # every format is 5 characters long (Ex. '%.7g ')
+    formats = np.empty((values.size, 5), dtype=np.uint8)
+    formats[:] = np.frombuffer(b'%.0g ', dtype=np.uint8)
+    formats[:, 2] += precision
+    formats[num_cols - 1::num_cols, 4] = ord('\n')
+    return formats.tobytes().decode('ascii')
+
+
+class WriterMethodsMixin(object):
+    """Output methods of :func:`~gazar.grid.GDALGrid`."""
+    def write_prj(self, out_projection_file, esri_format=False):
+        """Writes projection file.
+
+        Parameters
+        ----------
+        out_projection_file:  :obj:`str`
+            Output path for file.
+        esri_format: bool, optional
+            If True, it will convert the projection string to
+            the Esri format. Default is False.
+        """
+        wkt = self.wkt
+        if esri_format:
+            esri_projection = self.projection.Clone()
+            esri_projection.MorphToESRI()
+            wkt = esri_projection.ExportToWkt()
+        with open(out_projection_file, 'w') as prj_file:
+            prj_file.write(wkt)
+            prj_file.close()
+
+    def to_polygon(self,
+                   out_shapefile,
+                   band=1,
+                   fieldname='DN',
+                   self_mask=None):
+        """Converts the raster to a polygon.
+
+        Based on:
+        ---------
+        https://svn.osgeo.org/gdal/trunk/gdal/swig/python/scripts
+            /gdal_polygonize.py
+
+        https://stackoverflow.com/questions/25039565
+            /create-shapefile-from-tif-file-using-gdal
+
+        Parameters
+        ----------
+        out_shapefile:  :obj:`str`
+            Output path for shapefile.
+        band: int, optional
+            Band number (1-based). Default is 1.
+        fieldname: str, optional
+            Name of the output field. Defailt is 'DN'.
+        self_mask: bool, optional
+            If True, will use self as mask. Default is None.
+        """
+
+        dataset = self.dataset
+        raster_band = dataset.GetRasterBand(band)
+        if self_mask:
+            self_mask = raster_band
+        else:
+            self_mask = None
+
+        drv = ogr.GetDriverByName("ESRI Shapefile")
+        dst_ds = drv.CreateDataSource(out_shapefile)
+        dst_layername = os.path.splitext(os.path.basename(out_shapefile))[0]
+        dst_layer = dst_ds.CreateLayer(dst_layername, srs=self.projection)
+
+        # mapping between gdal type and ogr field type
+        type_mapping = {gdal.GDT_Byte: ogr.OFTInteger,
+                        gdal.GDT_UInt16: ogr.OFTInteger,
+                        gdal.GDT_Int16: ogr.OFTInteger,
+                        gdal.GDT_UInt32: ogr.OFTInteger,
+                        gdal.GDT_Int32: ogr.OFTInteger,
+                        gdal.GDT_Float32: ogr.OFTReal,
+                        gdal.GDT_Float64: ogr.OFTReal,
+                        gdal.GDT_CInt16: ogr.OFTInteger,
+                        gdal.GDT_CInt32: ogr.OFTInteger,
+                        gdal.GDT_CFloat32: ogr.OFTReal,
+                        gdal.GDT_CFloat64: ogr.OFTReal}
+
+        fld = ogr.FieldDefn(fieldname, type_mapping[raster_band.DataType])
+        dst_layer.CreateField(fld)
+
+        gdal.Polygonize(raster_band,
+                        self_mask,
+                        dst_layer,
+                        0,
+                        [],
+                        callback=None)
+
+    def to_tif(self, file_path, creation_options=None, cog=False):
+        """Write out as geotiff.
+
+        Parameters
+        ----------
+        file_path:  :obj:`str`
+            Output path for file.
+        creation_options: :obj:`list` or :obj:`dict`, optional
+            GDAL creation options for the GeoTIFF driver
+            (Ex. tiling, compression, BIGTIFF, NUM_THREADS).
+            See: :func:`~gazar.writers.gtiff_creation_options`.
+        cog: bool, optional
+            If True, it will write a Cloud-Optimized GeoTIFF with
+            internal overviews. Default is False.
+        """
+        write_gtiff(self.dataset, file_path, creation_options, cog)
+
+    def _to_ascii(self, header_string, file_path, band, print_nodata=True,
+                  fmt=None):
+        """Writes data to ascii file in chunks of rows"""
+        dataset = self.dataset
+        raster_band = dataset.GetRasterBand(band)
+        if print_nodata:
+            nodata_value = raster_band.GetNoDataValue()
+            if nodata_value is not None:
+                header_string += "NODATA_value {0}\n".format(nodata_value)
+
+        if fmt is None:
+            dtype = np.dtype(gdal_array.GDALTypeCodeToNumericTypeCode(
+                raster_band.DataType))
+            if np.issubdtype(dtype, np.integer):
+                fmt = '%d'
+            elif dtype != np.float32:
+                fmt = '%r'
+        row_format = None
+        if fmt is not None:
+            row_format = ' '.join([fmt] * self.x_size) + '\n'
+
+        # about one million cells per chunk
+        chunk_size = (self.x_size, max(1, 2**20 // self.x_size))
+        with open(file_path, 'wb') as out_ascii_grid:
+            out_ascii_grid.write(header_string.encode('ascii'))
+            for _, grid_data in self.iter_blocks(band, chunk_size):
+                if fmt in ('%d', '%i') and grid_data.size and \
+                        np.issubdtype(grid_data.dtype, np.integer) and \
+                        np.abs(grid_data.astype(np.int64)).max() < 2**31:
+                    out_ascii_grid.write(
+                        _format_integers(grid_data.ravel(), self.x_size))
+                    continue
+                if row_format is None:
+                    # shortest values that read back as float32
+                    block_format = _float32_row_format(grid_data.ravel(),
+                                                       self.x_size)
+                else:
+                    block_format = row_format * grid_data.shape[0]
+                out_ascii_grid.write(
+                    (block_format %
+                     tuple(grid_data.ravel().tolist())).encode('ascii'))
+
+    def to_grass_ascii(self, file_path, band=1, print_nodata=True,
+                       fmt=None):
+        """Writes data to GRASS ASCII file format.
+
+        Parameters
+        ----------
+            file_path: :obj:`str`
+                Path to output ascii file.
+            band: obj:`int`, optional
+                Band number (1-based). Default is 1.
+            print_nodata: bool, optional
+                If True, it will write out the NoData value
+                for the raster band. Default is False.
+            fmt: :obj:`str`, optional
+                Format of the values (Ex. '%.3f'). Default is '%d' for
+                integers and the shortest exact representation for floats.
+        """
+        # PART 1: HEADER
+        # get data extremes
+        west_bound, east_bound, south_bound, north_bound = self.bounds()
+        header_string = u"north: {0:.9f}\n".format(north_bound)
+        header_string += "south: {0:.9f}\n".format(south_bound)
+        header_string += "east: {0:.9f}\n".format(east_bound)
+        header_string += "west: {0:.9f}\n".format(west_bound)
+        header_string += "rows: {0}\n".format(self.y_size)
+        header_string += "cols: {0}\n".format(self.x_size)
+
+        # PART 2: WRITE DATA
+        self._to_ascii(header_string, file_path, band, print_nodata, fmt)
+
+    def to_arc_ascii(self, file_path, band=1, print_nodata=True,
+                     fmt=None):
+        """Writes data to Arc ASCII file format.
+
+        Parameters
+        ----------
+            file_path: :obj:`str`
+                Path to output ascii file.
+            band: obj:`int`, optional
+                Band number (1-based). Default is 1.
+            print_nodata: bool, optional
+                If True, it will write out the NoData value
+                for the raster band. Default is False.
+            fmt: :obj:`str`, optional
+                Format of the values (Ex. '%.3f'). Default is '%d' for
+                integers and the shortest exact representation for floats.
+        """
+        # PART 1: HEADER
+        # get data extremes
+        bounds = self.bounds()
+        west_bound = bounds[0]
+        south_bound = bounds[2]
+        cellsize = (self.geotransform[1] - self.geotransform[-1]) / 2.0
+        header_string = u"ncols {0}\n".format(self.x_size)
+        header_string += "nrows {0}\n".format(self.y_size)
+        header_string += "xllcorner {0}\n".format(west_bound)
+        header_string += "yllcorner {0}\n".format(south_bound)
+        header_string += "cellsize {0}\n".format(cellsize)
+
+        # PART 2: WRITE DATA
+        self._to_ascii(header_string, file_path, band, print_nodata, fmt)
@@ -38,7 +38,15 @@ setup(name='gazar',
           'Programming Language :: Python :: 3.6',
       ],
       install_requires=requires,
+      entry_points={
+          'console_scripts': [
+              'gazar_batch=gazar.batch:main',
+          ],
+      },
       extras_require={
+          'regrid': [
+              'scipy',
+          ],
           'tests': [
               'coveralls',
               'flake8',
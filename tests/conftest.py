@@ -7,6 +7,7 @@
 #  License: BSD 3-Clause
 
 import os
+import sys
 
 from numpy import array
 from numpy.testing import assert_almost_equal
@@ -16,6 +17,9 @@ from shutil import rmtree
 
 SCRIPT_DIR = os.path.abspath(os.path.dirname(__file__))
 
+# asyncio API requires Python 3.5+
+collect_ignore = [] if sys.version_info >= (3, 5) else ['test_aio.py']
+
 
 def compare_files(original, new, raster=False, shapefile=False,
                   precision=7):
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+#  test_aio.py
+#  gazar
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+import asyncio
+from os import path
+import threading
+import time
+
+from gazar.aio import AsyncExecutor
+from gazar.grid import GDALGrid
+
+
+def test_async_executor_limits():
+    """
+    Tests the concurrency limit and cancellation of the executor
+    """
+    lock = threading.Lock()
+    counts = {'running': 0, 'max_running': 0}
+
+    def job(value):
+        with lock:
+            counts['running'] += 1
+            counts['max_running'] = max(counts['max_running'],
+                                        counts['running'])
+        time.sleep(0.05)
+        with lock:
+            counts['running'] -= 1
+        return value
+
+    async def run_jobs():
+        async with AsyncExecutor(max_concurrency=2) as executor:
+            tasks = [asyncio.ensure_future(executor.run(job, value))
+                     for value in range(6)]
+            await asyncio.sleep(0.01)
+            assert executor.pending == 4
+            tasks[-1].cancel()
+            results = await asyncio.gather(*tasks[:-1])
+            assert tasks[-1].cancelled()
+            return results
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(run_jobs()) == list(range(5))
+    finally:
+        loop.close()
+    assert counts['max_running'] == 2
+
+
+def test_async_executor_exit():
+    """
+    Tests that leaving the executor does not block the event loop
+    """
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(time.time())
+            await asyncio.sleep(0.01)
+
+    async def exit_executor():
+        ticker = asyncio.ensure_future(tick())
+        async with AsyncExecutor(max_concurrency=1) as executor:
+            job = asyncio.ensure_future(executor.run(time.sleep, 0.2))
+            await asyncio.sleep(0.01)
+            num_ticks = len(ticks)
+        # the running job finished during the shutdown
+        assert len(ticks) > num_ticks + 5
+        ticker.cancel()
+        await job
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(exit_executor())
+    finally:
+        loop.close()
+
+
+def test_async_np_array():
+    """
+    Tests reading grids asynchronously
+    """
+    input_raster = path.join(path.dirname(__file__), 'input',
+                             'gdal_grid', 'gmted_elevation.tif')
+    ggrid = GDALGrid(input_raster)
+    window = (10, 5, 20, 30)
+
+    async def read_grids():
+        async with AsyncExecutor(max_concurrency=2) as executor:
+            return await asyncio.gather(
+                executor.np_array(ggrid),
+                executor.np_array(ggrid, window=window),
+                executor.np_array(GDALGrid(input_raster, lazy=True)))
+
+    loop = asyncio.new_event_loop()
+    try:
+        full_array, window_array, lazy_array = \
+            loop.run_until_complete(read_grids())
+    finally:
+        loop.close()
+    assert (full_array == ggrid.np_array()).all()
+    assert (window_array == ggrid.np_array(window=window)).all()
+    assert (lazy_array == full_array).all()
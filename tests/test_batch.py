@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+#  test_batch.py
+#  gazar
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+import os
+
+from .conftest import compare_files
+
+from gazar.batch import batch_reproject, batch_resample, main
+from gazar.grid import gdal_reproject, resample_grid
+
+
+def test_batch_reproject(tgrid):
+    """
+    Test reprojecting a batch of files with a failure
+    """
+    input_raster = os.path.join(tgrid.input, 'gdal_grid',
+                                'gmted_elevation.tif')
+    missing_raster = os.path.join(tgrid.input, 'missing.tif')
+    output_dir = os.path.join(tgrid.write, 'batch_reproject')
+    results = batch_reproject([input_raster, missing_raster],
+                              output_dir, epsg=32651, suffix='_utm',
+                              num_workers=2, cache_max=64)
+
+    assert [result.input_path for result in results] == \
+        [input_raster, missing_raster]
+    assert results[0].error is None
+    assert results[0].output_path == \
+        os.path.join(output_dir, 'gmted_elevation_utm.tif')
+    assert results[0].seconds >= 0
+    assert results[1].error is not None
+
+    compare_raster = os.path.join(tgrid.write, 'compare_utm.tif')
+    gdal_reproject(input_raster, compare_raster, epsg=32651)
+    compare_files(compare_raster, results[0].output_path, raster=True)
+
+
+def test_batch_resample(tgrid):
+    """
+    Test resampling a batch of files with a glob pattern
+    """
+    match_grid = os.path.join(tgrid.input, 'v_mask.tif')
+    output_dir = os.path.join(tgrid.write, 'batch_resample')
+    results = batch_resample(os.path.join(tgrid.input, 'era_*.tif'),
+                             match_grid, output_dir, num_workers=2)
+    assert len(results) == 1
+    assert results[0].error is None
+
+    compare_raster = os.path.join(tgrid.write, 'compare_resample.tif')
+    resample_grid(results[0].input_path, match_grid,
+                  to_file=compare_raster)
+    compare_files(compare_raster, results[0].output_path, raster=True)
+
+    # command line interface
+    assert main(['resample', os.path.join(tgrid.input, 'era_*.tif'),
+                 '-o', output_dir, '--match-grid', match_grid,
+                 '--suffix', '_cli', '-w', '1']) == 0
+    assert os.path.exists(os.path.join(output_dir, 'era_raw_cli.tif'))
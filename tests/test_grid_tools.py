@@ -6,17 +6,23 @@
 #  Author : Alan D Snow, 2017.
 #  License: BSD 3-Clause
 
+from multiprocessing.pool import ThreadPool
 from numpy.testing import assert_almost_equal
 import numpy as np
 from os import path
-from osgeo import osr
+from osgeo import gdal, gdalconst, osr
 from pyproj import Proj
 import pytest
 from shutil import copy
 
 from .conftest import compare_files
 
-from gazar.grid import ArrayGrid, GDALGrid, utm_proj_from_latlon
+from gazar.ascii import load_ascii_grid
+from gazar.grid import (ArrayGrid, GDALGrid, gdal_reproject,
+                        utm_proj_from_latlon)
+from gazar.mosaic import mosaic
+from gazar.pool import clear_pool, pool_info, set_pool_size
+from gazar.writers import gtiff_creation_options
 import gazar
 gazar.log_to_console(level='DEBUG')
 
@@ -196,6 +202,519 @@ def test_gdal_grid(prep, tgrid):
     compare_arc_file = path.join(compare_path, arc_name)
     compare_files(out_arc_file, compare_arc_file, raster=True)
 
+    arc_name = 'test_arc_ascii_fmt.asc'
+    out_arc_file = path.join(tgrid.write, arc_name)
+    ggrid.to_arc_ascii(out_arc_file, fmt='%.1f')
+    with open(out_arc_file) as arc_file:
+        assert arc_file.readlines()[6].split()[0].endswith('.0')
+    compare_files(out_arc_file, compare_arc_file, raster=True)
+
+
+def test_load_ascii_grid(prep, tgrid):
+    """
+    Tests reading GRASS and Arc ASCII grids
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+
+    for ascii_name in ('test_grass_ascii.asc', 'test_arc_ascii.asc'):
+        agrid = load_ascii_grid(path.join(compare_path, ascii_name),
+                                wkt_projection=ggrid.wkt,
+                                chunk_size=1000)
+        assert isinstance(agrid, ArrayGrid)
+        assert agrid.x_size == ggrid.x_size
+        assert agrid.y_size == ggrid.y_size
+        assert_almost_equal(agrid.geotransform, ggrid.geotransform)
+        assert agrid.dataset.GetRasterBand(1).GetNoDataValue() == -32768
+        assert (agrid.np_array(masked=False) ==
+                ggrid.np_array(masked=False)).all()
+
+    out_arc_file = path.join(tgrid.write, 'test_arc_ascii_float.asc')
+    ggrid.to_arc_ascii(out_arc_file, fmt='%.2f')
+    agrid = load_ascii_grid(out_arc_file)
+    assert agrid.np_array(masked=False).dtype == np.float64
+    assert_almost_equal(agrid.np_array(masked=False),
+                        ggrid.np_array(masked=False))
+
+    out_grass_file = path.join(tgrid.write, 'test_grass_ascii_null.asc')
+    with open(out_grass_file, 'w') as grass_file:
+        grass_file.write("north: 2.0\nsouth: 0.0\neast: 3.0\n"
+                         "west: 0.0\nrows: 2\ncols: 3\n"
+                         "1 * 3\n* 5 6\n")
+    agrid = load_ascii_grid(out_grass_file)
+    assert agrid.dataset.GetRasterBand(1).GetNoDataValue() == -9999
+    assert (agrid.np_array(masked=False) ==
+            [[1, -9999, 3], [-9999, 5, 6]]).all()
+
+    out_arc_file = path.join(tgrid.write, 'test_arc_ascii_nodata.asc')
+    with open(out_arc_file, 'w') as arc_file:
+        arc_file.write("ncols 2\nnrows 2\nxllcorner 0\nyllcorner 0\n"
+                       "cellsize 1\nNODATA_value -9999.0\n"
+                       "nan 1\n-9999 3\n")
+    agrid = load_ascii_grid(out_arc_file)
+    assert agrid.dataset.GetRasterBand(1).GetNoDataValue() == -9999
+    assert_almost_equal(agrid.np_array(masked=False),
+                        [[np.nan, 1], [-9999, 3]])
+
+    with open(out_arc_file, 'w') as arc_file:
+        arc_file.write("ncols 2\nnrows 2\nxllcorner 0\nyllcorner 0\n"
+                       "cellsize 1\nNODATA_value -9999.0\n"
+                       "0 1\n-9999 3\n")
+    agrid = load_ascii_grid(out_arc_file)
+    assert agrid.np_array(masked=False).dtype == np.int32
+    assert agrid.dataset.GetRasterBand(1).GetNoDataValue() == -9999
+
+    with open(out_arc_file, 'w') as arc_file:
+        arc_file.write("ncols 2\nnrows 2\nxllcorner 0\nyllcorner 0\n"
+                       "cellsize 1\n0 1\n2 x\n")
+    with pytest.raises(ValueError) as error:
+        load_ascii_grid(out_arc_file)
+    assert "'x'" in str(error.value)
+    assert "line 7" in str(error.value)
+
+
+def test_gdal_grid_to_tif_options(prep, tgrid):
+    """
+    Tests writing tiled, compressed and cloud optimized GeoTIFFs
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    compare_tif_file = path.join(compare_path, 'test_tif.tif')
+
+    out_tif_file = path.join(tgrid.write, 'test_tif_tiled.tif')
+    ggrid.to_tif(out_tif_file,
+                 creation_options=gtiff_creation_options(block_size=64,
+                                                         predictor=2))
+    compare_files(out_tif_file, compare_tif_file, raster=True)
+    out_ds = gdal.Open(out_tif_file)
+    assert out_ds.GetRasterBand(1).GetBlockSize() == [64, 64]
+    assert out_ds.GetMetadata('IMAGE_STRUCTURE')['COMPRESSION'] == \
+        'DEFLATE'
+
+    out_tif_file = path.join(tgrid.write, 'test_tif_cog.tif')
+    ggrid.to_tif(out_tif_file,
+                 creation_options={'BLOCKXSIZE': 32, 'COMPRESS': 'LZW'},
+                 cog=True)
+    compare_files(out_tif_file, compare_tif_file, raster=True)
+    out_ds = gdal.Open(out_tif_file)
+    assert out_ds.GetRasterBand(1).GetBlockSize() == [32, 32]
+    assert out_ds.GetRasterBand(1).GetOverviewCount() == 2
+
+
+def test_gdal_grid_pixel_arrays(prep):
+    """
+    Tests vectorized pixel and coordinate conversions
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+
+    x_locs, y_locs, valid = ggrid.pixel2coord_array([5, 0, 120],
+                                                    [10, 0, 5])
+    assert_almost_equal((x_locs[0], y_locs[0]),
+                        ggrid.pixel2coord(5, 10))
+    assert valid.tolist() == [True, True, False]
+
+    cols, rows, valid = \
+        ggrid.coord2pixel_array([121.04569444444445, 1870872, 121.5],
+                                [15.920694444444445, 1669170, 15.5])
+    assert cols.tolist() == [5, -1, 60]
+    assert rows.tolist() == [10, -1, 60]
+    assert valid.tolist() == [True, False, True]
+
+    lons, lats, valid = ggrid.pixel2lonlat_array([5, 120], [10, 0])
+    assert_almost_equal((lons[0], lats[0]),
+                        (121.04569444444445, 15.920694444444445))
+    assert valid.tolist() == [True, False]
+
+    cols, rows, valid = ggrid.lonlat2pixel_array(lons, lats)
+    assert cols.tolist() == [5, -1]
+    assert rows.tolist() == [10, -1]
+    assert valid.tolist() == [True, False]
+
+
+def test_gdal_grid_get_vals(prep):
+    """
+    Tests sampling many points at once
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    grid_array = ggrid.np_array(masked=False)
+
+    x_pixels = np.array([5, 119, 0, 500, 60])
+    y_pixels = np.array([10, 119, 0, 5, -1])
+    vals = ggrid.get_vals(x_pixels, y_pixels)
+    assert vals.shape == (5,)
+    assert vals[0] == 337
+    assert vals.data[1] == grid_array[119, 119]
+    assert vals.data[2] == grid_array[0, 0]
+    assert vals.mask[3:].all()
+
+    all_vals = ggrid.get_vals(x_pixels, y_pixels, band='all')
+    assert all_vals.shape == (1, 5)
+    assert (all_vals.data[0] == vals.data).all()
+
+    vals = ggrid.get_vals_coord([121.04569444444445, 284940],
+                                [15.920694444444445, 10000000])
+    assert vals[0] == 337
+    assert vals.mask.tolist() == [False, True]
+
+    vals = ggrid.get_vals_latlon([121.04569444444445],
+                                 [15.920694444444445])
+    assert vals.tolist() == [337]
+
+    # no points inside of the grid
+    vals = ggrid.get_vals_coord([284940, 0.0], [10000000, 0.0])
+    assert vals.shape == (2,)
+    assert vals.mask.all()
+    vals = ggrid.get_vals_latlon([], [], band='all')
+    assert vals.shape == (1, 0)
+
+
+def test_gdal_grid_np_array_window(prep):
+    """
+    Tests windowed and buffered reads
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    grid_array = ggrid.np_array(masked=False)
+
+    window_array = ggrid.np_array(masked=False, window=(5, 10, 20, 30))
+    assert (window_array == grid_array[10:40, 5:25]).all()
+
+    x_min, y_max = ggrid.pixel2coord(5, 10)
+    x_max, y_min = ggrid.pixel2coord(24, 39)
+    assert ggrid.bounds2window((x_min, x_max, y_min, y_max)) == \
+        (5, 10, 20, 30)
+    bounds_array = ggrid.np_array(masked=False,
+                                  bounds=(x_min, x_max, y_min, y_max))
+    assert (bounds_array == window_array).all()
+
+    with pytest.raises(ValueError):
+        ggrid.bounds2window((0, 1, 0, 1))
+
+    out = np.zeros((30, 20), dtype=grid_array.dtype)
+    out_array = ggrid.np_array(masked=False, window=(5, 10, 20, 30), out=out)
+    assert out_array is out
+    assert (out == window_array).all()
+
+    small_array = ggrid.np_array(masked=False, buf_xsize=60, buf_ysize=60)
+    assert small_array.shape == (60, 60)
+
+
+def test_gdal_grid_blocks(prep):
+    """
+    Tests block iteration and writing
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    grid_array = ggrid.np_array(masked=False)
+    out_grid = ggrid.create_like()
+    assert out_grid.geotransform == ggrid.geotransform
+
+    windows = list(ggrid.iter_windows(chunk_size=(50, 50)))
+    assert sum(win[2] * win[3] for win in windows) == 120 * 120
+    for window, block in ggrid.iter_blocks(chunk_size=(50, 50), halo=2):
+        x_off, y_off, x_size, y_size = window
+        assert block.shape == (y_size + 4, x_size + 4)
+        assert (block[2:-2, 2:-2] ==
+                grid_array[y_off:y_off + y_size,
+                           x_off:x_off + x_size]).all()
+        out_grid.write_block(window, block, halo=2)
+    assert (out_grid.np_array(masked=False) == grid_array).all()
+
+
+def test_gdal_grid_apply(prep, tgrid):
+    """
+    Tests applying a function block by block
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    grid_array = ggrid.np_array(masked=False)
+    nodata_mask = grid_array == -32768
+
+    out_grid = ggrid.apply(lambda block: block * 2.5,
+                           num_threads=2,
+                           chunk_size=(32, 32))
+    assert out_grid.dataset.GetRasterBand(1).DataType == \
+        gdalconst.GDT_Float64
+    assert_almost_equal(out_grid.np_array(masked=False),
+                        np.where(nodata_mask, -32768, grid_array * 2.5))
+
+    out_tif = path.join(tgrid.write, 'test_apply.tif')
+    out_grid = ggrid.apply(lambda block: block[1:-1, 1:-1] > 300,
+                           out=out_tif,
+                           dtype=gdalconst.GDT_Byte,
+                           nodata_value=255,
+                           halo=1)
+    out_array = out_grid.np_array(masked=False)
+    assert out_array.dtype == np.uint8
+    assert (out_array == np.where(nodata_mask, 255,
+                                  grid_array > 300)).all()
+
+    # the default data type is promoted to hold the NoData value
+    out_grid = ggrid.apply(lambda block: block > 300)
+    out_array = out_grid.np_array(masked=False)
+    assert out_array.dtype == np.int16
+    assert out_grid.dataset.GetRasterBand(1).GetNoDataValue() == -32768
+    assert (out_array == np.where(nodata_mask, -32768,
+                                  grid_array > 300)).all()
+
+    with pytest.raises(ValueError):
+        ggrid.apply(lambda block: block > 300, dtype=np.uint8)
+
+    # NaN NoData values are propagated
+    nan_array = np.where(nodata_mask, np.nan, grid_array).astype(np.float32)
+    nan_grid = ArrayGrid(in_array=nan_array,
+                         wkt_projection=ggrid.wkt,
+                         geotransform=ggrid.geotransform,
+                         nodata_value=np.nan)
+    out_grid = nan_grid.apply(lambda block: np.nan_to_num(block) + 1,
+                              nodata_value=-1)
+    assert (out_grid.np_array(masked=False) ==
+            np.where(nodata_mask, -1, nan_array + 1)).all()
+
+
+def test_gdal_grid_latlon_chunks(prep):
+    """
+    Tests chunked latitude and longitude generation
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    assert ggrid.is_geographic
+    lats, lons = ggrid.get_latlon(dtype=np.float32, broadcast=True)
+    assert lats.shape == (120, 1)
+    assert lons.shape == (1, 120)
+    assert lats.dtype == np.float32
+    assert_almost_equal(lats[20:22, 0], [15.83736111, 15.82902778], decimal=5)
+
+    sp_ref = osr.SpatialReference()
+    sp_ref.ImportFromEPSG(32651)
+    proj_grid = ggrid.to_projection(sp_ref)
+    assert not proj_grid.is_geographic
+    full_lats, full_lons = proj_grid.latlon
+    out = (np.zeros(full_lats.shape), np.zeros(full_lons.shape))
+    chunk_lats, chunk_lons = proj_grid.get_latlon(chunk_size=7, out=out)
+    assert chunk_lats is out[0]
+    assert_almost_equal(chunk_lats, full_lats)
+    assert_almost_equal(chunk_lons, full_lons)
+    row_slices = [row_slice for row_slice, _, _ in
+                  proj_grid.iter_latlon(chunk_size=50)]
+    assert row_slices[0] == slice(0, 50)
+    assert row_slices[-1].stop == proj_grid.y_size
+
+
+def test_gdal_grid_metadata_cache(prep):
+    """
+    Tests memoized metadata and invalidation
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    arrg = ArrayGrid(in_array=ggrid.np_array(masked=False),
+                     wkt_projection=ggrid.wkt,
+                     geotransform=ggrid.geotransform)
+
+    assert arrg.epsg == '4326'
+    assert arrg.proj is arrg.proj
+    assert arrg.pixel2coord(0, 0) == ggrid.pixel2coord(0, 0)
+
+    new_geotransform = (500000.0, 30.0, 0.0, 1700000.0, 0.0, -30.0)
+    sp_ref = osr.SpatialReference()
+    sp_ref.ImportFromEPSG(32651)
+    arrg.set_geotransform(new_geotransform)
+    arrg.set_projection(sp_ref)
+    assert_almost_equal(arrg.geotransform, new_geotransform)
+    assert arrg.epsg == '32651'
+    assert_almost_equal(arrg.pixel2coord(0, 0), (500015.0, 1699985.0))
+    assert arrg.coord2pixel(500015.0, 1699985.0) == (0, 0)
+
+    # swapping the dataset resets the metadata
+    swap_grid = GDALGrid(input_raster)
+    assert swap_grid.x_size == ggrid.x_size
+    clip_grid = ggrid.clip(window=(10, 5, 20, 30))
+    swap_grid.dataset = clip_grid.dataset
+    assert (swap_grid.x_size, swap_grid.y_size) == (20, 30)
+    assert_almost_equal(swap_grid.geotransform, clip_grid.geotransform)
+
+
+def test_gdal_grid_overviews(prep, tgrid):
+    """
+    Tests building overviews and decimated reads
+    """
+    input_raster, compare_path = prep
+    ovr_raster = path.join(tgrid.write, 'test_grid_overviews.tif')
+    copy(input_raster, ovr_raster)
+    ggrid = GDALGrid(ovr_raster)
+    full_array = ggrid.np_array(masked=False)
+    assert ggrid.overview_count == 0
+
+    ggrid.build_overviews(levels=[2, 4], resampling='NEAREST')
+    assert ggrid.overview_count == 2
+    half_array = ggrid.np_array(masked=False,
+                                buf_xsize=ggrid.x_size // 2,
+                                buf_ysize=ggrid.y_size // 2)
+    assert half_array.shape == (ggrid.y_size // 2, ggrid.x_size // 2)
+    assert half_array[0, 0] == full_array[0, 0]
+
+    preview = ggrid.preview(max_size=30)
+    assert max(preview.shape) == 30
+
+    arrg = ArrayGrid(in_array=full_array,
+                     wkt_projection=ggrid.wkt,
+                     geotransform=ggrid.geotransform)
+    with pytest.raises(ValueError):
+        arrg.build_overviews(levels=[2])
+
+
+def test_gdal_grid_lazy(prep):
+    """
+    Tests lazy grids using the dataset pool
+    """
+    input_raster, compare_path = prep
+    clear_pool()
+    ggrid = GDALGrid(input_raster, lazy=True)
+    assert pool_info().currsize == 0
+
+    egrid = GDALGrid(input_raster)
+    assert ggrid.x_size == egrid.x_size
+    assert ggrid.epsg == egrid.epsg
+    assert pool_info().currsize == 1
+    assert (ggrid.np_array() == egrid.np_array()).all()
+
+    # evicted datasets are reopened on the next access
+    set_pool_size(0)
+    assert pool_info().currsize == 0
+    assert (ggrid.np_array() == egrid.np_array()).all()
+    set_pool_size(64)
+
+
+def test_gdal_grid_threaded_reads(prep):
+    """
+    Tests reading one grid from several threads
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    windows = list(ggrid.iter_windows(chunk_size=(10, 10)))
+    expected = [ggrid.np_array(window=window) for window in windows]
+
+    pool = ThreadPool(4)
+    try:
+        results = pool.map(lambda window: ggrid.np_array(window=window),
+                           windows)
+        datasets = pool.map(lambda _: ggrid.dataset, range(4))
+    finally:
+        pool.close()
+        pool.join()
+    for result, expected_result in zip(results, expected):
+        assert (result == expected_result).all()
+    assert all(dataset is not ggrid.dataset for dataset in datasets)
+
+
+def test_gdal_reproject_warp(prep, tgrid):
+    """
+    Tests reprojecting with the multithreaded warp
+    """
+    input_raster, compare_path = prep
+    out_tif_file = path.join(tgrid.write, 'test_warp_32651.tif')
+    gdal_reproject(input_raster, out_tif_file, epsg=32651,
+                   num_threads=2, warp_memory_limit=16)
+    compare_tif_file = path.join(compare_path, 'test_tif_32651.tif')
+    compare_files(out_tif_file, compare_tif_file, raster=True)
+
+    out_tif_file = path.join(tgrid.write, 'test_warp_32651_cog.tif')
+    gdal_reproject(input_raster, out_tif_file, epsg=32651,
+                   creation_options={'BLOCKXSIZE': 32}, cog=True)
+    compare_files(out_tif_file, compare_tif_file, raster=True)
+    out_ds = gdal.Open(out_tif_file)
+    assert out_ds.GetRasterBand(1).GetBlockSize() == [32, 32]
+    assert out_ds.GetRasterBand(1).GetOverviewCount() > 0
+
+    proj_grid = GDALGrid(compare_tif_file)
+    x_min, x_max, y_min, y_max = proj_grid.bounds()
+    warp_grid = gdal_reproject(input_raster, epsg=32651,
+                               output_bounds=(x_min, x_max, y_min, y_max),
+                               size=(50, 40), as_gdal_grid=True)
+    assert (warp_grid.x_size, warp_grid.y_size) == (50, 40)
+    assert_almost_equal(warp_grid.bounds(), (x_min, x_max, y_min, y_max))
+
+
+def test_mosaic(prep, tgrid):
+    """
+    Tests combining overlapping grids
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    grid_array = ggrid.np_array(masked=False).astype(np.float32)
+    x_min, x_cell_size, _, y_max, _, y_cell_size = ggrid.geotransform
+    # left tile with columns 0-79 and right tile with columns 40-119
+    left_grid = ArrayGrid(in_array=grid_array[:, :80],
+                          wkt_projection=ggrid.wkt,
+                          geotransform=ggrid.geotransform,
+                          nodata_value=-32768)
+    right_grid = ArrayGrid(in_array=grid_array[:, 40:] + 10,
+                           wkt_projection=ggrid.wkt,
+                           geotransform=(x_min + 40 * x_cell_size,
+                                         x_cell_size, 0, y_max,
+                                         0, y_cell_size),
+                           nodata_value=-32768)
+    nodata_mask = grid_array == -32768
+
+    first_grid = mosaic([left_grid, right_grid], rule='first')
+    assert (first_grid.x_size, first_grid.y_size) == \
+        (ggrid.x_size, ggrid.y_size)
+    assert_almost_equal(first_grid.geotransform, ggrid.geotransform)
+    first_array = first_grid.np_array(masked=False)
+    assert (first_array[:, :80] == grid_array[:, :80]).all()
+    assert (first_array[:, 80:][~nodata_mask[:, 80:]] ==
+            grid_array[:, 80:][~nodata_mask[:, 80:]] + 10).all()
+
+    last_array = mosaic([left_grid, right_grid],
+                        rule='last').np_array(masked=False)
+    assert (last_array[:, :40] == grid_array[:, :40]).all()
+
+    out_tif = path.join(tgrid.write, 'test_mosaic_mean.tif')
+    mean_grid = mosaic([left_grid, right_grid], out=out_tif, rule='mean')
+    mean_array = GDALGrid(out_tif).np_array(masked=False)
+    overlap = ~nodata_mask[:, 40:80]
+    assert_almost_equal(mean_array[:, 40:80][overlap],
+                        grid_array[:, 40:80][overlap] + 5)
+    assert mean_grid.dataset.GetRasterBand(1).GetNoDataValue() == -32768
+
+    max_array = mosaic([left_grid, right_grid],
+                       rule='max').np_array(masked=False)
+    assert (max_array[:, 40:80][overlap] ==
+            grid_array[:, 40:80][overlap] + 10).all()
+
+
+def test_gdal_grid_clip(prep):
+    """
+    Tests clipping a grid without warping
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    grid_array = ggrid.np_array()
+
+    clip_grid = ggrid.clip(window=(10, 5, 20, 30))
+    assert (clip_grid.x_size, clip_grid.y_size) == (20, 30)
+    assert clip_grid.dataset.GetDriver().ShortName == 'VRT'
+    assert_almost_equal(clip_grid.pixel2coord(0, 0),
+                        ggrid.pixel2coord(10, 5))
+    assert (clip_grid.np_array() == grid_array[5:35, 10:30]).all()
+    assert clip_grid.epsg == ggrid.epsg
+
+    # the view keeps the clipped grid alive
+    temp_clip_grid = GDALGrid(input_raster).clip(window=(10, 5, 20, 30))
+    assert (temp_clip_grid.np_array() == grid_array[5:35, 10:30]).all()
+
+    # bounds are snapped outward to the pixel edges
+    x_min, y_max = ggrid.affine * (10.5, 5.5)
+    x_max, y_min = ggrid.affine * (29.5, 34.5)
+    bounds_grid = ggrid.clip(bounds=(x_min, x_max, y_min, y_max))
+    assert_almost_equal(bounds_grid.geotransform, clip_grid.geotransform)
+    assert (bounds_grid.x_size, bounds_grid.y_size) == (20, 30)
+
+    with pytest.raises(ValueError):
+        ggrid.clip(window=(100, 5, 30, 30))
+
 
 def test_array_grid(prep):
     """
@@ -216,6 +735,43 @@ def test_array_grid(prep):
     assert (ggrid.np_array() == arrg.np_array()).all()
 
 
+def test_array_grid_no_copy(prep):
+    """
+    Test array grid sharing the memory of the array
+    """
+    input_raster, compare_path = prep
+    ggrid = GDALGrid(input_raster)
+    grid_array = ggrid.np_array(masked=False).astype(np.int16)
+    arrg = ArrayGrid(in_array=grid_array,
+                     wkt_projection=ggrid.wkt,
+                     geotransform=ggrid.geotransform,
+                     copy=False)
+
+    assert arrg.dataset.GetRasterBand(1).DataType == gdalconst.GDT_Int16
+    assert (arrg.np_array(masked=False) == grid_array).all()
+    grid_array[0, 0] = 42
+    assert arrg.np_array(masked=False)[0, 0] == 42
+
+    # the derived VRT keeps the array alive
+    clip_grid = ArrayGrid(in_array=grid_array.copy(),
+                          wkt_projection=ggrid.wkt,
+                          geotransform=ggrid.geotransform,
+                          copy=False).clip(window=(0, 0, 2, 2))
+    assert (clip_grid.np_array(masked=False) == grid_array[:2, :2]).all()
+
+    arrg = ArrayGrid(in_array=grid_array.astype(np.int64),
+                     wkt_projection=ggrid.wkt,
+                     geotransform=ggrid.geotransform)
+    assert arrg.dataset.GetRasterBand(1).DataType in \
+        (gdalconst.GDT_Float32, getattr(gdalconst, 'GDT_Int64', None))
+
+    with pytest.raises(ValueError):
+        ArrayGrid(in_array=grid_array.astype('>i4'),
+                  wkt_projection=ggrid.wkt,
+                  geotransform=ggrid.geotransform,
+                  copy=False)
+
+
 def test_array_grid_nodata(prep):
     """
     Test array grid with nodata
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+#  test_pipeline.py
+#  gazar
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+import os
+
+from numpy.testing import assert_almost_equal
+
+from gazar.grid import GDALGrid, gdal_reproject, resample_grid
+from gazar.pipeline import Pipeline
+
+
+def test_pipeline(tgrid):
+    """
+    Test chaining steps in a lazy pipeline
+    """
+    input_raster = os.path.join(tgrid.input, 'gdal_grid',
+                                'gmted_elevation.tif')
+    ggrid = GDALGrid(input_raster)
+    pipeline = Pipeline(input_raster)
+
+    # nothing is evaluated until requested
+    clipped = pipeline.clip(window=(10, 5, 20, 30))
+    assert clipped._datasets is None
+    assert (clipped.np_array() == ggrid.np_array()[5:35, 10:30]).all()
+
+    scaled = clipped.scale(2.0).scale(1.0, 1.0).np_array()
+    expected = ggrid.np_array()[5:35, 10:30]
+    assert (scaled.mask == expected.mask).all()
+    assert_almost_equal(scaled.compressed(),
+                        2.0 * expected.compressed() + 1.0)
+
+    reprojected = pipeline.reproject(epsg=32651)
+    gdal_grid = gdal_reproject(input_raster, epsg=32651, as_gdal_grid=True)
+    assert (reprojected.np_array() == gdal_grid.np_array()).all()
+
+    out_tif = os.path.join(tgrid.write, 'test_pipeline.tif')
+    out_grid = reprojected.select_bands([1]).scale(0.5).to_tif(out_tif)
+    assert_almost_equal(out_grid.geotransform, gdal_grid.geotransform)
+    out_array = GDALGrid(out_tif).np_array()
+    expected = gdal_grid.np_array()
+    assert (out_array.mask == expected.mask).all()
+    assert_almost_equal(out_array.compressed(), 0.5 * expected.compressed())
+
+
+def test_pipeline_resample(tgrid):
+    """
+    Test resampling in a lazy pipeline
+    """
+    new_mask_grid = os.path.join(tgrid.input, 'v_mask.tif')
+    era_grid = os.path.join(tgrid.input, 'era_raw.tif')
+    pipeline = Pipeline(era_grid).resample(new_mask_grid)
+    resampled = resample_grid(era_grid, new_mask_grid, as_gdal_grid=True)
+    assert_almost_equal(pipeline.grid().geotransform,
+                        resampled.geotransform)
+    assert_almost_equal(pipeline.np_array(band='all', masked=False),
+                        resampled.np_array(band='all', masked=False),
+                        decimal=4)
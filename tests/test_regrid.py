@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+#  test_regrid.py
+#  gazar
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+import numpy as np
+from numpy.testing import assert_almost_equal
+import pytest
+
+from gazar.grid import ArrayGrid
+
+pytest.importorskip('scipy')
+from gazar.regrid import ConservativeRegridder  # noqa: E402
+
+
+def test_conservative_regridder():
+    """
+    Test area weighted regridding with NoData
+    """
+    wkt = ('GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,'
+           '298.257223563]],PRIMEM["Greenwich",0],'
+           'UNIT["degree",0.0174532925199433]]')
+    src_grid = ArrayGrid(in_array=np.arange(100.0).reshape(10, 10),
+                         wkt_projection=wkt,
+                         geotransform=(0, 1, 0, 10, 0, -1))
+    match_grid = ArrayGrid(in_array=np.zeros((3, 3)),
+                           wkt_projection=wkt,
+                           geotransform=(1, 2.5, 0, 9, 0, -2.5))
+    regridder = ConservativeRegridder.create(src_grid, match_grid)
+    assert regridder.weights.shape == (9, 100)
+
+    # area weighted mean of rows 1-3.5 and columns 1-3.5
+    weights = np.zeros((10, 10))
+    weights[1:4, 1:4] = 1
+    weights[3, :] *= 0.5
+    weights[:, 3] *= 0.5
+    expected = (weights * src_grid.np_array()).sum() / weights.sum()
+    regridded = regridder.apply(src_grid.np_array(masked=False))
+    assert_almost_equal(regridded[0, 0], expected)
+
+    # NoData is left out and the weights are renormalized
+    stack = np.array([src_grid.np_array(masked=False)] * 2)
+    stack[0, 1:4, 1:4] = -9999
+    stack[0, 1, 1] = 5.0
+    regridded = regridder.apply(stack, nodata_value=-9999)
+    assert_almost_equal(regridded[0, 0, 0], 5.0)
+    assert_almost_equal(regridded[1, 0, 0], expected)
+
+    stack[0, 1, 1] = -9999
+    regridded = regridder.apply(stack, nodata_value=-9999)
+    assert regridded[0, 0, 0] == -9999
+
+    regridded_grid = regridder.regrid_grid(src_grid)
+    assert_almost_equal(regridded_grid.geotransform, match_grid.geotransform)
+    assert_almost_equal(regridded_grid.np_array()[0, 0], expected)
@@ -1,8 +1,11 @@
 import os
 
+from numpy.testing import assert_almost_equal
+from osgeo import gdalconst
+
 from .conftest import compare_files
 
-from gazar.grid import resample_grid
+from gazar.grid import gdal_reproject, resample_grid
 
 
 def test_resample_grid(tgrid):
@@ -34,3 +37,43 @@ def test_resample_grid_as_gdal(tgrid):
 
     compare_resampled_grid = os.path.join(tgrid.write, 'resampled.tif')
     compare_files(resampled_grid, compare_resampled_grid, raster=True)
+
+
+def test_resample_grid_subset_source(tgrid):
+    """
+    Test resampling grid with and without the source window
+    """
+    new_mask_grid = os.path.join(tgrid.input, 'v_mask.tif')
+    era_grid = os.path.join(tgrid.input, 'era_raw.tif')
+    full_grid = resample_grid(original_grid=era_grid,
+                              match_grid=new_mask_grid,
+                              as_gdal_grid=True,
+                              subset_source=False)
+    subset_grid = resample_grid(original_grid=era_grid,
+                                match_grid=new_mask_grid,
+                                as_gdal_grid=True,
+                                subset_source=True)
+    assert_almost_equal(subset_grid.np_array(band='all'),
+                        full_grid.np_array(band='all'))
+
+
+def test_resample_grid_subset_source_conic(tgrid):
+    """
+    Test resampling grid with the source window to a conic projection
+    """
+    era_grid = os.path.join(tgrid.input, 'era_raw.tif')
+    # NAD83 / Conus Albers is not an affine transform of WGS 84
+    albers_grid = gdal_reproject(os.path.join(tgrid.input, 'v_mask.tif'),
+                                 epsg=5070,
+                                 as_gdal_grid=True)
+    full_grid = resample_grid(original_grid=era_grid,
+                              match_grid=albers_grid,
+                              as_gdal_grid=True,
+                              resample_method=gdalconst.GRA_Bilinear)
+    subset_grid = resample_grid(original_grid=era_grid,
+                                match_grid=albers_grid,
+                                as_gdal_grid=True,
+                                resample_method=gdalconst.GRA_Bilinear,
+                                subset_source=True)
+    assert_almost_equal(subset_grid.np_array(band='all'),
+                        full_grid.np_array(band='all'))
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+#  test_srs.py
+#  gazar
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+from numpy.testing import assert_almost_equal
+from osgeo import osr
+import pytest
+
+from gazar.srs import (cache_info, clear_cache, get_spatial_reference,
+                       get_transformation, get_transformer, LRUCache,
+                       set_cache_size)
+
+
+def test_lru_cache():
+    """
+    Test the LRU cache eviction and counters
+    """
+    cache = LRUCache(maxsize=2)
+    assert cache.get('a', lambda: 1) == 1
+    assert cache.get('b', lambda: 2) == 2
+    assert cache.get('a', lambda: 3) == 1
+    assert cache.get('c', lambda: 4) == 4
+    # 'b' was the least recently used
+    assert cache.get('b', lambda: 5) == 5
+    info = cache.info()
+    assert info.hits == 1
+    assert info.misses == 4
+    assert info.currsize == 2
+
+
+def test_spatial_reference_cache():
+    """
+    Test retrieving spatial references from the cache
+    """
+    clear_cache()
+    sp_ref = get_spatial_reference(4326)
+    assert sp_ref.GetAuthorityCode(None) == '4326'
+    assert get_spatial_reference('4326') is sp_ref
+    # the same projection as WKT shares the entry
+    assert get_spatial_reference(sp_ref.ExportToWkt()) is sp_ref
+    info = cache_info()['spatial_reference']
+    assert info.hits == 2
+    assert info.misses == 1
+
+    # each thread has its own spatial references
+    pool = ThreadPool(1)
+    try:
+        thread_sp_ref = pool.apply(get_spatial_reference, (4326,))
+    finally:
+        pool.close()
+        pool.join()
+    assert thread_sp_ref is not sp_ref
+    assert thread_sp_ref.IsSame(sp_ref)
+
+    with pytest.raises(ValueError):
+        get_spatial_reference(None)
+
+
+def test_transformation_cache():
+    """
+    Test retrieving transformations from the cache
+    """
+    clear_cache()
+    utm_ref = osr.SpatialReference()
+    utm_ref.ImportFromEPSG(32651)
+    trans = get_transformation(4326, utm_ref)
+    assert get_transformation(4326, utm_ref.ExportToWkt()) is trans
+    x_coord, y_coord = trans.TransformPoint(123.0, 0.0)[:2]
+    assert_almost_equal((x_coord, y_coord), (500000.0, 0.0))
+    info = cache_info()['transformation']
+    assert info.hits == 1
+    assert info.misses == 1
+
+    # each thread has its own transformations
+    pool = ThreadPool(1)
+    try:
+        thread_trans = pool.apply(get_transformation, (4326, 32651))
+    finally:
+        pool.close()
+        pool.join()
+    assert thread_trans is not trans
+    assert get_transformation(4326, 32651) is trans
+
+    set_cache_size(transformation=0)
+    assert cache_info()['transformation'].currsize == 0
+    set_cache_size(transformation=128)
+
+
+def test_transformer_cache():
+    """
+    Test transforming arrays with the cached transformers
+    """
+    clear_cache()
+    transformer = get_transformer(4326, 32651)
+    assert get_transformer('4326', 32651) is transformer
+    x_coords, y_coords = transformer.transform(np.array([123.0, 121.0]),
+                                               np.array([0.0, 15.0]))
+    trans = get_transformation(4326, 32651)
+    assert_almost_equal((x_coords[1], y_coords[1]),
+                        trans.TransformPoint(121.0, 15.0)[:2], decimal=3)
+    assert_almost_equal((x_coords[0], y_coords[0]), (500000.0, 0.0),
+                        decimal=3)
+    info = cache_info()['transformer']
+    assert info.hits == 1
+    assert info.misses == 1
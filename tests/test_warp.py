@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+#
+#  test_warp.py
+#  gazar
+#
+#  Author : Alan D Snow, 2017.
+#  License: BSD 3-Clause
+
+import os
+
+import numpy as np
+
+from gazar.grid import GDALGrid, gdal_reproject
+from gazar.warp import WarpPlan
+
+
+def test_warp_plan(tgrid):
+    """
+    Test warping with a nearest neighbour warp plan
+    """
+    input_raster = os.path.join(tgrid.input, 'gdal_grid',
+                                'gmted_elevation.tif')
+    ggrid = GDALGrid(input_raster)
+    gdal_grid = gdal_reproject(input_raster, epsg=32651, as_gdal_grid=True)
+
+    plan = WarpPlan.create(input_raster, epsg=32651)
+    assert plan.dst_shape == (gdal_grid.y_size, gdal_grid.x_size)
+    np.testing.assert_almost_equal(plan.dst_geotransform,
+                                   gdal_grid.geotransform)
+
+    plan_file = os.path.join(tgrid.write, 'warp_plan.npz')
+    plan.save(plan_file)
+    plan = WarpPlan.load(plan_file)
+
+    plan_grid = plan.apply_grid(ggrid, band=1)
+    plan_array = plan_grid.np_array(masked=False)
+    gdal_array = gdal_grid.np_array(masked=False)
+    # GDAL approximates the transformation within 0.125 pixels
+    assert (plan_array == gdal_array).mean() > 0.99
+
+    stack = np.array([ggrid.np_array(masked=False)] * 3)
+    warped_stack = plan.apply(stack)
+    assert warped_stack.shape == (3,) + plan.dst_shape
+    assert (warped_stack[2] == plan.apply(stack[0])).all()